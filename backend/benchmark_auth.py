@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la autenticación por petición de Registro Violeta
+Mide la dependencia que carga al usuario autenticado (get_current_user_record) con la
+caché de usuarios y sin ella (find_one en cada petición, como el endpoint original), y
+GET /api/dashboard/stats autenticado con un token con claims (fundacion y rol, sin
+consultar al usuario) frente a un token antiguo que solo trae `sub`.
+Usa un mongod local (registro_violeta_loadtest); con --in-memory usa mongomock y el
+resultado no incluye la latencia de red, que es justo lo que la caché ahorra.
+
+Uso:
+    python benchmark_auth.py --runs 5000
+    python benchmark_auth.py --runs 5000 --in-memory
+"""
+
+import os
+import sys
+import math
+import time
+import asyncio
+import logging
+import argparse
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("MONGO_DB_NAME", "registro_violeta_loadtest")
+
+import httpx
+from fastapi.security import HTTPAuthorizationCredentials
+
+import server
+from services.database import database
+
+EMAIL = "benchmark-auth@registro-violeta.test"
+
+# server.py configura logging en INFO: httpx registraría cada petición
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+def percentile(values, pct):
+    """Percentil por rango más cercano"""
+    values = sorted(values)
+    rank = math.ceil(pct / 100 * len(values))
+    return values[max(0, min(len(values), rank) - 1)]
+
+async def seed_user(db):
+    await db.users.delete_many({"email": EMAIL})
+    user = {
+        "email": EMAIL,
+        "nombre": "Benchmark",
+        "apellido": "Auth",
+        "rol": "terapeuta",
+        "fundacion": "Fundacion Benchmark",
+        "active": True,
+        "created_at": datetime.utcnow()
+    }
+    await db.users.insert_one(user)
+    return user
+
+async def measure(name, authenticate, runs):
+    latencies = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        await authenticate()
+        latencies.append((time.perf_counter() - started) * 1000)
+    p50, p99 = percentile(latencies, 50), percentile(latencies, 99)
+    print(f"   {name:<14} p50={p50:>8.3f} ms  p99={p99:>8.3f} ms  {runs / (sum(latencies) / 1000):>9.0f} req/s")
+    return p50
+
+async def run(args):
+    if args.in_memory:
+        from mongomock_motor import AsyncMongoMockClient
+        database.db = AsyncMongoMockClient()[os.environ["MONGO_DB_NAME"]]
+    else:
+        database.connect()
+    db = database.db
+    try:
+        user = await seed_user(db)
+        # Lo que hace el lifespan: sin la lista de revocación cargada se rechazan todos los tokens
+        await server.revocation_list.refresh(db)
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=server.create_user_token(user))
+
+        async def uncached():
+            server.user_cache.clear()
+            return await server.get_current_user_record(credentials)
+
+        async def cached():
+            return await server.get_current_user_record(credentials)
+
+        print(f"🔐 get_current_user_record, {args.runs} peticiones")
+        uncached_p50 = await measure("sin caché", uncached, args.runs)
+        cached_p50 = await measure("con caché", cached, args.runs)
+        print(f"⚡ p50 {uncached_p50 / cached_p50:.1f}x menor con la caché")
+
+        # Petición completa: las estadísticas salen de la caché de rollups, la diferencia es la autenticación
+        legacy_token = server.create_access_token(
+            data={"sub": str(user["_id"])}, expires_delta=timedelta(minutes=60)
+        )
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            def dashboard(token, clear_cache=False):
+                async def request():
+                    if clear_cache:
+                        server.user_cache.clear()
+                    response = await client.get("/api/dashboard/stats", headers={"Authorization": f"Bearer {token}"})
+                    response.raise_for_status()
+                return request
+
+            # Calentar la aplicación y la caché de rollups antes de medir
+            for _ in range(100):
+                await dashboard(credentials.credentials)()
+
+            print(f"📊 GET /api/dashboard/stats, {args.runs} peticiones")
+            claims_p50 = await measure("claims", dashboard(credentials.credentials), args.runs)
+            await measure("solo sub", dashboard(legacy_token), args.runs)
+            legacy_p50 = await measure("sub, sin caché", dashboard(legacy_token, clear_cache=True), args.runs)
+            print(f"⚡ p50 {legacy_p50 / claims_p50:.2f}x menor con claims que con un find_one por petición")
+        await db.users.delete_many({"email": EMAIL})
+        return True
+    finally:
+        if not args.in_memory:
+            database.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la autenticación por petición")
+    parser.add_argument("--runs", type=int, default=5000)
+    parser.add_argument("--in-memory", action="store_true", help="Usar mongomock en lugar de un mongod local")
+    args = parser.parse_args()
+
+    host = urlparse(os.environ["MONGO_URL"]).hostname
+    if not args.in_memory and (host not in ("localhost", "127.0.0.1", "::1") or os.environ["MONGO_DB_NAME"] == "registro_violeta"):
+        print("❌ El benchmark escribe un usuario de prueba: usa un mongod local y una base de datos propia")
+        return False
+
+    return asyncio.run(run(args))
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
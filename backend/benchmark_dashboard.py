@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Benchmark de /api/dashboard/stats de Registro Violeta
+Compara las estadísticas servidas desde los rollups mensuales (sin la caché en memoria)
+con la agregación en vivo sobre `sessions` y `profiles` que hacía el endpoint original.
+Siembra una fundación con --sessions sesiones en un mongod local (registro_violeta_loadtest).
+
+Uso:
+    python benchmark_dashboard.py --sessions 1000000
+    python benchmark_dashboard.py --sessions 1000000 --runs 50 --reuse
+"""
+
+import os
+import sys
+import math
+import time
+import random
+import asyncio
+import argparse
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("MONGO_DB_NAME", "registro_violeta_loadtest")
+
+from services.database import database
+from services.indexes import ensure_indexes
+from services.dashboard_rollups import DashboardRollups
+
+FUNDACION = "Fundacion Benchmark"
+
+def percentile(values, pct):
+    """Percentil por rango más cercano"""
+    values = sorted(values)
+    rank = math.ceil(pct / 100 * len(values))
+    return values[max(0, min(len(values), rank) - 1)]
+
+async def seed(db, sessions, profiles):
+    """Sembrar sesiones y perfiles mínimos (solo los campos que leen las estadísticas)"""
+    await db.sessions.delete_many({"fundacion": FUNDACION})
+    await db.profiles.delete_many({"fundacion": FUNDACION})
+    await db.dashboard_rollups.delete_many({"fundacion": FUNDACION})
+
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    await db.profiles.insert_many([
+        {
+            "codigo_usuaria": f"DB-{p:06d}",
+            "fundacion": FUNDACION,
+            "estado_caso": rng.choice(["activo", "activo", "cerrado"]),
+            "created_at": now - timedelta(days=rng.randint(0, 1460))
+        }
+        for p in range(profiles)
+    ])
+    for start in range(0, sessions, 10000):
+        await db.sessions.insert_many([
+            {
+                "codigo_usuaria": f"DB-{rng.randrange(profiles):06d}",
+                "fundacion": FUNDACION,
+                "created_at": now - timedelta(minutes=rng.randint(0, 1460 * 24 * 60))
+            }
+            for _ in range(start, min(start + 10000, sessions))
+        ])
+    print(f"🌱 {sessions} sesiones y {profiles} perfiles sembrados")
+
+async def live_stats(db):
+    """Las consultas del endpoint original: tres count_documents y una agregación por mes"""
+    total_profiles = await db.profiles.count_documents({"fundacion": FUNDACION})
+    total_sessions = await db.sessions.count_documents({"fundacion": FUNDACION})
+    active_profiles = await db.profiles.count_documents({"fundacion": FUNDACION, "estado_caso": "activo"})
+    six_months_ago = datetime.utcnow() - timedelta(days=180)
+    sessions_by_month = await db.sessions.aggregate([
+        {"$match": {"fundacion": FUNDACION, "created_at": {"$gte": six_months_ago}}},
+        {"$group": {"_id": {"year": {"$year": "$created_at"}, "month": {"$month": "$created_at"}}, "count": {"$sum": 1}}},
+        {"$sort": {"_id.year": 1, "_id.month": 1}}
+    ]).to_list(length=None)
+    return {
+        "total_profiles": total_profiles,
+        "total_sessions": total_sessions,
+        "active_profiles": active_profiles,
+        "sessions_by_month": sessions_by_month
+    }
+
+async def measure(name, compute, runs):
+    latencies = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = await compute()
+        latencies.append((time.perf_counter() - started) * 1000)
+    print(f"   {name:<10} p50={percentile(latencies, 50):>9.2f} ms  p99={percentile(latencies, 99):>9.2f} ms")
+    return result
+
+async def run(args):
+    database.connect()
+    db = database.db
+    try:
+        await ensure_indexes(db)
+        if not args.reuse:
+            await seed(db, args.sessions, args.profiles)
+
+        rollups = DashboardRollups()
+        started = time.perf_counter()
+        months = await rollups.rebuild(db, FUNDACION)
+        print(f"🔧 Rollups reconstruidos: {months} meses en {time.perf_counter() - started:.1f} s")
+
+        # Sin caché: cada lectura va a la colección de rollups
+        async def from_rollups():
+            rollups.cache.clear()
+            return await rollups.get_stats(db, FUNDACION)
+
+        print(f"📊 /api/dashboard/stats, {args.runs} lecturas")
+        rolled = await measure("rollups", from_rollups, args.runs)
+        live = await measure("en vivo", lambda: live_stats(db), args.runs)
+
+        # Ambos caminos deben dar los mismos totales
+        consistent = all(rolled[key] == live[key] for key in ("total_profiles", "total_sessions", "active_profiles"))
+        print("✅ Totales coinciden" if consistent else f"❌ Totales distintos: {rolled} != {live}")
+        return consistent
+    finally:
+        database.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de las estadísticas del dashboard")
+    parser.add_argument("--sessions", type=int, default=1000000)
+    parser.add_argument("--profiles", type=int, default=20000)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--reuse", action="store_true", help="No volver a sembrar los datos")
+    args = parser.parse_args()
+
+    host = urlparse(os.environ["MONGO_URL"]).hostname
+    if host not in ("localhost", "127.0.0.1", "::1") or os.environ["MONGO_DB_NAME"] == "registro_violeta":
+        print("❌ El benchmark borra y siembra datos: usa un mongod local y una base de datos propia")
+        return False
+
+    return asyncio.run(run(args))
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark del tamaño de respuesta de GET /api/sessions según `fields`
+Compara una página del preset `summary` con el documento completo (`full`) para notas
+de distinta longitud: bytes por página y tiempo de serialización con MongoJSONResponse.
+Los documentos tienen la misma forma que los que siembra load_test.py.
+
+Uso:
+    python benchmark_payload.py
+    python benchmark_payload.py --page-size 200 --note-paragraphs 1 4 16
+"""
+
+import sys
+import time
+import argparse
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from services.pagination import DEFAULT_PAGE_SIZE
+from services.projections import SESSION_PRESETS, SESSION_FIELDS, build_projection
+from services.serialization import MongoJSONResponse
+
+NOTE_PARAGRAPH = (
+    "La usuaria refiere avances en el manejo de la ansiedad y en el reconocimiento de "
+    "situaciones de riesgo. Se trabajó con técnicas de respiración y registro de emociones. "
+)
+
+def sample_sessions(count, note_paragraphs):
+    """Sesiones sintéticas como las de load_test.py"""
+    now = datetime.utcnow()
+    sessions = []
+    for index in range(count):
+        created_at = now - timedelta(hours=index)
+        sessions.append({
+            "_id": ObjectId(),
+            "sesion_no": str(index + 1),
+            "fecha": created_at.strftime("%Y-%m-%d"),
+            "codigo_usuaria": f"BM-{index % 200:05d}",
+            "terapeuta": "Terapeuta Benchmark",
+            "objetivo_sesion": NOTE_PARAGRAPH,
+            "desarrollo_objetivo": NOTE_PARAGRAPH * note_paragraphs,
+            "ejercicios_actividades": NOTE_PARAGRAPH * note_paragraphs,
+            "herramientas_entregadas": NOTE_PARAGRAPH,
+            "avances_proceso_terapeutico": NOTE_PARAGRAPH * note_paragraphs,
+            "cierre_sesion": NOTE_PARAGRAPH,
+            "observaciones": "",
+            "firma_terapeuta": "Terapeuta Benchmark",
+            "fundacion": "Fundacion Benchmark",
+            "tipo_sesion": "seguimiento",
+            "created_at": created_at,
+            "updated_at": created_at
+        })
+    return sessions
+
+def project(sessions, fields):
+    """Aplicar la proyección que el endpoint envía a Mongo (con created_at para el cursor)"""
+    projection = build_projection(fields, SESSION_PRESETS, SESSION_FIELDS, required=("created_at",))
+    if projection is None:
+        return sessions
+    return [{key: value for key, value in s.items() if key == "_id" or key in projection} for s in sessions]
+
+def measure(page, rounds):
+    """Bytes de la respuesta y milisegundos por serialización"""
+    body = MongoJSONResponse({"sessions": page, "next_cursor": None}).body
+    started = time.perf_counter()
+    for _ in range(rounds):
+        MongoJSONResponse({"sessions": page, "next_cursor": None})
+    return len(body), (time.perf_counter() - started) / rounds * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de sparse fieldsets en /api/sessions")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+    parser.add_argument("--note-paragraphs", type=int, nargs="+", default=[1, 4, 16],
+                        help="Longitud de las notas largas (párrafos)")
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"📦 Página de {args.page_size} sesiones")
+    for paragraphs in args.note_paragraphs:
+        sessions = sample_sessions(args.page_size, paragraphs)
+        full_bytes, full_ms = measure(project(sessions, "full"), args.rounds)
+        summary_bytes, summary_ms = measure(project(sessions, "summary"), args.rounds)
+        print(f"   notas de {paragraphs:>2} párrafos: full {full_bytes / 1024:>8.1f} KB {full_ms:>7.3f} ms   "
+              f"summary {summary_bytes / 1024:>6.1f} KB {summary_ms:>7.3f} ms   "
+              f"({summary_bytes / full_bytes * 100:.1f}% del tamaño)")
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Benchmark del renderizado de PDFs de Registro Violeta
+Compara el tiempo por documento con las plantillas precompiladas frente al PDFService
+original (commit --baseline-ref, cargado con `git show`). Con --template dossier
+mide el tiempo y el pico de memoria (RSS) del expediente completo según el número de sesiones,
+generado por tandas frente a cargar todas las sesiones en una lista.
+
+Uso:
+    python benchmark_pdf.py --documents 1000
+    python benchmark_pdf.py --documents 1000 --template profile
+    python benchmark_pdf.py --documents 1000 --baseline-ref <commit>
+    python benchmark_pdf.py --template dossier --sessions 100 1000 5000
+"""
+
+import os
+import sys
+import json
+import time
+import types
+import resource
+import argparse
+import subprocess
+from datetime import datetime
+
+from services.pdf_service import pdf_service, PROFILE_HISTORY_LIMIT, SESSION_PDF_FIELDS
+
+NOTE_PARAGRAPH = (
+    "La usuaria refiere avances en el manejo de la ansiedad y en el reconocimiento de "
+    "situaciones de riesgo. Se trabajó con técnicas de respiración y registro de emociones."
+)
+
+def sample_data(index):
+    """Documento sintético para cada plantilla"""
+    session = {
+        "sesion_no": str(index + 1),
+        "fecha": "2025-01-15",
+        "codigo_usuaria": f"BM-{index:05d}",
+        "terapeuta": "Terapeuta Benchmark",
+        "objetivo_sesion": NOTE_PARAGRAPH,
+        "desarrollo_objetivo": "\n".join([NOTE_PARAGRAPH] * 4),
+        "ejercicios_actividades": "\n".join([NOTE_PARAGRAPH] * 3),
+        "herramientas_entregadas": NOTE_PARAGRAPH,
+        "avances_proceso_terapeutico": "\n".join([NOTE_PARAGRAPH] * 3),
+        "cierre_sesion": NOTE_PARAGRAPH,
+        "observaciones": "",
+        "firma_terapeuta": "Terapeuta Benchmark"
+    }
+    profile = {
+        "codigo_usuaria": f"BM-{index:05d}",
+        "edad_aproximada": "34",
+        "situacion_general": NOTE_PARAGRAPH,
+        "tipo_violencia": "psicologica",
+        "estado_caso": "activo",
+        "terapeuta_asignado": "Terapeuta Benchmark",
+        "created_at": datetime(2024, 6, 1),
+        "notas_generales": NOTE_PARAGRAPH
+    }
+    history = [
+        {"sesion_no": str(n), "fecha": "2025-01-15", "tipo_sesion": "seguimiento", "terapeuta": "Terapeuta Benchmark"}
+        for n in range(PROFILE_HISTORY_LIMIT)
+    ]
+    return {"session": (session, {}), "profile": (profile, {"sessions": history, "history_limit": PROFILE_HISTORY_LIMIT})}
+
+def render_precompiled(template, data, context):
+    return pdf_service.render(template, data, **context)
+
+# Commit anterior a la serie de optimizaciones del renderizado
+BASELINE_REF = "38d28c5"
+
+def load_baseline(ref):
+    """Instancia del PDFService tal como estaba en `ref`"""
+    source = subprocess.run(
+        ["git", "show", f"{ref}:backend/services/pdf_service.py"],
+        capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))
+    ).stdout
+    module = types.ModuleType("baseline_pdf_service")
+    exec(compile(source, f"{ref}:backend/services/pdf_service.py", "exec"), module.__dict__)
+    return module.PDFService()
+
+def baseline_renderer(service):
+    def render(template, data, context):
+        if template == "session":
+            return service.create_session_pdf(data)
+        return service.create_profile_pdf(data, context["sessions"])
+    return render
+
+def measure(render, template, documents):
+    started = time.perf_counter()
+    for index in range(documents):
+        data, context = sample_data(index)[template]
+        render(template, data, context)
+    elapsed = time.perf_counter() - started
+    return elapsed / documents * 1000
+
+def dossier_sessions(count):
+    """Sesiones sintéticas generadas bajo demanda, como un cursor"""
+    for index in range(count):
+        session, _ = sample_data(index)["session"]
+        yield {field: session.get(field) for field in SESSION_PDF_FIELDS}
+
+def measure_dossier(count, mode):
+    """Renderizar un expediente de `count` sesiones; se ejecuta en un proceso propio"""
+    profile, _ = sample_data(0)["profile"]
+    started = time.perf_counter()
+    if mode == "incremental":
+        pdf_content = pdf_service.create_profile_dossier_pdf(
+            profile, dossier_sessions(count), dossier_sessions(count)
+        )
+    else:
+        # Todas las sesiones y flowables en memoria antes de maquetar
+        sessions = list(dossier_sessions(count))
+        pdf_content = pdf_service.render("profile_dossier", profile, history=sessions, details=sessions)
+    elapsed = time.perf_counter() - started
+    return {
+        "sessions": count,
+        "mode": mode,
+        "seconds": round(elapsed, 2),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "pdf_mb": round(len(pdf_content or b"") / 1024 / 1024, 2)
+    }
+
+def run_dossier(counts):
+    print("📚 Expediente completo (cada medición en un proceso nuevo)")
+    for count in counts:
+        for mode in ("incremental", "list"):
+            output = subprocess.run(
+                [sys.executable, __file__, "--template", "dossier", "--single", mode, "--sessions", str(count)],
+                capture_output=True, text=True, check=True
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"   {count:>6} sesiones {mode:<12} {result['seconds']:>8.2f} s  "
+                  f"pico RSS {result['peak_rss_mb']:>8.1f} MB  PDF {result['pdf_mb']:.2f} MB")
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del renderizado de PDFs")
+    parser.add_argument("--documents", type=int, default=1000)
+    parser.add_argument("--template", choices=["session", "profile", "dossier"], default="session")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[100, 1000], help="Sesiones por expediente")
+    parser.add_argument("--baseline-ref", default=BASELINE_REF, help="Commit con el PDFService de referencia")
+    parser.add_argument("--single", choices=["incremental", "list"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.template == "dossier":
+        if args.single:
+            print(json.dumps(measure_dossier(args.sessions[0], args.single)))
+            return True
+        return run_dossier(args.sessions)
+
+    try:
+        render_baseline = baseline_renderer(load_baseline(args.baseline_ref))
+    except subprocess.CalledProcessError as e:
+        print(f"❌ No se pudo cargar el PDFService de {args.baseline_ref}: {e.stderr.strip()}")
+        return False
+
+    # Calentar: importaciones perezosas de reportlab y fuentes
+    measure(render_baseline, args.template, 5)
+    measure(render_precompiled, args.template, 5)
+
+    baseline = measure(render_baseline, args.template, args.documents)
+    precompiled = measure(render_precompiled, args.template, args.documents)
+
+    print(f"📄 {args.documents} documentos '{args.template}'")
+    print(f"   PDFService de {args.baseline_ref}: {baseline:.2f} ms/doc")
+    print(f"   Plantillas precompiladas: {precompiled:.2f} ms/doc")
+    print(f"   Diferencia: {(precompiled / baseline - 1) * 100:+.1f}%")
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
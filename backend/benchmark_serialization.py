@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark de serialización de GET /api/sessions
+Compara MongoJSONResponse (orjson con ObjectId y datetime nativos) con el camino original:
+convertir _id y fechas a mano en un bucle, devolver un dict y dejar que FastAPI lo pase
+por jsonable_encoder y JSONResponse. Solo CPU: no necesita base de datos.
+
+Uso:
+    python benchmark_serialization.py
+    python benchmark_serialization.py --sessions 10000 --rounds 20
+"""
+
+import sys
+import json
+import time
+import argparse
+import statistics
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from benchmark_payload import sample_sessions
+from services.serialization import MongoJSONResponse
+
+def original_response(sessions):
+    """Lo que hacía el endpoint original (sobre copias: la conversión mutaba los documentos)"""
+    sessions = [dict(session) for session in sessions]
+    for session in sessions:
+        session["_id"] = str(session["_id"])
+        if "created_at" in session:
+            session["created_at"] = session["created_at"].isoformat()
+        if "updated_at" in session:
+            session["updated_at"] = session["updated_at"].isoformat()
+    return JSONResponse(jsonable_encoder({"sessions": sessions}))
+
+def orjson_response(sessions):
+    return MongoJSONResponse({"sessions": sessions})
+
+def measure(name, build, sessions, rounds):
+    """Mediana de milisegundos por respuesta"""
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        body = build(sessions).body
+        timings.append((time.perf_counter() - started) * 1000)
+    median = statistics.median(timings)
+    print(f"   {name:<32} mediana={median:>9.2f} ms  mín={min(timings):>9.2f} ms  {len(body) / 1024:>8.1f} KB")
+    return median, body
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de serialización de sesiones")
+    parser.add_argument("--sessions", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--note-paragraphs", type=int, default=4, help="Longitud de las notas largas (párrafos)")
+    args = parser.parse_args()
+
+    sessions = sample_sessions(args.sessions, args.note_paragraphs)
+    print(f"🧪 {args.sessions} sesiones, {args.rounds} rondas")
+    original_ms, original_body = measure("jsonable_encoder + JSONResponse", original_response, sessions, args.rounds)
+    orjson_ms, orjson_body = measure("MongoJSONResponse (orjson)", orjson_response, sessions, args.rounds)
+    print(f"⚡ {original_ms / orjson_ms:.1f}x más rápido")
+
+    # Mismo contenido: orjson escribe los datetime con el mismo formato que isoformat()
+    same = json.loads(original_body) == json.loads(orjson_body)
+    print("✅ Mismo contenido" if same else "❌ Las respuestas difieren")
+    return same
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
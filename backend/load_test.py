@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Suite de carga y regresión de latencia para Registro Violeta
+Levanta server:app en el mismo proceso (transporte ASGI de httpx) contra un mongod local,
+siembra datos sintéticos y mide p50/p95/p99 y throughput de los endpoints principales.
+
+Uso:
+    python load_test.py --output report.json
+    python load_test.py --baseline baseline.json        # falla si hay regresiones
+    python load_test.py --output baseline.json --foundations 2 --sessions 20000
+    python load_test.py --only sessions_during_login_burst sessions_during_login_burst_inline
+    python load_test.py --server-ref 38d28c5 --output before.json   # server.py de otro commit
+    python load_test.py --baseline before.json --only auth_login sessions_list profiles_list dashboard_stats
+"""
+
+import os
+import sys
+import json
+import time
+import math
+import random
+import types
+import asyncio
+import argparse
+import itertools
+import subprocess
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+
+# La suite usa su propia base de datos y sin límites de login; se configura antes de importar server
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("MONGO_DB_NAME", "registro_violeta_loadtest")
+os.environ.setdefault("LOGIN_RATE_LIMIT", "1000000/1")
+
+import httpx
+
+from server import app
+from services.database import database
+from services.password_hasher import password_hasher
+from services.profile_stats import rebuild_profile_stats
+from services.dashboard_rollups import dashboard_rollups
+
+PASSWORD = "LoadTest2025!"
+NOTE_PARAGRAPH = (
+    "La usuaria refiere avances en el manejo de la ansiedad y en el reconocimiento de "
+    "situaciones de riesgo. Se trabajó con técnicas de respiración y registro de emociones. "
+)
+
+# Escenarios que existen en cualquier versión del servidor (comparables con --server-ref)
+THROUGHPUT_ENDPOINTS = ("auth_login", "sessions_list", "profiles_list", "dashboard_stats")
+
+def log(message):
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    print(f"[{timestamp}] {message}")
+
+def percentile(values, pct):
+    """Percentil por rango más cercano sobre una lista ordenada"""
+    if not values:
+        return None
+    rank = math.ceil(pct / 100 * len(values))
+    return values[max(0, min(len(values), rank) - 1)]
+
+def load_server_at(ref):
+    """Cargar server.py tal como estaba en otro commit (p.ej. la línea base con pymongo
+    síncrono) como un módulo aparte; los servicios que importa son los del árbol actual"""
+    source = subprocess.run(
+        ["git", "show", f"{ref}:backend/server.py"],
+        cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True
+    ).stdout
+    module = types.ModuleType(f"server_{ref}")
+    module.__file__ = f"server.py@{ref}"
+    exec(compile(source, module.__file__, "exec"), module.__dict__)
+
+    # Las versiones con MongoClient global fijaban la base registro_violeta: usar la de la suite
+    if hasattr(module, "client") and hasattr(module, "users_collection"):
+        module.db = module.client[os.environ["MONGO_DB_NAME"]]
+        module.users_collection = module.db.users
+        module.sessions_collection = module.db.sessions
+        module.profiles_collection = module.db.profiles
+    log(f"🕰️  server.py de {ref}")
+    return module.app
+
+async def seed(args):
+    """Sembrar fundaciones, usuarios, perfiles y sesiones sintéticas"""
+    db = database.db
+    for name in ("users", "profiles", "sessions", "dashboard_rollups", "session_pdfs.files", "session_pdfs.chunks", "jobs"):
+        await db[name].delete_many({})
+
+    # Un único hash para todos los usuarios: el coste bcrypt se mide en el login, no en la siembra
+    password_hash = await password_hasher.hash(PASSWORD)
+    rng = random.Random(args.seed)
+    now = datetime.utcnow()
+    users = []
+
+    for f in range(args.foundations):
+        fundacion = f"Fundacion Carga {f + 1}"
+        email = f"carga{f + 1}@registrovioleta.org"
+        await db.users.insert_one({
+            "email": email,
+            "password": password_hash,
+            "nombre": "Carga",
+            "apellido": str(f + 1),
+            "rol": "admin",
+            "fundacion": fundacion,
+            "active": True,
+            "created_at": now
+        })
+        users.append({"email": email, "fundacion": fundacion})
+
+        codigos = [f"LT-{p:05d}" for p in range(args.profiles)]
+        await db.profiles.insert_many([
+            {
+                "codigo_usuaria": codigo,
+                "edad_aproximada": str(rng.randint(18, 65)),
+                "situacion_general": NOTE_PARAGRAPH,
+                "tipo_violencia": rng.choice(["psicologica", "fisica", "economica"]),
+                "estado_caso": rng.choice(["activo", "activo", "cerrado"]),
+                "terapeuta_asignado": "Terapeuta Carga",
+                "fundacion": fundacion,
+                "created_at": now - timedelta(days=rng.randint(0, 720)),
+                "updated_at": now
+            }
+            for codigo in codigos
+        ])
+
+        batch = []
+        for s in range(args.sessions):
+            created_at = now - timedelta(minutes=rng.randint(0, 720 * 24 * 60))
+            batch.append({
+                "sesion_no": str(s + 1),
+                "fecha": created_at.strftime("%Y-%m-%d"),
+                "codigo_usuaria": rng.choice(codigos),
+                "terapeuta": "Terapeuta Carga",
+                "objetivo_sesion": NOTE_PARAGRAPH,
+                "desarrollo_objetivo": NOTE_PARAGRAPH * args.note_paragraphs,
+                "ejercicios_actividades": NOTE_PARAGRAPH * args.note_paragraphs,
+                "herramientas_entregadas": NOTE_PARAGRAPH,
+                "avances_proceso_terapeutico": NOTE_PARAGRAPH * args.note_paragraphs,
+                "cierre_sesion": NOTE_PARAGRAPH,
+                "observaciones": "",
+                "firma_terapeuta": "Terapeuta Carga",
+                "fundacion": fundacion,
+                "tipo_sesion": "seguimiento",
+                "created_at": created_at,
+                "updated_at": created_at
+            })
+            if len(batch) >= 1000:
+                await db.sessions.insert_many(batch)
+                batch = []
+        if batch:
+            await db.sessions.insert_many(batch)
+
+        log(f"🌱 {fundacion}: {args.profiles} perfiles, {args.sessions} sesiones")
+
+    await rebuild_profile_stats(db)
+    await dashboard_rollups.rebuild(db)
+    return users
+
+async def run_endpoint(client, name, make_request, requests, concurrency, until=None):
+    """Ejecutar `requests` peticiones con `concurrency` clientes concurrentes
+    (o, con `until`, tantas como quepan hasta que esa tarea termine)"""
+    latencies = []
+    errors = 0
+    if until is None:
+        remaining = iter(range(requests))
+    else:
+        remaining = itertools.takewhile(lambda _: not until.done(), itertools.count())
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            started = time.perf_counter()
+            try:
+                response = await make_request(client)
+                if response.status_code >= 400:
+                    errors += 1
+            except Exception:
+                errors += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+            # Ceder el loop entre peticiones: con `until`, la tarea vigilada tiene que avanzar
+            # aunque una petición se complete sin esperar E/S
+            await asyncio.sleep(0)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    requests = len(latencies)
+    if not requests:
+        # Con `until` la tarea pudo terminar antes de la primera respuesta
+        log(f"📊 {name}: 0 peticiones completadas")
+        return {
+            "requests": 0,
+            "concurrency": concurrency,
+            "errors": errors,
+            "p50_ms": None,
+            "p95_ms": None,
+            "p99_ms": None,
+            "throughput_rps": None
+        }
+
+    result = {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "throughput_rps": round(requests / elapsed, 2) if elapsed else None
+    }
+    log(f"📊 {name}: p50={result['p50_ms']}ms p95={result['p95_ms']}ms "
+        f"p99={result['p99_ms']}ms {result['throughput_rps']} req/s errores={errors}")
+    return result
+
+@contextmanager
+def bcrypt_on_event_loop():
+    """Verificar bcrypt en el event loop, como antes del pool acotado (referencia de comparación)"""
+    password_hasher.inline = True
+    try:
+        yield
+    finally:
+        password_hasher.inline = False
+
+async def run_during_login_burst(client, name, make_request, login, args):
+    """Medir un endpoint mientras hay `args.burst_logins` logins en curso a la vez"""
+    burst = asyncio.ensure_future(
+        asyncio.gather(*(login(client) for _ in range(args.burst_logins)), return_exceptions=True)
+    )
+    # La ruta se mide mientras dure la ráfaga: si bcrypt bloquea el event loop,
+    # las peticiones en curso lo acusan en su latencia
+    result = await run_endpoint(client, name, make_request, None, args.concurrency, until=burst)
+    responses = await burst
+
+    # Con el pool lleno los logins sobrantes reciben 503 (PASSWORD_HASH_QUEUE): se informan aparte
+    result["burst_logins"] = args.burst_logins
+    result["burst_logins_failed"] = sum(
+        1 for r in responses if isinstance(r, Exception) or r.status_code != 200
+    )
+    log(f"🔐 {name}: {args.burst_logins} logins concurrentes, {result['burst_logins_failed']} rechazados")
+    return result
+
+async def run_suite(args):
+    target = load_server_at(args.server_ref) if args.server_ref else app
+    # La siembra usa siempre la capa de datos actual; las peticiones van al servidor elegido
+    async with app.router.lifespan_context(app):
+        users = await seed(args)
+        transport = httpx.ASGITransport(app=target)
+
+        async with (target.router.lifespan_context(target) if target is not app else nullcontext()), \
+                httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=120) as client:
+            user = users[0]
+            login = await client.post("/api/auth/login", json={"email": user["email"], "password": PASSWORD})
+            login.raise_for_status()
+            headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+            session_id = profile_id = None
+            revalidate_headers = headers
+            if not args.server_ref:
+                sessions = (await client.get("/api/sessions", params={"limit": 1}, headers=headers)).json()["sessions"]
+                profiles = (await client.get("/api/profiles", params={"fields": "summary"}, headers=headers)).json()["profiles"]
+                session_id = sessions[0]["_id"]
+                profile_id = profiles[0]["_id"]
+
+                # ETag para medir la revalidación condicional (304 sin cuerpo)
+                session_pdf = await client.get(f"/api/sessions/{session_id}/pdf", headers=headers)
+                revalidate_headers = {**headers, "If-None-Match": session_pdf.headers.get("etag", "")}
+
+            endpoints = {
+                "auth_login": (
+                    lambda c: c.post("/api/auth/login", json={"email": user["email"], "password": PASSWORD}),
+                    args.login_requests
+                ),
+                "sessions_list": (lambda c: c.get("/api/sessions", headers=headers), args.requests),
+                "profiles_list": (lambda c: c.get("/api/profiles", headers=headers), args.requests),
+                "dashboard_stats": (lambda c: c.get("/api/dashboard/stats", headers=headers), args.requests),
+                "session_pdf": (lambda c: c.get(f"/api/sessions/{session_id}/pdf", headers=headers), args.pdf_requests),
+                "profile_pdf": (lambda c: c.get(f"/api/profiles/{profile_id}/pdf", headers=headers), args.pdf_requests),
+                "session_pdf_revalidate": (
+                    lambda c: c.get(f"/api/sessions/{session_id}/pdf", headers=revalidate_headers),
+                    args.pdf_requests
+                ),
+            }
+
+            results = {}
+            for name, (make_request, requests) in endpoints.items():
+                if args.only and name not in args.only:
+                    continue
+                if args.server_ref and name not in THROUGHPUT_ENDPOINTS:
+                    continue
+                results[name] = await run_endpoint(client, name, make_request, requests, args.concurrency)
+
+            # Latencia de una ruta sin bcrypt durante una ráfaga de logins, con el pool y sin él
+            login = endpoints["auth_login"][0]
+            sessions_list = endpoints["sessions_list"][0]
+            if not args.server_ref and (not args.only or "sessions_during_login_burst" in args.only):
+                results["sessions_during_login_burst"] = await run_during_login_burst(
+                    client, "sessions_during_login_burst", sessions_list, login, args
+                )
+            if not args.server_ref and (not args.only or "sessions_during_login_burst_inline" in args.only):
+                with bcrypt_on_event_loop():
+                    results["sessions_during_login_burst_inline"] = await run_during_login_burst(
+                        client, "sessions_during_login_burst_inline", sessions_list, login, args
+                    )
+
+    return {
+        "meta": {
+            "generated_at": datetime.utcnow().isoformat(),
+            "server": args.server_ref or "working tree",
+            "foundations": args.foundations,
+            "profiles": args.profiles,
+            "sessions": args.sessions,
+            "concurrency": args.concurrency
+        },
+        "endpoints": results
+    }
+
+def compare(report, baseline, tolerance):
+    """Comparar contra una línea base; devuelve la lista de regresiones"""
+    regressions = []
+    for name, current in report["endpoints"].items():
+        previous = baseline.get("endpoints", {}).get(name)
+        if not previous:
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            if previous.get(metric) and current[metric] is not None and current[metric] > previous[metric] * (1 + tolerance):
+                regressions.append(f"{name}.{metric}: {previous[metric]} -> {current[metric]}")
+        if previous.get("throughput_rps") and (current["throughput_rps"] or 0) < previous["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}.throughput_rps: {previous['throughput_rps']} -> {current['throughput_rps']}")
+        if current["errors"] > previous.get("errors", 0):
+            regressions.append(f"{name}.errors: {previous.get('errors', 0)} -> {current['errors']}")
+    return regressions
+
+def log_throughput(report, baseline):
+    """Throughput antes/después de los endpoints presentes en ambos reportes"""
+    server = baseline.get("meta", {}).get("server", "línea base")
+    for name, current in report["endpoints"].items():
+        previous = baseline.get("endpoints", {}).get(name)
+        if previous and previous.get("throughput_rps") and current["throughput_rps"]:
+            log(f"📈 {name}: {previous['throughput_rps']} req/s ({server}) -> {current['throughput_rps']} req/s "
+                f"({current['throughput_rps'] / previous['throughput_rps']:.2f}x)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Suite de carga de la API de Registro Violeta")
+    parser.add_argument("--foundations", type=int, default=1)
+    parser.add_argument("--profiles", type=int, default=200, help="Perfiles por fundación")
+    parser.add_argument("--sessions", type=int, default=5000, help="Sesiones por fundación")
+    parser.add_argument("--note-paragraphs", type=int, default=4, help="Longitud de las notas largas")
+    parser.add_argument("--requests", type=int, default=500, help="Peticiones por endpoint de lectura")
+    parser.add_argument("--login-requests", type=int, default=50)
+    parser.add_argument("--pdf-requests", type=int, default=50)
+    parser.add_argument("--burst-logins", type=int, default=100, help="Logins concurrentes de la ráfaga")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--only", nargs="*", help="Limitar a estos endpoints")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Guardar el reporte JSON en este archivo")
+    parser.add_argument("--baseline", help="Reporte base contra el que comparar")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Regresión tolerada (0.2 = 20%%)")
+    parser.add_argument("--allow-remote", action="store_true", help="Permitir un MONGO_URL no local")
+    parser.add_argument("--server-ref", help="Medir server.py de este commit de git (solo %s)" % ", ".join(THROUGHPUT_ENDPOINTS))
+    args = parser.parse_args()
+
+    host = urlparse(os.environ["MONGO_URL"]).hostname
+    if host not in ("localhost", "127.0.0.1", "::1") and not args.allow_remote:
+        log(f"❌ MONGO_URL apunta a {host}; la suite borra y siembra datos, usa un mongod local")
+        return False
+
+    if os.environ["MONGO_DB_NAME"] == "registro_violeta":
+        log("❌ MONGO_DB_NAME no puede ser la base de datos de la aplicación")
+        return False
+
+    report = asyncio.run(run_suite(args))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        log(f"💾 Reporte guardado en {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        log_throughput(report, baseline)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            log("❌ Regresiones detectadas:")
+            for regression in regressions:
+                log(f"   {regression}")
+            return False
+        log("✅ Sin regresiones respecto a la línea base")
+
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -83,4 +83,7 @@ echo "   🔐 Password: RegistroVioleta2025!"
 echo ""
 
 # Start the application
+# Railway's edge proxy appends the real client IP to X-Forwarded-For: the login/register
+# rate limiter keys on that last hop (entries to its left are written by the client)
+export TRUSTED_PROXY_HOPS=${TRUSTED_PROXY_HOPS:-1}
 exec uvicorn server:app --host 0.0.0.0 --port $PORT
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Script para reconstruir las estadísticas materializadas de Registro Violeta
+Recalcula los contadores de sesiones de cada perfil y los rollups del dashboard
+a partir de las colecciones de sesiones y perfiles
+"""
+
+import sys
+import asyncio
+import argparse
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from services.database import database
+from services.indexes import ensure_indexes
+from services.profile_stats import rebuild_profile_stats, DEFAULT_BATCH_SIZE
+from services.dashboard_rollups import dashboard_rollups
+
+async def rebuild(args):
+    """Reconstruir las estadísticas solicitadas"""
+    database.connect()
+    try:
+        await database.ping()
+        print("✅ Conexión a base de datos exitosa")
+
+        # Los rollups dependen del índice único por mes
+        await ensure_indexes(database.db)
+
+        repaired = await rebuild_profile_stats(database.db, args.fundacion, args.batch_size)
+        print(f"✅ Estadísticas reconstruidas para {repaired} perfiles")
+
+        months = await dashboard_rollups.rebuild(database.db, args.fundacion)
+        print(f"✅ Rollups del dashboard reconstruidos: {months} meses")
+        return True
+    except Exception as e:
+        print(f"❌ Error reconstruyendo estadísticas: {e}")
+        return False
+    finally:
+        database.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconstruir estadísticas materializadas")
+    parser.add_argument("--fundacion", help="Limitar la reconstrucción a una fundación")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Perfiles por lote")
+    args = parser.parse_args()
+
+    return asyncio.run(rebuild(args))
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -1,34 +1,85 @@
-from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form, status
+from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form, Header, Query, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, Response
-from pymongo import MongoClient
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pymongo import ReturnDocument, UpdateOne
 from pymongo.errors import DuplicateKeyError
-from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from typing import Optional, List
+from contextlib import asynccontextmanager
 import os
 from dotenv import load_dotenv
 import uuid
 import json
+import asyncio
 from pydantic import BaseModel, Field
 from bson import ObjectId
 import logging
 import traceback
 
+# Cargar variables de entorno (antes de importar los servicios, que leen su configuración al importarse)
+load_dotenv()
+
 # Importar servicios
 from services.drive_service import drive_service
-from services.pdf_service import pdf_service
+from services.folder_cache import folder_cache
+from services.pdf_executor import pdf_executor
+from services.pdf_cache import pdf_cache, profile_key, etag_matches
+from services.pdf_service import PROFILE_HISTORY_FIELDS, PROFILE_HISTORY_LIMIT, SESSION_PDF_FIELDS
+from services.pdf_export import pdf_export
+from services.blob_store import blob_store
+from services.session_pdfs import open_session_pdf, session_pdf_filename, session_pdf_etag, is_current
+from services.job_queue import job_queue
+from services.session_jobs import enqueue_session_artifacts, RENDER_SESSION_PDF, UPLOAD_SESSION_PDF
+from services.byte_ranges import parse_byte_range, RangeNotSatisfiable
+from services.database import database
+from services.cache import TTLCache
+from services.password_hasher import password_hasher, PasswordHasherBusy
+from services.health_monitor import health_monitor
+from services.revocation import revocation_list
+from services.rate_limiter import login_limiter, register_limiter, RateLimitExceeded
+from services.indexes import ensure_indexes, explain_hot_queries
+from services.profile_stats import record_session
+from services.dashboard_rollups import dashboard_rollups
+from services.serialization import MongoJSONResponse, stream_ndjson
+from services.projections import (
+    SESSION_FIELDS, SESSION_PRESETS, PROFILE_FIELDS, PROFILE_PRESETS, build_projection
+)
+from services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, KEYSET_SORT, encode_cursor, keyset_filter
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Cargar variables de entorno
-load_dotenv()
+JOB_WORKER_EMBEDDED = os.getenv("JOB_WORKER_EMBEDDED", "true").lower() == "true"
 
-app = FastAPI(title="Registro Violeta API", version="2.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Abrir la conexión a MongoDB al arrancar y cerrarla al apagar
+    database.connect()
+    await ensure_indexes(database.db)
+    password_hasher.start()
+    pdf_executor.start()
+    await health_monitor.start(database)
+    await revocation_list.start(database)
+    if JOB_WORKER_EMBEDDED:
+        # Workers de la cola dentro de la API; con `python worker.py` se pueden desactivar
+        job_queue.start(database.db)
+    yield
+    await job_queue.stop()
+    await revocation_list.stop()
+    await health_monitor.stop()
+    pdf_executor.shutdown()
+    password_hasher.shutdown()
+    database.close()
+
+app = FastAPI(
+    title="Registro Violeta API",
+    version="2.0.0",
+    lifespan=lifespan,
+    default_response_class=MongoJSONResponse
+)
 
 # Configurar CORS
 app.add_middleware(
@@ -39,24 +90,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Tamaño de lote del cursor en las exportaciones (acota la memoria por petición)
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 500))
+EXPORT_FORMATS = ("ndjson",)
+
 # Configuración de seguridad
 security = HTTPBearer()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # Configuración JWT
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("JWT_EXPIRE_MINUTES", 43200))
 
-# Conexión MongoDB
-MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017/registro_violeta")
-client = MongoClient(MONGO_URL)
-db = client.registro_violeta
+# Proxies de confianza delante de la API (ver client_ip)
+TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", 0))
 
-# Colecciones
-users_collection = db.users
-sessions_collection = db.sessions
-profiles_collection = db.profiles
+# Caché de usuarios autenticados (evita un find_one por petición)
+user_cache = TTLCache(
+    maxsize=int(os.getenv("USER_CACHE_SIZE", 1024)),
+    ttl=int(os.getenv("USER_CACHE_TTL", 60))
+)
 
 # Modelos Pydantic
 class UserCreate(BaseModel):
@@ -108,12 +161,6 @@ class ProfileUpdate(BaseModel):
     notas_generales: Optional[str] = None
 
 # Funciones de utilidad
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password):
-    return pwd_context.hash(password)
-
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -124,12 +171,26 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
+def create_user_token(db_user: dict):
+    """Token con los claims necesarios para autorizar sin consultar la base de datos"""
+    return create_access_token(
+        data={
+            "sub": str(db_user["_id"]),
+            "fundacion": db_user["fundacion"],
+            "rol": db_user["rol"],
+            "tv": db_user.get("token_version", 0)
+        },
+        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     )
+
+credentials_exception = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Could not validate credentials",
+    headers={"WWW-Authenticate": "Bearer"},
+)
+
+def decode_token(credentials: HTTPAuthorizationCredentials):
+    """Validar firma, expiración y revocación del token (solo CPU)"""
     try:
         payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("sub")
@@ -138,28 +199,115 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     except JWTError:
         raise credentials_exception
     
-    user = users_collection.find_one({"_id": ObjectId(user_id)})
+    if revocation_list.is_revoked(user_id, payload.get("tv", 0)):
+        raise credentials_exception
+    return payload
+
+async def load_user(user_id: str):
+    """Obtener el documento completo del usuario (con caché)"""
+    user = user_cache.get(user_id)
     if user is None:
+        user = await database.users.find_one({"_id": ObjectId(user_id)})
+        if user is None:
+            raise credentials_exception
+        user_cache.set(user_id, user)
+    
+    if not user.get("active", True):
         raise credentials_exception
     return user
 
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    payload = decode_token(credentials)
+    
+    # Los tokens actuales traen fundacion y rol: no hace falta consultar al usuario
+    if "fundacion" in payload and "rol" in payload:
+        return {
+            "_id": ObjectId(payload["sub"]),
+            "fundacion": payload["fundacion"],
+            "rol": payload["rol"]
+        }
+    
+    # Tokens emitidos antes de incluir claims
+    return await load_user(payload["sub"])
+
+async def get_current_user_record(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Usuario completo, para las rutas que necesitan más que fundacion y rol"""
+    payload = decode_token(credentials)
+    return await load_user(payload["sub"])
+
+def too_many_requests(e: RateLimitExceeded):
+    """Respuesta 429 del limitador de login/registro"""
+    return HTTPException(
+        status_code=429,
+        detail="Too many attempts, please retry later",
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
+def client_ip(request: Request):
+    """IP de la clienta para el limitador de login y registro
+
+    Con TRUSTED_PROXY_HOPS proxies delante, cada uno añade a la derecha de X-Forwarded-For la IP
+    que le conectó: la entrada que añadió el último proxy de confianza es la IP real. Las entradas
+    más a la izquierda las puede escribir la clienta y nunca se usan (con `--forwarded-allow-ips "*"`
+    uvicorn tomaría la primera, y cada petición falsificada tendría un cupo nuevo).
+    """
+    if TRUSTED_PROXY_HOPS:
+        forwarded = [hop.strip() for hop in request.headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+        if len(forwarded) >= TRUSTED_PROXY_HOPS:
+            return forwarded[-TRUSTED_PROXY_HOPS]
+    return request.client.host if request.client else None
+
+def auth_service_busy():
+    """Respuesta 503 cuando el pool de bcrypt está saturado"""
+    return HTTPException(
+        status_code=503,
+        detail="Authentication service busy, please retry",
+        headers={"Retry-After": "1"}
+    )
+
+def invalidate_cached_user(user_id):
+    """Invalidar la caché cuando un usuario cambia o se desactiva"""
+    user_cache.invalidate(str(user_id))
+
+def parse_fields(fields, presets, allowed, required=()):
+    """Convertir el parámetro `fields` en proyección o responder 400"""
+    try:
+        return build_projection(fields, presets, allowed, required)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def require_admin(current_user: dict = Depends(get_current_user)):
+    if current_user.get("rol") != "admin":
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+    return current_user
+
 # Rutas de autenticación
 @app.post("/api/auth/register")
-async def register(user: UserCreate):
+async def register(user: UserCreate, request: Request):
+    # Limitar antes de cualquier consulta o hash bcrypt
+    try:
+        await register_limiter.check(client_ip(request), user.email.strip().lower())
+    except RateLimitExceeded as e:
+        raise too_many_requests(e)
+    
     try:
         # Verificar si el usuario ya existe
-        if users_collection.find_one({"email": user.email}):
+        if await database.users.find_one({"email": user.email}):
             raise HTTPException(status_code=400, detail="Email already registered")
         
         # Crear nuevo usuario
         user_dict = user.dict()
-        user_dict["password"] = get_password_hash(user.password)
+        user_dict["password"] = await password_hasher.hash(user.password)
         user_dict["created_at"] = datetime.utcnow()
         user_dict["active"] = True
         
-        result = users_collection.insert_one(user_dict)
+        result = await database.users.insert_one(user_dict)
         
         return {"message": "User created successfully", "user_id": str(result.inserted_id)}
+    except HTTPException:
+        raise
+    except PasswordHasherBusy:
+        raise auth_service_busy()
     except DuplicateKeyError:
         raise HTTPException(status_code=400, detail="Email already registered")
     except Exception as e:
@@ -167,21 +315,20 @@ async def register(user: UserCreate):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @app.post("/api/auth/login")
-async def login(user: UserLogin):
+async def login(user: UserLogin, request: Request):
+    # Limitar antes de cualquier consulta o verificación bcrypt
+    try:
+        await login_limiter.check(client_ip(request), user.email.strip().lower())
+    except RateLimitExceeded as e:
+        logger.warning(f"🚫 Login rate limit exceeded for email: {user.email}")
+        raise too_many_requests(e)
+    
     try:
         logger.info(f"🔑 Login attempt for email: {user.email}")
         
-        # Verificar que la base de datos esté conectada
-        try:
-            client.admin.command('ping')
-            logger.info("✅ Database connection verified during login")
-        except Exception as e:
-            logger.error(f"❌ Database connection failed during login: {e}")
-            raise HTTPException(status_code=500, detail="Database connection error")
-        
         # Buscar usuario
         logger.info(f"🔍 Searching for user: {user.email}")
-        db_user = users_collection.find_one({"email": user.email})
+        db_user = await database.users.find_one({"email": user.email})
         
         if not db_user:
             logger.warning(f"❌ User not found: {user.email}")
@@ -192,23 +339,33 @@ async def login(user: UserLogin):
         # Verificar contraseña
         logger.info(f"🔐 Verifying password for user: {user.email}")
         try:
-            password_valid = verify_password(user.password, db_user["password"])
-            if not password_valid:
-                logger.warning(f"❌ Invalid password for user: {user.email}")
-                raise HTTPException(status_code=401, detail="Incorrect email or password")
-            
-            logger.info(f"✅ Password verified for user: {user.email}")
+            password_valid, new_hash = await password_hasher.verify_and_update(user.password, db_user["password"])
+        except PasswordHasherBusy:
+            logger.warning(f"⏳ Password hasher saturated, rejecting login for: {user.email}")
+            raise auth_service_busy()
         except Exception as e:
             logger.error(f"❌ Password verification error: {e}")
             raise HTTPException(status_code=500, detail="Password verification error")
         
+        if not password_valid:
+            logger.warning(f"❌ Invalid password for user: {user.email}")
+            raise HTTPException(status_code=401, detail="Incorrect email or password")
+        
+        logger.info(f"✅ Password verified for user: {user.email}")
+        
+        # Actualizar el hash si se creó con un coste bcrypt anterior
+        if new_hash:
+            await database.users.update_one(
+                {"_id": db_user["_id"], "password": db_user["password"]},
+                {"$set": {"password": new_hash}}
+            )
+            invalidate_cached_user(db_user["_id"])
+            logger.info(f"🔁 Password rehashed with current cost for user: {user.email}")
+        
         # Crear token JWT
         logger.info(f"🎫 Creating JWT token for user: {user.email}")
         try:
-            access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-            access_token = create_access_token(
-                data={"sub": str(db_user["_id"])}, expires_delta=access_token_expires
-            )
+            access_token = create_user_token(db_user)
             logger.info(f"✅ JWT token created for user: {user.email}")
         except Exception as e:
             logger.error(f"❌ JWT creation error: {e}")
@@ -250,121 +407,219 @@ async def create_session(session: SesionTerapeutica, current_user: dict = Depend
         session_dict["created_at"] = datetime.utcnow()
         session_dict["updated_at"] = datetime.utcnow()
         session_dict["created_by"] = str(current_user["_id"])
+        # Marca de la sesión sin PDF: si el enqueue de abajo no llega a hacerse,
+        # el barrido de la cola encola el trabajo (ver session_jobs.sweep_pending_artifacts)
+        session_dict["artifacts_pending"] = True
         
         # Insertar en MongoDB
-        result = sessions_collection.insert_one(session_dict)
+        result = await database.sessions.insert_one(session_dict)
         session_id = str(result.inserted_id)
         
-        # Generar PDF
-        pdf_content = pdf_service.create_session_pdf(session_dict)
+        # Mantener las estadísticas materializadas del perfil y del dashboard. La sesión ya
+        # está guardada: un contador desfasado se repara con rebuild_stats.py, un 500 haría
+        # que el cliente reintentara y la duplicara
+        for update_stats in (record_session, dashboard_rollups.record_session):
+            try:
+                await update_stats(database.db, session_dict)
+            except Exception as e:
+                logger.error(f"Error updating stats for session {session_id}, run rebuild_stats.py: {e}")
         
-        if pdf_content and drive_service.service:
-            # Obtener o crear carpetas en Drive
-            folders = drive_service.get_or_create_user_folder(
-                session.codigo_usuaria, 
-                session.fundacion
-            )
-            
-            if folders:
-                # Subir PDF a Google Drive
-                filename = f"Sesion_{session.sesion_no}_{session.fecha}.pdf"
-                file_id = drive_service.upload_file(
-                    pdf_content,
-                    filename,
-                    folders['sesiones_folder_id']
-                )
-                
-                if file_id:
-                    # Actualizar la sesión con el ID del archivo en Drive
-                    sessions_collection.update_one(
-                        {"_id": ObjectId(session_id)},
-                        {
-                            "$set": {
-                                "drive_file_id": file_id,
-                                "drive_folder_id": folders['sesiones_folder_id'],
-                                "pdf_filename": filename
-                            }
-                        }
-                    )
-                    
-                    logger.info(f"Session {session_id} saved to Drive with file ID {file_id}")
+        # PDF y copia en Drive se generan en segundo plano (cola de trabajos). La sesión ya
+        # está guardada: un fallo aquí no debe provocar que el cliente la cree otra vez
+        try:
+            await enqueue_session_artifacts(database.db, session_id, session_dict["fundacion"])
+        except Exception as e:
+            logger.error(f"Error enqueueing artifacts for session {session_id}, left to the sweeper: {e}")
         
         return {
             "message": "Session created successfully", 
             "session_id": session_id,
-            "pdf_generated": pdf_content is not None
+            "artifacts_url": f"/api/sessions/{session_id}/artifacts"
         }
     except Exception as e:
         logger.error(f"Error creating session: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @app.get("/api/sessions")
-async def get_sessions(current_user: dict = Depends(get_current_user), codigo_usuaria: Optional[str] = None):
+async def get_sessions(
+    current_user: dict = Depends(get_current_user),
+    codigo_usuaria: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None
+):
     try:
+        # created_at siempre se proyecta: lo necesita el cursor de paginación
+        projection = parse_fields(fields, SESSION_PRESETS, SESSION_FIELDS, required=("created_at",))
         query = {"fundacion": current_user["fundacion"]}
         if codigo_usuaria:
             query["codigo_usuaria"] = codigo_usuaria
-            
-        sessions = list(sessions_collection.find(query).sort("created_at", -1))
-        
-        # Convertir ObjectId a string
-        for session in sessions:
-            session["_id"] = str(session["_id"])
-            if "created_at" in session:
-                session["created_at"] = session["created_at"].isoformat()
-            if "updated_at" in session:
-                session["updated_at"] = session["updated_at"].isoformat()
-            
-        return {"sessions": sessions}
+
+        try:
+            query = keyset_filter(query, cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        
+        # Pedir un documento extra para saber si hay otra página
+        sessions = await database.sessions.find(query, projection).sort(KEYSET_SORT).limit(limit + 1).to_list(length=limit + 1)
+        
+        next_cursor = None
+        if len(sessions) > limit:
+            sessions = sessions[:limit]
+            next_cursor = encode_cursor(sessions[-1])
+        
+        # ObjectId y fechas se serializan en MongoJSONResponse
+        return MongoJSONResponse({"sessions": sessions, "next_cursor": next_cursor})
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting sessions: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@app.get("/api/sessions/export")
+async def export_sessions(
+    current_user: dict = Depends(get_current_user),
+    format: str = "ndjson",
+    codigo_usuaria: Optional[str] = None,
+    fields: Optional[str] = None
+):
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format: {format}")
+    
+    projection = parse_fields(fields, SESSION_PRESETS, SESSION_FIELDS)
+    query = {"fundacion": current_user["fundacion"]}
+    if codigo_usuaria:
+        query["codigo_usuaria"] = codigo_usuaria
+    
+    cursor = database.sessions.find(query, projection).sort(KEYSET_SORT).batch_size(EXPORT_BATCH_SIZE)
+    filename = f"sesiones_{datetime.utcnow().strftime('%Y%m%d')}.ndjson"
+    
+    return StreamingResponse(
+        stream_ndjson(cursor),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+@app.get("/api/sessions/export/pdf")
+async def export_session_pdfs(current_user: dict = Depends(get_current_user), codigo_usuaria: Optional[str] = None):
+    """ZIP con el PDF de cada sesión de una usuaria o de toda la fundación"""
+    query = {"fundacion": current_user["fundacion"]}
+    if codigo_usuaria:
+        query["codigo_usuaria"] = codigo_usuaria
+    
+    total = await database.sessions.count_documents(query)
+    progress = pdf_export.create(current_user["fundacion"], total, codigo_usuaria)
+    
+    cursor = database.sessions.find(
+        query, {field: 1 for field in SESSION_PDF_FIELDS + ["pdf_blob"]}
+    ).sort(KEYSET_SORT).batch_size(EXPORT_BATCH_SIZE)
+    filename = f"sesiones_{codigo_usuaria or 'fundacion'}_{datetime.utcnow().strftime('%Y%m%d')}.zip"
+    
+    return StreamingResponse(
+        pdf_export.stream_zip(cursor, progress),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}",
+            # Para consultar el avance en GET /api/exports/{export_id}
+            "X-Export-Id": progress["export_id"],
+            "X-Export-Total": str(total)
+        }
+    )
+
+@app.get("/api/exports/{export_id}")
+async def get_export_progress(export_id: str, current_user: dict = Depends(get_current_user)):
+    progress = pdf_export.get(export_id, current_user["fundacion"])
+    if not progress:
+        raise HTTPException(status_code=404, detail="Export not found")
+    return MongoJSONResponse(progress)
+
 @app.get("/api/sessions/{session_id}")
 async def get_session(session_id: str, current_user: dict = Depends(get_current_user)):
     try:
-        session = sessions_collection.find_one({
+        session = await database.sessions.find_one({
             "_id": ObjectId(session_id), 
             "fundacion": current_user["fundacion"]
         })
         if not session:
             raise HTTPException(status_code=404, detail="Session not found")
-            
-        session["_id"] = str(session["_id"])
-        if "created_at" in session:
-            session["created_at"] = session["created_at"].isoformat()
-        if "updated_at" in session:
-            session["updated_at"] = session["updated_at"].isoformat()
         
-        return session
+        return MongoJSONResponse(session)
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error getting session: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+def pdf_response(pdf_content, filename, etag):
+    return Response(
+        content=pdf_content,
+        media_type="application/pdf",
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}",
+            "ETag": etag,
+            # El navegador puede guardarlo, pero debe revalidar con If-None-Match
+            "Cache-Control": "private, no-cache"
+        }
+    )
+
+def pdf_not_modified(etag):
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+
 @app.get("/api/sessions/{session_id}/pdf")
-async def download_session_pdf(session_id: str, current_user: dict = Depends(get_current_user)):
+async def download_session_pdf(
+    session_id: str,
+    if_none_match: Optional[str] = Header(None),
+    range_header: Optional[str] = Header(None, alias="Range"),
+    if_range: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_user)
+):
     try:
-        session = sessions_collection.find_one({
+        session = await database.sessions.find_one({
             "_id": ObjectId(session_id), 
             "fundacion": current_user["fundacion"]
         })
         if not session:
             raise HTTPException(status_code=404, detail="Session not found")
         
-        # Generar PDF en tiempo real si no está en Drive
-        pdf_content = pdf_service.create_session_pdf(session)
+        # El ETag identifica el blob almacenado; si el enlazado sigue vigente se responde
+        # 304 sin tocar el almacén
+        if is_current(session) and etag_matches(if_none_match, session_pdf_etag(session["pdf_blob"])):
+            return pdf_not_modified(session_pdf_etag(session["pdf_blob"]))
         
-        if not pdf_content:
+        # PDF persistido; solo se renderiza si falta o la sesión/plantilla cambió
+        pdf_blob, size = await open_session_pdf(session)
+        if not pdf_blob:
             raise HTTPException(status_code=500, detail="Error generating PDF")
         
-        filename = f"Sesion_{session.get('sesion_no', 'unknown')}_{session.get('fecha', 'unknown')}.pdf"
+        etag = session_pdf_etag(pdf_blob)
+        headers = {
+            "Content-Disposition": f"attachment; filename={session_pdf_filename(session)}",
+            "ETag": etag,
+            "Cache-Control": "private, no-cache",
+            "Accept-Ranges": "bytes"
+        }
+        
+        byte_range = None
+        if range_header and (not if_range or if_range == etag):
+            try:
+                byte_range = parse_byte_range(range_header, size)
+            except RangeNotSatisfiable:
+                raise HTTPException(
+                    status_code=416, detail="Range not satisfiable", headers={"Content-Range": f"bytes */{size}"}
+                )
+        
+        if byte_range is None:
+            headers["Content-Length"] = str(size)
+            return StreamingResponse(blob_store.stream(pdf_blob["id"]), media_type="application/pdf", headers=headers)
         
-        return Response(
-            content=pdf_content,
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        headers["Content-Length"] = str(end - start + 1)
+        return StreamingResponse(
+            blob_store.stream(pdf_blob["id"], start, end),
+            status_code=206,
             media_type="application/pdf",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
+            headers=headers
         )
     except HTTPException:
         raise
@@ -372,12 +627,66 @@ async def download_session_pdf(session_id: str, current_user: dict = Depends(get
         logger.error(f"Error downloading session PDF: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@app.get("/api/sessions/{session_id}/artifacts")
+async def get_session_artifacts(session_id: str, current_user: dict = Depends(get_current_user)):
+    """Estado del PDF y de la copia en Drive de una sesión"""
+    try:
+        session = await database.sessions.find_one(
+            {"_id": ObjectId(session_id), "fundacion": current_user["fundacion"]},
+            {"pdf_blob": 1, "drive_file_id": 1, "drive_folder_id": 1}
+        )
+        if not session:
+            raise HTTPException(status_code=404, detail="Session not found")
+        
+        # Último trabajo de cada tipo para esta sesión
+        jobs = {}
+        cursor = database.db.jobs.find(
+            {"payload.session_id": session_id},
+            {"type": 1, "status": 1, "attempts": 1, "max_attempts": 1, "last_error": 1, "run_at": 1, "updated_at": 1}
+        ).sort("created_at", -1)
+        async for job in cursor:
+            jobs.setdefault(job["type"], job)
+        
+        pdf_job = jobs.get(RENDER_SESSION_PDF)
+        drive_job = jobs.get(UPLOAD_SESSION_PDF)
+        pdf_blob = session.get("pdf_blob")
+        
+        if session.get("drive_file_id"):
+            drive_status = "uploaded"
+        elif drive_job:
+            drive_status = drive_job["status"]
+        elif not drive_service.service:
+            drive_status = "not_configured"
+        else:
+            drive_status = "pending"
+        
+        return MongoJSONResponse({
+            "session_id": session_id,
+            "pdf": {
+                "status": "ready" if pdf_blob else (pdf_job["status"] if pdf_job else "missing"),
+                "size": pdf_blob.get("size") if pdf_blob else None,
+                "template_version": pdf_blob.get("template_version") if pdf_blob else None,
+                "job": pdf_job
+            },
+            "drive": {
+                "status": drive_status,
+                "file_id": session.get("drive_file_id"),
+                "folder_id": session.get("drive_folder_id"),
+                "job": drive_job
+            }
+        })
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting session artifacts: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 # Rutas de perfiles
 @app.post("/api/profiles")
 async def create_profile(profile: ProfileCreate, current_user: dict = Depends(get_current_user)):
     try:
         # Verificar que no exista el código de usuaria
-        existing_profile = profiles_collection.find_one({
+        existing_profile = await database.profiles.find_one({
             "codigo_usuaria": profile.codigo_usuaria,
             "fundacion": profile.fundacion
         })
@@ -388,17 +697,20 @@ async def create_profile(profile: ProfileCreate, current_user: dict = Depends(ge
         profile_dict["created_at"] = datetime.utcnow()
         profile_dict["updated_at"] = datetime.utcnow()
         profile_dict["created_by"] = str(current_user["_id"])
+        profile_dict["total_sessions"] = 0
         
-        result = profiles_collection.insert_one(profile_dict)
+        result = await database.profiles.insert_one(profile_dict)
+        await dashboard_rollups.record_profile(database.db, profile_dict)
         
-        # Crear estructura de carpetas en Drive
+        # Crear estructura de carpetas en Drive (llamadas bloqueantes, fuera del event loop)
         if drive_service.service:
-            folders = drive_service.get_or_create_user_folder(
-                profile.codigo_usuaria, 
+            folders = await asyncio.to_thread(
+                drive_service.get_or_create_user_folder,
+                profile.codigo_usuaria,
                 profile.fundacion
             )
             if folders:
-                profiles_collection.update_one(
+                await database.profiles.update_one(
                     {"_id": result.inserted_id},
                     {"$set": {"drive_folders": folders}}
                 )
@@ -411,71 +723,63 @@ async def create_profile(profile: ProfileCreate, current_user: dict = Depends(ge
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @app.get("/api/profiles")
-async def get_profiles(current_user: dict = Depends(get_current_user)):
+async def get_profiles(current_user: dict = Depends(get_current_user), fields: Optional[str] = None):
     try:
-        profiles = list(profiles_collection.find({"fundacion": current_user["fundacion"]}).sort("created_at", -1))
-        
-        # Convertir ObjectId a string y agregar estadísticas
-        for profile in profiles:
-            profile["_id"] = str(profile["_id"])
-            if "created_at" in profile:
-                profile["created_at"] = profile["created_at"].isoformat()
-            if "updated_at" in profile:
-                profile["updated_at"] = profile["updated_at"].isoformat()
-            
-            # Agregar conteo de sesiones
-            session_count = sessions_collection.count_documents({
-                "codigo_usuaria": profile["codigo_usuaria"],
-                "fundacion": current_user["fundacion"]
-            })
-            profile["total_sessions"] = session_count
-            
-            # Última sesión
-            last_session = sessions_collection.find_one(
-                {
-                    "codigo_usuaria": profile["codigo_usuaria"],
-                    "fundacion": current_user["fundacion"]
-                },
-                sort=[("created_at", -1)]
-            )
-            if last_session:
-                profile["last_session_date"] = last_session["fecha"]
+        projection = parse_fields(fields, PROFILE_PRESETS, PROFILE_FIELDS, required=("codigo_usuaria",))
+        profiles = await database.profiles.find({"fundacion": current_user["fundacion"]}, projection).sort("created_at", -1).to_list(length=None)
+        
+        # Las estadísticas ya vienen materializadas en el perfil; solo se completan si se pidieron
+        if projection is None or "total_sessions" in projection:
+            for profile in profiles:
+                profile.setdefault("total_sessions", 0)
             
-        return {"profiles": profiles}
+        return MongoJSONResponse({"profiles": profiles})
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting profiles: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@app.get("/api/profiles/export")
+async def export_profiles(current_user: dict = Depends(get_current_user), format: str = "ndjson"):
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format: {format}")
+    
+    cursor = database.profiles.find(
+        {"fundacion": current_user["fundacion"]}
+    ).sort("created_at", -1).batch_size(EXPORT_BATCH_SIZE)
+    filename = f"perfiles_{datetime.utcnow().strftime('%Y%m%d')}.ndjson"
+    
+    return StreamingResponse(
+        stream_ndjson(cursor),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
 @app.get("/api/profiles/{profile_id}")
-async def get_profile(profile_id: str, current_user: dict = Depends(get_current_user)):
+async def get_profile(
+    profile_id: str,
+    current_user: dict = Depends(get_current_user),
+    session_fields: Optional[str] = None
+):
     try:
-        profile = profiles_collection.find_one({
+        session_projection = parse_fields(session_fields, SESSION_PRESETS, SESSION_FIELDS)
+        profile = await database.profiles.find_one({
             "_id": ObjectId(profile_id), 
             "fundacion": current_user["fundacion"]
         })
         if not profile:
             raise HTTPException(status_code=404, detail="Profile not found")
-            
-        profile["_id"] = str(profile["_id"])
-        if "created_at" in profile:
-            profile["created_at"] = profile["created_at"].isoformat()
-        if "updated_at" in profile:
-            profile["updated_at"] = profile["updated_at"].isoformat()
-        
-        # Obtener sesiones del perfil
-        sessions = list(sessions_collection.find({
+        
+        # Obtener sesiones del perfil (proyectadas según session_fields)
+        sessions = await database.sessions.find({
             "codigo_usuaria": profile["codigo_usuaria"],
             "fundacion": current_user["fundacion"]
-        }).sort("created_at", -1))
-        
-        for session in sessions:
-            session["_id"] = str(session["_id"])
-            if "created_at" in session:
-                session["created_at"] = session["created_at"].isoformat()
+        }, session_projection).sort("created_at", -1).to_list(length=None)
         
         profile["sessions"] = sessions
         
-        return profile
+        return MongoJSONResponse(profile)
     except HTTPException:
         raise
     except Exception as e:
@@ -486,7 +790,7 @@ async def get_profile(profile_id: str, current_user: dict = Depends(get_current_
 async def update_profile(profile_id: str, profile_update: ProfileUpdate, current_user: dict = Depends(get_current_user)):
     try:
         # Verificar que el perfil existe y pertenece a la fundación
-        existing_profile = profiles_collection.find_one({
+        existing_profile = await database.profiles.find_one({
             "_id": ObjectId(profile_id),
             "fundacion": current_user["fundacion"]
         })
@@ -498,7 +802,7 @@ async def update_profile(profile_id: str, profile_update: ProfileUpdate, current
         update_data["updated_at"] = datetime.utcnow()
         
         # Actualizar el perfil
-        result = profiles_collection.update_one(
+        result = await database.profiles.update_one(
             {"_id": ObjectId(profile_id)},
             {"$set": update_data}
         )
@@ -506,6 +810,14 @@ async def update_profile(profile_id: str, profile_update: ProfileUpdate, current
         if result.modified_count == 0:
             raise HTTPException(status_code=400, detail="No changes made")
         
+        if "estado_caso" in update_data:
+            await dashboard_rollups.record_profile_state_change(
+                database.db,
+                current_user["fundacion"],
+                existing_profile.get("estado_caso"),
+                update_data["estado_caso"]
+            )
+        
         return {"message": "Profile updated successfully"}
     except HTTPException:
         raise
@@ -514,34 +826,58 @@ async def update_profile(profile_id: str, profile_update: ProfileUpdate, current
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @app.get("/api/profiles/{profile_id}/pdf")
-async def download_profile_pdf(profile_id: str, current_user: dict = Depends(get_current_user)):
+async def download_profile_pdf(
+    profile_id: str,
+    if_none_match: Optional[str] = Header(None),
+    full: bool = False,
+    current_user: dict = Depends(get_current_user)
+):
     try:
-        profile = profiles_collection.find_one({
+        profile = await database.profiles.find_one({
             "_id": ObjectId(profile_id), 
             "fundacion": current_user["fundacion"]
         })
         if not profile:
             raise HTTPException(status_code=404, detail="Profile not found")
         
-        # Obtener sesiones del perfil
-        sessions = list(sessions_collection.find({
-            "codigo_usuaria": profile["codigo_usuaria"],
-            "fundacion": current_user["fundacion"]
-        }).sort("created_at", -1))
+        if full:
+            # Expediente completo: el worker recorre las sesiones en lotes desde MongoDB
+            pdf_content = await pdf_executor.render_profile_dossier(profile["_id"], current_user["fundacion"])
+            if not pdf_content:
+                raise HTTPException(status_code=500, detail="Error generating PDF")
+            return Response(
+                content=pdf_content,
+                media_type="application/pdf",
+                headers={"Content-Disposition": f"attachment; filename=Expediente_{profile.get('codigo_usuaria', 'unknown')}.pdf"}
+            )
+        
+        # Obtener solo las sesiones y campos que aparecen en el historial del PDF
+        sessions = await database.sessions.find(
+            {
+                "codigo_usuaria": profile["codigo_usuaria"],
+                "fundacion": current_user["fundacion"]
+            },
+            {field: 1 for field in PROFILE_HISTORY_FIELDS}
+        ).sort(KEYSET_SORT).limit(PROFILE_HISTORY_LIMIT).to_list(length=None)
         
-        # Generar PDF del perfil
-        pdf_content = pdf_service.create_profile_pdf(profile, sessions)
+        key = profile_key(profile, sessions)
+        # Débil: la clave identifica los datos renderizados, no los bytes (otro render, tras una
+        # expulsión o en otro worker, cambia la fecha del pie y el ID del documento)
+        etag = f'W/"{key}"'
+        if etag_matches(if_none_match, etag):
+            return pdf_not_modified(etag)
         
-        if not pdf_content:
-            raise HTTPException(status_code=500, detail="Error generating PDF")
+        pdf_content = await pdf_cache.get(key)
+        if pdf_content is None:
+            # Generar PDF del perfil
+            pdf_content = await pdf_executor.render_profile(profile, sessions)
+            if not pdf_content:
+                raise HTTPException(status_code=500, detail="Error generating PDF")
+            await pdf_cache.put(key, pdf_content)
         
         filename = f"Perfil_{profile.get('codigo_usuaria', 'unknown')}.pdf"
         
-        return Response(
-            content=pdf_content,
-            media_type="application/pdf",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
-        )
+        return pdf_response(pdf_content, filename, etag)
     except HTTPException:
         raise
     except Exception as e:
@@ -552,45 +888,9 @@ async def download_profile_pdf(profile_id: str, current_user: dict = Depends(get
 @app.get("/api/dashboard/stats")
 async def get_dashboard_stats(current_user: dict = Depends(get_current_user)):
     try:
-        # Estadísticas básicas
-        total_profiles = profiles_collection.count_documents({"fundacion": current_user["fundacion"]})
-        total_sessions = sessions_collection.count_documents({"fundacion": current_user["fundacion"]})
-        active_profiles = profiles_collection.count_documents({
-            "fundacion": current_user["fundacion"],
-            "estado_caso": "activo"
-        })
-        
-        # Sesiones por mes (últimos 6 meses)
-        from datetime import datetime, timedelta
-        six_months_ago = datetime.utcnow() - timedelta(days=180)
-        
-        pipeline = [
-            {
-                "$match": {
-                    "fundacion": current_user["fundacion"],
-                    "created_at": {"$gte": six_months_ago}
-                }
-            },
-            {
-                "$group": {
-                    "_id": {
-                        "year": {"$year": "$created_at"},
-                        "month": {"$month": "$created_at"}
-                    },
-                    "count": {"$sum": 1}
-                }
-            },
-            {"$sort": {"_id.year": 1, "_id.month": 1}}
-        ]
-        
-        sessions_by_month = list(sessions_collection.aggregate(pipeline))
-        
-        return {
-            "total_profiles": total_profiles,
-            "total_sessions": total_sessions,
-            "active_profiles": active_profiles,
-            "sessions_by_month": sessions_by_month
-        }
+        # Servidas desde los rollups incrementales (con caché en memoria)
+        stats = await dashboard_rollups.get_stats(database.db, current_user["fundacion"])
+        return MongoJSONResponse(stats)
     except Exception as e:
         logger.error(f"Error getting dashboard stats: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -606,23 +906,18 @@ async def health_check():
         "checks": {}
     }
     
-    # Verificar base de datos
-    try:
-        client.admin.command('ping')
-        user_count = users_collection.count_documents({})
-        admin_exists = users_collection.find_one({"rol": "admin"}) is not None
-        
-        health_status["checks"]["database"] = {
-            "status": "connected",
-            "user_count": user_count,
-            "admin_exists": admin_exists
-        }
-    except Exception as e:
+    # Estado de la base de datos publicado por el monitor en segundo plano
+    db_state = health_monitor.snapshot()
+    health_status["checks"]["database"] = {
+        "status": db_state["status"],
+        "latency_ms": db_state["latency_ms"],
+        "last_checked": db_state["last_checked"],
+        "user_count": db_state["user_count"],
+        "admin_exists": db_state["admin_exists"]
+    }
+    if not health_monitor.is_ready:
         health_status["status"] = "degraded"
-        health_status["checks"]["database"] = {
-            "status": "error",
-            "error": str(e)
-        }
+        health_status["checks"]["database"]["error"] = db_state["last_error"] or "stale health state"
     
     # Verificar variables de entorno críticas
     env_checks = {
@@ -641,6 +936,134 @@ async def health_check():
     
     return health_status
 
+@app.get("/api/health/live")
+async def health_live():
+    """Liveness: el proceso responde (no consulta la base de datos)"""
+    return {"status": "alive", "timestamp": datetime.utcnow()}
+
+@app.get("/api/health/ready")
+async def health_ready():
+    """Readiness: según el último sondeo del monitor de base de datos"""
+    db_state = health_monitor.snapshot()
+    return MongoJSONResponse(
+        {"status": "ready" if health_monitor.is_ready else "not_ready", "database": db_state},
+        status_code=200 if health_monitor.is_ready else 503
+    )
+
+# Verificación de índices
+@app.get("/api/admin/indexes/explain")
+async def explain_indexes(current_user: dict = Depends(require_admin)):
+    """Ejecutar explain() sobre las consultas críticas y marcar COLLSCAN"""
+    try:
+        report = await explain_hot_queries(database.db, current_user["fundacion"])
+        return {
+            "queries": report,
+            "collscan_count": sum(1 for query in report if query["collscan"])
+        }
+    except Exception as e:
+        logger.error(f"Error explaining hot queries: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+# Administración de usuarios
+@app.post("/api/admin/users/{user_id}/deactivate")
+async def deactivate_user(user_id: str, current_user: dict = Depends(require_admin)):
+    try:
+        user = await database.users.find_one_and_update(
+            {"_id": ObjectId(user_id), "fundacion": current_user["fundacion"]},
+            {
+                "$set": {"active": False, "updated_at": datetime.utcnow()},
+                "$inc": {"token_version": 1}
+            },
+            projection={"token_version": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if user is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        
+        # Revocar de inmediato en este proceso; los demás lo verán en el próximo refresco
+        revocation_list.revoke(user_id)
+        revocation_list.revoke(user_id, user["token_version"])
+        invalidate_cached_user(user_id)
+        return {"message": "User deactivated successfully"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error deactivating user: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+# Cola de trabajos: consulta y reintento de trabajos muertos
+@app.get("/api/admin/jobs")
+async def list_jobs(current_user: dict = Depends(require_admin), status: str = "dead", limit: int = Query(50, ge=1, le=200)):
+    try:
+        jobs = await database.db.jobs.find(
+            {"status": status, "payload.fundacion": current_user["fundacion"]}
+        ).sort("updated_at", -1).limit(limit).to_list(length=limit)
+        return MongoJSONResponse({"jobs": jobs})
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error listing jobs: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@app.post("/api/admin/jobs/{job_id}/retry")
+async def retry_job(job_id: str, current_user: dict = Depends(require_admin)):
+    try:
+        if not ObjectId.is_valid(job_id):
+            raise HTTPException(status_code=404, detail="Dead job not found")
+        job = await database.db.jobs.find_one(
+            {"_id": ObjectId(job_id), "payload.fundacion": current_user["fundacion"]}, {"_id": 1}
+        )
+        if not job or not await job_queue.retry_dead(database.db, job["_id"]):
+            raise HTTPException(status_code=404, detail="Dead job not found")
+        return {"message": "Job queued for retry"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error retrying job {job_id}: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+# Aprovisionamiento en bloque de las carpetas de Drive de los perfiles que no las tienen
+@app.post("/api/admin/drive/provision")
+async def provision_drive_folders(current_user: dict = Depends(require_admin)):
+    if not drive_service.service:
+        raise HTTPException(status_code=503, detail="Google Drive service not available")
+    try:
+        fundacion = current_user["fundacion"]
+        codigos = await database.profiles.distinct(
+            "codigo_usuaria", {"fundacion": fundacion, "drive_folders.sesiones_folder_id": {"$exists": False}}
+        )
+        provisioned = await asyncio.to_thread(drive_service.provision_user_folders, fundacion, codigos)
+        if provisioned:
+            await database.profiles.bulk_write([
+                UpdateOne({"fundacion": fundacion, "codigo_usuaria": codigo}, {"$set": {"drive_folders": folders}})
+                for codigo, folders in provisioned.items()
+            ], ordered=False)
+        return {"provisioned": len(provisioned), "failed": len(codigos) - len(provisioned)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error provisioning Drive folders: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+# Métricas internas
+@app.get("/api/admin/metrics")
+async def get_metrics(current_user: dict = Depends(require_admin)):
+    return {
+        "user_cache": user_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "token_revocation": revocation_list.stats(),
+        "pdf_executor": pdf_executor.stats(),
+        "pdf_cache": pdf_cache.stats(),
+        "pdf_export": pdf_export.stats(),
+        "drive_folder_cache": folder_cache.stats(),
+        "drive_service": drive_service.stats(),
+        "job_queue": {**job_queue.stats(), "jobs": await job_queue.counts(database.db)},
+        "rate_limits": {
+            "login": login_limiter.stats(),
+            "register": register_limiter.stats()
+        }
+    }
+
 # Endpoint de debug para login
 @app.post("/api/debug/test-login")
 async def debug_test_login():
@@ -650,12 +1073,12 @@ async def debug_test_login():
     try:
         # Paso 1: Verificar conexión DB
         steps.append({"step": 1, "description": "Testing database connection"})
-        client.admin.command('ping')
+        await database.ping()
         steps.append({"step": 1, "status": "success"})
         
         # Paso 2: Buscar usuario
         steps.append({"step": 2, "description": "Finding user admin@registrovioleta.org"})
-        user = users_collection.find_one({"email": "admin@registrovioleta.org"})
+        user = await database.users.find_one({"email": "admin@registrovioleta.org"})
         
         if not user:
             steps.append({"step": 2, "status": "failed", "error": "User not found"})
@@ -665,7 +1088,7 @@ async def debug_test_login():
         
         # Paso 3: Verificar contraseña
         steps.append({"step": 3, "description": "Verifying password"})
-        password_valid = verify_password("RegistroVioleta2025!", user["password"])
+        password_valid, _ = await password_hasher.verify_and_update("RegistroVioleta2025!", user["password"])
         
         if not password_valid:
             steps.append({"step": 3, "status": "failed", "error": "Invalid password"})
@@ -716,7 +1139,7 @@ async def debug_test_login():
 
 # Ruta para obtener información del usuario actual
 @app.get("/api/auth/me")
-async def get_current_user_info(current_user: dict = Depends(get_current_user)):
+async def get_current_user_info(current_user: dict = Depends(get_current_user_record)):
     return {
         "id": str(current_user["_id"]),
         "email": current_user["email"],
@@ -0,0 +1,142 @@
+import os
+import uuid
+import asyncio
+import logging
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+from gridfs.errors import NoFile
+
+logger = logging.getLogger(__name__)
+
+# Tamaño de los trozos al servir un blob (y de los chunks de GridFS)
+BLOB_CHUNK_SIZE = 255 * 1024
+
+class BlobNotFound(Exception):
+    pass
+
+class GridFSBlobStore:
+    """Blobs en GridFS, dentro de la misma base de datos de la aplicación"""
+
+    name = "gridfs"
+
+    def __init__(self, bucket_name):
+        self.bucket_name = bucket_name
+        self._bucket = None
+
+    def bucket(self):
+        # Se crea al primer uso: database.db no existe hasta que arranca la aplicación
+        if self._bucket is None:
+            from services.database import database
+            self._bucket = AsyncIOMotorGridFSBucket(
+                database.db, bucket_name=self.bucket_name, chunk_size_bytes=BLOB_CHUNK_SIZE
+            )
+        return self._bucket
+
+    async def put(self, data, filename, metadata=None):
+        blob_id = await self.bucket().upload_from_stream(filename, data, metadata=metadata or {})
+        return str(blob_id)
+
+    async def size(self, blob_id):
+        try:
+            grid_out = await self.bucket().open_download_stream(ObjectId(blob_id))
+        except NoFile:
+            raise BlobNotFound(blob_id)
+        return grid_out.length
+
+    async def stream(self, blob_id, start=0, end=None, chunk_size=BLOB_CHUNK_SIZE):
+        """Emitir los bytes [start, end] (inclusive) en trozos"""
+        try:
+            grid_out = await self.bucket().open_download_stream(ObjectId(blob_id))
+        except NoFile:
+            raise BlobNotFound(blob_id)
+        end = grid_out.length - 1 if end is None else end
+        grid_out.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await grid_out.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+    async def read(self, blob_id):
+        return b"".join([chunk async for chunk in self.stream(blob_id)])
+
+    async def delete(self, blob_id):
+        try:
+            await self.bucket().delete(ObjectId(blob_id))
+        except NoFile:
+            pass
+
+class LocalBlobStore:
+    """Blobs como archivos en un directorio local (un solo servidor o volumen compartido)"""
+
+    name = "local"
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, blob_id):
+        # Los ids son hex generados aquí; se valida para no salir del directorio
+        if not blob_id.isalnum():
+            raise BlobNotFound(blob_id)
+        return os.path.join(self.directory, blob_id)
+
+    def _write(self, blob_id, data):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self._path(blob_id) + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, self._path(blob_id))
+
+    def _read_range(self, blob_id, start, length):
+        with open(self._path(blob_id), "rb") as f:
+            f.seek(start)
+            return f.read(length)
+
+    async def put(self, data, filename, metadata=None):
+        blob_id = uuid.uuid4().hex
+        await asyncio.to_thread(self._write, blob_id, data)
+        return blob_id
+
+    async def size(self, blob_id):
+        try:
+            return await asyncio.to_thread(os.path.getsize, self._path(blob_id))
+        except FileNotFoundError:
+            raise BlobNotFound(blob_id)
+
+    async def stream(self, blob_id, start=0, end=None, chunk_size=BLOB_CHUNK_SIZE):
+        end = await self.size(blob_id) - 1 if end is None else end
+        position = start
+        while position <= end:
+            try:
+                chunk = await asyncio.to_thread(
+                    self._read_range, blob_id, position, min(chunk_size, end - position + 1)
+                )
+            except FileNotFoundError:
+                raise BlobNotFound(blob_id)
+            if not chunk:
+                break
+            position += len(chunk)
+            yield chunk
+
+    async def read(self, blob_id):
+        return b"".join([chunk async for chunk in self.stream(blob_id)])
+
+    async def delete(self, blob_id):
+        try:
+            await asyncio.to_thread(os.remove, self._path(blob_id))
+        except (FileNotFoundError, BlobNotFound):
+            pass
+
+def create_blob_store():
+    backend = os.getenv("PDF_BLOB_STORE", "gridfs")
+    if backend == "local":
+        return LocalBlobStore(os.getenv("PDF_BLOB_DIR", "pdf_blobs"))
+    if backend != "gridfs":
+        logger.warning(f"Unknown PDF_BLOB_STORE '{backend}', using gridfs")
+    return GridFSBlobStore(os.getenv("PDF_BLOB_BUCKET", "session_pdfs"))
+
+# Almacén global de PDFs de sesiones
+blob_store = create_blob_store()
@@ -0,0 +1,37 @@
+class RangeNotSatisfiable(Exception):
+    pass
+
+def parse_byte_range(header, size):
+    """Interpretar una cabecera Range de un solo rango; devuelve (inicio, fin) inclusivo
+
+    Devuelve None si no hay rango aplicable (se sirve el documento completo, como
+    permite RFC 9110 para rangos múltiples o mal formados, incluido fin < inicio) y
+    lanza RangeNotSatisfiable si el rango queda fuera del documento.
+    """
+    if not header or not header.startswith("bytes="):
+        return None
+    spec = header[len("bytes="):].strip()
+    if "," in spec:
+        return None
+
+    first, separator, last = spec.partition("-")
+    if not separator:
+        return None
+    try:
+        if first == "":
+            # Sufijo: los últimos N bytes
+            length = int(last)
+            if length <= 0:
+                raise RangeNotSatisfiable(header)
+            return max(0, size - length), size - 1
+        start = int(first)
+        end = int(last) if last else None
+    except ValueError:
+        return None
+
+    if start < 0 or (end is not None and end < start):
+        # Rango inválido (no insatisfacible): se ignora
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable(header)
+    return start, size - 1 if end is None else min(end, size - 1)
@@ -0,0 +1,196 @@
+import os
+from datetime import datetime, timedelta
+import logging
+
+from pymongo import ReplaceOne
+from pymongo.errors import BulkWriteError
+
+from services.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_KEY = [("fundacion", 1), ("year", 1), ("month", 1)]
+
+class DashboardRollups:
+    """Rollups mensuales por fundación para /api/dashboard/stats
+
+    Cada documento de `dashboard_rollups` (fundacion, year, month) guarda deltas:
+    sesiones creadas, perfiles creados y cambio neto de perfiles activos en ese mes.
+    Los totales de la fundación son la suma de todos sus meses.
+    """
+
+    def __init__(self):
+        self.cache = TTLCache(
+            maxsize=256,
+            ttl=int(os.getenv("DASHBOARD_CACHE_TTL", 30))
+        )
+
+    async def _increment(self, db, fundacion, when, **deltas):
+        """Aplicar deltas al rollup del mes correspondiente"""
+        await db.dashboard_rollups.update_one(
+            {"fundacion": fundacion, "year": when.year, "month": when.month},
+            {"$inc": deltas, "$set": {"updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+        self.cache.invalidate(fundacion)
+
+    async def record_session(self, db, session_dict):
+        """Contabilizar una sesión nueva"""
+        await self._increment(db, session_dict["fundacion"], session_dict["created_at"], sessions=1)
+
+    async def record_profile(self, db, profile_dict):
+        """Contabilizar un perfil nuevo"""
+        active = 1 if profile_dict.get("estado_caso") == "activo" else 0
+        await self._increment(
+            db, profile_dict["fundacion"], profile_dict["created_at"],
+            profiles=1, active_profiles=active
+        )
+
+    async def record_profile_state_change(self, db, fundacion, old_state, new_state):
+        """Ajustar los perfiles activos cuando cambia el estado del caso"""
+        delta = (new_state == "activo") - (old_state == "activo")
+        if delta:
+            await self._increment(db, fundacion, datetime.utcnow(), active_profiles=delta)
+
+    async def get_stats(self, db, fundacion):
+        """Estadísticas del dashboard servidas desde los rollups (con caché TTL)"""
+        stats = self.cache.get(fundacion)
+        if stats is not None:
+            return stats
+
+        rollups = await db.dashboard_rollups.find(
+            {"fundacion": fundacion}
+        ).sort([("year", 1), ("month", 1)]).to_list(length=None)
+
+        six_months_ago = datetime.utcnow() - timedelta(days=180)
+        first_month = (six_months_ago.year, six_months_ago.month)
+
+        stats = {
+            "total_profiles": sum(r.get("profiles", 0) for r in rollups),
+            "total_sessions": sum(r.get("sessions", 0) for r in rollups),
+            "active_profiles": sum(r.get("active_profiles", 0) for r in rollups),
+            "sessions_by_month": [
+                {"_id": {"year": r["year"], "month": r["month"]}, "count": r["sessions"]}
+                for r in rollups
+                if r.get("sessions", 0) > 0 and (r["year"], r["month"]) >= first_month
+            ]
+        }
+
+        self.cache.set(fundacion, stats)
+        return stats
+
+    async def _require_unique_index(self, db):
+        """Sin el índice único, un upsert condicional que no coincide inserta un segundo
+        documento para el mes en lugar de chocar, y los totales se duplican"""
+        indexes = await db.dashboard_rollups.index_information()
+        if not any(
+            info.get("unique") and [(field, int(order)) for field, order in info["key"]] == ROLLUP_KEY
+            for info in indexes.values()
+        ):
+            raise RuntimeError(
+                "dashboard_rollups needs the unique index fundacion_year_month_unique; run ensure_indexes first"
+            )
+
+    async def rebuild(self, db, fundacion=None):
+        """Reconstruir los rollups a partir de los datos históricos
+
+        Cada mes se reemplaza con un upsert y después se borran solo los meses que ya no
+        existen; nunca queda una ventana con los rollups borrados.
+
+        El reemplazo es condicional: solo se aplica si el mes no recibió incrementos desde
+        que empezó la reconstrucción (updated_at anterior a started_at). Un record_session
+        que llega entre la agregación y la escritura no se pierde: ese mes conserva sus
+        incrementos y se informa como omitido (volver a ejecutar con menos escrituras si
+        hace falta repararlo). Las marcas de tiempo comparadas vienen de relojes distintos
+        si la reconstrucción corre en otra máquina; conviene que estén sincronizados.
+
+        Depende del índice único (fundacion, year, month): si no existe, falla antes de escribir.
+        """
+        await self._require_unique_index(db)
+        match = {"fundacion": fundacion} if fundacion else {}
+        started_at = datetime.utcnow()
+        month_key = {
+            "fundacion": "$fundacion",
+            "year": {"$year": "$created_at"},
+            "month": {"$month": "$created_at"}
+        }
+
+        rollups = {}
+
+        sessions_pipeline = [
+            {"$match": match},
+            {"$group": {"_id": month_key, "sessions": {"$sum": 1}}}
+        ]
+        async for row in db.sessions.aggregate(sessions_pipeline, allowDiskUse=True):
+            key = (row["_id"]["fundacion"], row["_id"]["year"], row["_id"]["month"])
+            rollups.setdefault(key, {})["sessions"] = row["sessions"]
+
+        # Los perfiles activos se atribuyen a su mes de creación: la suma sigue siendo exacta
+        profiles_pipeline = [
+            {"$match": match},
+            {
+                "$group": {
+                    "_id": month_key,
+                    "profiles": {"$sum": 1},
+                    "active_profiles": {
+                        "$sum": {"$cond": [{"$eq": ["$estado_caso", "activo"]}, 1, 0]}
+                    }
+                }
+            }
+        ]
+        async for row in db.profiles.aggregate(profiles_pipeline, allowDiskUse=True):
+            key = (row["_id"]["fundacion"], row["_id"]["year"], row["_id"]["month"])
+            rollups.setdefault(key, {}).update(
+                profiles=row["profiles"],
+                active_profiles=row["active_profiles"]
+            )
+
+        now = datetime.utcnow()
+        operations = [
+            ReplaceOne(
+                # Sin coincidencia (el mes cambió) el upsert choca con el índice único y se omite
+                {"fundacion": key[0], "year": key[1], "month": key[2], "updated_at": {"$lt": started_at}},
+                {
+                    "fundacion": key[0],
+                    "year": key[1],
+                    "month": key[2],
+                    "sessions": values.get("sessions", 0),
+                    "profiles": values.get("profiles", 0),
+                    "active_profiles": values.get("active_profiles", 0),
+                    "updated_at": now
+                },
+                upsert=True
+            )
+            for key, values in rollups.items()
+        ]
+        skipped = 0
+        if operations:
+            try:
+                await db.dashboard_rollups.bulk_write(operations, ordered=False)
+            except BulkWriteError as e:
+                errors = e.details.get("writeErrors", [])
+                if any(error.get("code") != 11000 for error in errors):
+                    raise
+                skipped = len(errors)
+
+        # Meses sin datos; los tocados durante la reconstrucción se conservan
+        stale_ids = [
+            doc["_id"]
+            async for doc in db.dashboard_rollups.find(
+                {**match, "updated_at": {"$lt": started_at}}, {"fundacion": 1, "year": 1, "month": 1}
+            )
+            if (doc["fundacion"], doc["year"], doc["month"]) not in rollups
+        ]
+        if stale_ids:
+            await db.dashboard_rollups.delete_many({"_id": {"$in": stale_ids}})
+
+        self.cache.clear()
+        if skipped:
+            logger.warning(f"Dashboard rollups: {skipped} months changed during the rebuild were kept as is")
+        logger.info(
+            f"Dashboard rollups rebuilt: {len(operations) - skipped} months, {len(stale_ids)} stale removed"
+        )
+        return len(operations) - skipped
+
+# Instancia global del servicio
+dashboard_rollups = DashboardRollups()
@@ -0,0 +1,63 @@
+import os
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Database:
+    """Capa de acceso asíncrono a MongoDB (Motor)"""
+
+    def __init__(self):
+        self.client = None
+        self.db = None
+        self.sync_client = None
+
+    def connect(self):
+        """Abrir el cliente de MongoDB (una vez por proceso)"""
+        if self.client is not None:
+            return
+
+        # Se lee aquí (y no en __init__) para respetar el .env cargado por server.py
+        mongo_url = os.getenv("MONGO_URL", "mongodb://localhost:27017/registro_violeta")
+        self.client = AsyncIOMotorClient(mongo_url)
+        self.db = self.client[os.getenv("MONGO_DB_NAME", "registro_violeta")]
+        logger.info("MongoDB async client initialized")
+
+    def close(self):
+        """Cerrar el cliente de MongoDB"""
+        if self.client is None:
+            return
+
+        self.client.close()
+        self.client = None
+        self.db = None
+        logger.info("MongoDB async client closed")
+
+    def sync_db(self):
+        """Base de datos con cliente pymongo síncrono para procesos sin event loop
+        (workers de PDF); se crea una vez por proceso"""
+        if self.sync_client is None:
+            mongo_url = os.getenv("MONGO_URL", "mongodb://localhost:27017/registro_violeta")
+            self.sync_client = MongoClient(mongo_url)
+        return self.sync_client[os.getenv("MONGO_DB_NAME", "registro_violeta")]
+
+    async def ping(self):
+        """Verificar la conexión con el servidor"""
+        return await self.client.admin.command('ping')
+
+    # Colecciones
+    @property
+    def users(self):
+        return self.db.users
+
+    @property
+    def sessions(self):
+        return self.db.sessions
+
+    @property
+    def profiles(self):
+        return self.db.profiles
+
+# Instancia global de la base de datos
+database = Database()
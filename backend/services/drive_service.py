@@ -1,16 +1,71 @@
 import os
+import time
+import random
+import hashlib
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+import httplib2
 from google.oauth2.service_account import Credentials
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload, MediaIoBaseUpload
+from googleapiclient.http import MediaFileUpload, MediaIoBaseUpload, build_http
+from googleapiclient.errors import HttpError
 from io import BytesIO
 import json
 import logging
 
+from services.folder_cache import folder_cache
+from services.upload_state import upload_state
+
 logger = logging.getLogger(__name__)
 
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+# Límite de llamadas por petición batch de la API de Drive
+BATCH_MAX_REQUESTS = 100
+# Subcarpetas de cada usuaria; son independientes y se crean en el mismo batch
+USER_SUBFOLDERS = ('Sesiones', 'Documentos')
+USER_FOLDER_KEYS = ('user_folder_id', 'sesiones_folder_id', 'documentos_folder_id')
+# Drive exige trozos de subida reanudable múltiplos de 256 KB
+UPLOAD_CHUNK_ALIGN = 256 * 1024
+# Respuestas y errores de red que se reintentan con backoff
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+TRANSPORT_ERRORS = (httplib2.HttpLib2Error, OSError)
+
+def upload_chunk_size():
+    size = int(os.getenv('DRIVE_UPLOAD_CHUNK_SIZE', 1024 * 1024))
+    return max(1, -(-size // UPLOAD_CHUNK_ALIGN)) * UPLOAD_CHUNK_ALIGN
+
+def folder_query(name, parent_folder_id=None):
+    escaped = name.replace('\\', '\\\\').replace("'", "\\'")
+    query = f"name='{escaped}' and mimeType='{FOLDER_MIME_TYPE}'"
+    if parent_folder_id:
+        query += f" and '{parent_folder_id}' in parents"
+    return query
+
 class GoogleDriveService:
     def __init__(self):
         self.service = None
+        self.credentials = None
+        # httplib2 no es seguro entre hilos: cada hilo usa su propia conexión (ver _http)
+        self._local = threading.local()
+        # (fundacion, codigo_usuaria) en provisión; codigo None para las carpetas compartidas
+        # de la fundación. Evita que dos hilos creen a la vez la misma carpeta (ver _claim)
+        self._provisioning = set()
+        self._provisioning_changed = threading.Condition()
+        self.upload_chunk_size = upload_chunk_size()
+        self.upload_max_retries = int(os.getenv('DRIVE_UPLOAD_MAX_RETRIES', 5))
+        self.upload_backoff_base = float(os.getenv('DRIVE_UPLOAD_BACKOFF_BASE', 1))
+        self.upload_backoff_max = float(os.getenv('DRIVE_UPLOAD_BACKOFF_MAX', 60))
+        # Pool pequeño para subir varios archivos en paralelo
+        self.upload_pool = ThreadPoolExecutor(
+            max_workers=int(os.getenv('DRIVE_UPLOAD_WORKERS', 3)),
+            thread_name_prefix='drive-upload'
+        )
+        self.batches = 0
+        self.batched_requests = 0
+        self.uploads = 0
+        self.upload_retries = 0
         self.setup_service()
     
     def setup_service(self):
@@ -32,6 +87,7 @@ class GoogleDriveService:
             )
             
             # Construir el servicio
+            self.credentials = credentials
             self.service = build('drive', 'v3', credentials=credentials)
             logger.info("Google Drive service initialized successfully")
             
@@ -54,98 +110,331 @@ class GoogleDriveService:
             if parent_folder_id:
                 folder_metadata['parents'] = [parent_folder_id]
             
-            folder = self.service.files().create(body=folder_metadata).execute()
+            folder = self._execute(self.service.files().create(body=folder_metadata, fields='id'))
             logger.info(f"Created folder: {name} with ID: {folder['id']}")
             return folder['id']
             
+        except HttpError as e:
+            self._forget_missing_parent(e, parent_folder_id)
+            logger.error(f"Error creating folder {name}: {e}")
+            return None
         except Exception as e:
             logger.error(f"Error creating folder {name}: {e}")
             return None
     
-    def upload_file(self, file_content, filename, parent_folder_id=None, mime_type='application/pdf'):
-        """Subir un archivo a Google Drive"""
+    def upload_file(self, file_content, filename, parent_folder_id=None, mime_type='application/pdf', upload_key=None):
+        """Subir un archivo a Google Drive con una subida reanudable por trozos
+        
+        Con `upload_key` el progreso se guarda en `drive_uploads`: un reintento tras una
+        caída continúa la subida (o recupera el ID si ya terminó) en vez de reenviarla.
+        """
         if not self.service:
             logger.error("Google Drive service not available")
             return None
         
+        digest = hashlib.sha256(file_content).hexdigest()
+        state = upload_state.get(upload_key, digest) if upload_key else None
+        if state and state.get('file_id'):
+            return state['file_id']
+        
         try:
-            file_metadata = {'name': filename}
-            if parent_folder_id:
-                file_metadata['parents'] = [parent_folder_id]
-            
-            # Crear media upload desde bytes
-            media = MediaIoBaseUpload(
-                BytesIO(file_content),
-                mimetype=mime_type
+            file_id = self._resumable_upload(
+                file_content, filename, parent_folder_id, mime_type, upload_key, digest, state
             )
-            
-            file = self.service.files().create(
-                body=file_metadata,
-                media_body=media
-            ).execute()
-            
-            logger.info(f"Uploaded file: {filename} with ID: {file['id']}")
-            return file['id']
-            
+        except HttpError as e:
+            self._forget_missing_parent(e, parent_folder_id)
+            logger.error(f"Error uploading file {filename}: {e}")
+            return None
         except Exception as e:
             logger.error(f"Error uploading file {filename}: {e}")
             return None
+        
+        if upload_key:
+            upload_state.complete(upload_key, digest, file_id)
+        self.uploads += 1
+        logger.info(f"Uploaded file: {filename} with ID: {file_id}")
+        return file_id
+    
+    def _upload_request(self, file_content, filename, parent_folder_id, mime_type):
+        file_metadata = {'name': filename}
+        if parent_folder_id:
+            file_metadata['parents'] = [parent_folder_id]
+        
+        media = MediaIoBaseUpload(
+            BytesIO(file_content),
+            mimetype=mime_type,
+            chunksize=self.upload_chunk_size,
+            resumable=True
+        )
+        return self.service.files().create(body=file_metadata, media_body=media, fields='id')
+    
+    def _upload_status(self, request, resumable_uri, size, http):
+        """Consultar a Drive el estado de una subida reanudable (PUT vacío con
+        `Content-Range: bytes */size`)
+        
+        Devuelve el recurso si la subida ya terminó; si no, deja `request` listo para
+        continuar desde el último byte que Drive confirmó.
+        """
+        resp, content = http.request(
+            resumable_uri, 'PUT', headers={'Content-Range': f'bytes */{size}', 'Content-Length': '0'}
+        )
+        if resp.status in (200, 201):
+            return request.postproc(resp, content)
+        if resp.status != 308:
+            raise HttpError(resp, content, uri=resumable_uri)
+        
+        request.resumable_uri = resp.get('location', resumable_uri)
+        request.resumable_progress = int(resp['range'].split('-')[1]) + 1 if 'range' in resp else 0
+        return None
     
-    def get_or_create_user_folder(self, codigo_usuaria, fundacion):
-        """Obtener o crear la estructura de carpetas para una usuaria"""
+    def _resumable_upload(self, file_content, filename, parent_folder_id, mime_type, upload_key, digest, state):
+        request = self._upload_request(file_content, filename, parent_folder_id, mime_type)
+        resume_uri = (state or {}).get('resumable_uri')
+        
+        http = self._http()
+        checkpoint = resume_uri, (state or {}).get('progress')
+        attempts = 0
+        response = None
+        while response is None:
+            try:
+                if resume_uri:
+                    # Reanudar la sesión guardada desde los bytes que Drive ya tiene
+                    response = self._upload_status(request, resume_uri, len(file_content), http)
+                    resume_uri = None
+                else:
+                    _, response = request.next_chunk(http=http)
+                attempts = 0
+            except (HttpError, *TRANSPORT_ERRORS) as e:
+                status = e.resp.status if isinstance(e, HttpError) else None
+                if (resume_uri or request.resumable_uri) and status in (404, 410):
+                    # La sesión de subida caducó: empezar de nuevo
+                    logger.warning(f"Upload session for {filename} expired, restarting")
+                    request = self._upload_request(file_content, filename, parent_folder_id, mime_type)
+                    resume_uri = None
+                    if upload_key:
+                        upload_state.discard(upload_key)
+                    checkpoint = None, None
+                elif isinstance(e, HttpError) and status not in RETRYABLE_STATUSES:
+                    raise
+                
+                attempts += 1
+                if attempts > self.upload_max_retries:
+                    raise
+                self.upload_retries += 1
+                delay = self.upload_backoff(attempts)
+                logger.warning(f"Upload of {filename} failed ({status or e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+            
+            if upload_key and response is None and request.resumable_uri and \
+                    (request.resumable_uri, request.resumable_progress) != checkpoint:
+                checkpoint = request.resumable_uri, request.resumable_progress
+                upload_state.save(upload_key, digest, *checkpoint, len(file_content))
+        return response['id']
+    
+    def upload_backoff(self, attempts):
+        delay = min(self.upload_backoff_max, self.upload_backoff_base * 2 ** (attempts - 1))
+        return delay * random.uniform(0.8, 1.2)
+    
+    def _forget_missing_parent(self, error, parent_folder_id):
+        """Un 404 al usar una carpeta como padre indica que se borró: invalidar su ID en caché"""
+        if parent_folder_id and isinstance(error, HttpError) and error.resp.status == 404:
+            folder_cache.invalidate_folder(parent_folder_id)
+    
+    def _http(self):
+        """Conexión HTTP del hilo actual (httplib2 no es seguro entre hilos)"""
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            # build_http no trata el 308 de las subidas reanudables como redirección
+            http = build_http()
+            if self.credentials:
+                http = AuthorizedHttp(self.credentials, http=http)
+            self._local.http = http
+        return http
+    
+    def _execute(self, request):
+        return request.execute(http=self._http())
+    
+    def _execute_batch(self, requests):
+        """Ejecutar {clave: HttpRequest} agrupadas en peticiones batch
+        
+        Devuelve {clave: respuesta} y, para las llamadas que fallan, {clave: excepción}.
+        """
+        results = {}
+        items = list(requests.items())
+        for start in range(0, len(items), BATCH_MAX_REQUESTS):
+            chunk = items[start:start + BATCH_MAX_REQUESTS]
+            
+            def callback(request_id, response, exception, chunk=chunk):
+                results[chunk[int(request_id)][0]] = exception if exception is not None else response
+            
+            batch = self.service.new_batch_http_request(callback=callback)
+            for index, (_, request) in enumerate(chunk):
+                batch.add(request, request_id=str(index))
+            batch.execute(http=self._http())
+            self.batches += 1
+            self.batched_requests += len(chunk)
+        return results
+    
+    def get_or_create_folders(self, keys, new_parents=()):
+        """Buscar o crear muchas carpetas (parent_id, name): un batch de búsquedas y otro de creaciones
+        
+        Las carpetas cuyo padre está en `new_parents` (recién creado) no se buscan.
+        Devuelve ({(parent_id, name): folder_id} con las que se resolvieron, IDs creados).
+        """
+        folders = {}
+        lookups = {}
+        creates = []
+        for parent_id, name in dict.fromkeys(keys):
+            cached_id = folder_cache.get(parent_id, name)
+            if cached_id:
+                folders[(parent_id, name)] = cached_id
+            elif parent_id in new_parents:
+                creates.append((parent_id, name))
+            else:
+                lookups[(parent_id, name)] = self.service.files().list(
+                    q=folder_query(name, parent_id), fields='files(id)'
+                )
+        
+        for key, response in self._execute_batch(lookups).items():
+            if isinstance(response, Exception):
+                self._forget_missing_parent(response, key[0])
+                logger.error(f"Error looking up folder {key[1]}: {response}")
+            elif response.get('files'):
+                folders[key] = response['files'][0]['id']
+            else:
+                creates.append(key)
+        
+        created = self._execute_batch({
+            (parent_id, name): self.service.files().create(
+                body={'name': name, 'mimeType': FOLDER_MIME_TYPE, 'parents': [parent_id]} if parent_id
+                else {'name': name, 'mimeType': FOLDER_MIME_TYPE},
+                fields='id'
+            )
+            for parent_id, name in creates
+        })
+        new_folder_ids = set()
+        for key, response in created.items():
+            if isinstance(response, Exception):
+                self._forget_missing_parent(response, key[0])
+                logger.error(f"Error creating folder {key[1]}: {response}")
+            else:
+                folders[key] = response['id']
+                new_folder_ids.add(response['id'])
+                logger.info(f"Created folder: {key[1]} with ID: {response['id']}")
+        
+        for (parent_id, name), folder_id in folders.items():
+            if (parent_id, name) in lookups or folder_id in new_folder_ids:
+                folder_cache.set(parent_id, name, folder_id)
+        return folders, new_folder_ids
+    
+    @contextmanager
+    def _claim(self, keys):
+        """Reservar a la vez todas las claves de `keys`, esperando a que ninguna esté en uso
+
+        Solo espera quien provisiona las mismas carpetas: una provisión masiva no bloquea a
+        las demás fundaciones ni a las subidas de otras usuarias. Al reservar todo o nada
+        no hay interbloqueos.
+        """
+        keys = set(keys)
+        with self._provisioning_changed:
+            self._provisioning_changed.wait_for(lambda: not keys & self._provisioning)
+            self._provisioning |= keys
+        try:
+            yield
+        finally:
+            with self._provisioning_changed:
+                self._provisioning -= keys
+                self._provisioning_changed.notify_all()
+    
+    def provision_user_folders(self, fundacion, codigos_usuaria):
+        """Obtener o crear en una pasada la estructura de carpetas de muchas usuarias
+        
+        Cada nivel del árbol (usuarias, subcarpetas) se resuelve con un batch de búsquedas
+        y otro de creaciones. Devuelve {codigo_usuaria: carpetas}; las que fallan no aparecen.
+        """
         if not self.service:
             logger.error("Google Drive service not available")
-            return None
+            return {}
         
+        codigos_usuaria = list(dict.fromkeys(codigos_usuaria))
         try:
-            # Buscar o crear carpeta principal de la fundación
-            fundacion_folder_id = self.get_or_create_folder(fundacion)
-            if not fundacion_folder_id:
-                return None
-            
-            # Buscar o crear carpeta "Usuarias"
-            usuarias_folder_id = self.get_or_create_folder("Usuarias", fundacion_folder_id)
-            if not usuarias_folder_id:
-                return None
-            
-            # Buscar o crear carpeta de la usuaria específica
-            user_folder_id = self.get_or_create_folder(codigo_usuaria, usuarias_folder_id)
-            if not user_folder_id:
-                return None
-            
-            # Crear subcarpetas
-            sesiones_folder_id = self.get_or_create_folder("Sesiones", user_folder_id)
-            documentos_folder_id = self.get_or_create_folder("Documentos", user_folder_id)
-            
-            return {
-                'user_folder_id': user_folder_id,
-                'sesiones_folder_id': sesiones_folder_id,
-                'documentos_folder_id': documentos_folder_id
-            }
+            with self._claim([(fundacion, None)]):
+                fundacion_folder_id = self.get_or_create_folder(fundacion)
+                if not fundacion_folder_id:
+                    return {}
+                usuarias_folder_id = self.get_or_create_folder("Usuarias", fundacion_folder_id)
+                if not usuarias_folder_id:
+                    return {}
             
+            with self._claim((fundacion, codigo) for codigo in codigos_usuaria):
+                user_folders, new_user_folder_ids = self.get_or_create_folders(
+                    [(usuarias_folder_id, codigo) for codigo in codigos_usuaria]
+                )
+                user_folder_ids = {
+                    codigo: user_folders[(usuarias_folder_id, codigo)]
+                    for codigo in codigos_usuaria if (usuarias_folder_id, codigo) in user_folders
+                }
+                # Las carpetas de usuaria recién creadas están vacías: sus subcarpetas no se buscan
+                subfolders, _ = self.get_or_create_folders(
+                    [(folder_id, name) for folder_id in user_folder_ids.values() for name in USER_SUBFOLDERS],
+                    new_user_folder_ids
+                )
         except Exception as e:
-            logger.error(f"Error managing user folder for {codigo_usuaria}: {e}")
+            logger.error(f"Error provisioning user folders for {fundacion}: {e}")
+            return {}
+        
+        provisioned = {}
+        for codigo, user_folder_id in user_folder_ids.items():
+            sesiones_folder_id = subfolders.get((user_folder_id, 'Sesiones'))
+            documentos_folder_id = subfolders.get((user_folder_id, 'Documentos'))
+            if sesiones_folder_id and documentos_folder_id:
+                provisioned[codigo] = {
+                    'user_folder_id': user_folder_id,
+                    'sesiones_folder_id': sesiones_folder_id,
+                    'documentos_folder_id': documentos_folder_id
+                }
+        return provisioned
+    
+    def get_or_create_user_folder(self, codigo_usuaria, fundacion, known_folders=None):
+        """Obtener o crear la estructura de carpetas para una usuaria
+        
+        `known_folders` son los IDs ya guardados en el perfil (`drive_folders`); si están
+        completos no se consulta Drive.
+        """
+        if not self.service:
+            logger.error("Google Drive service not available")
             return None
+        
+        if known_folders and all(known_folders.get(key) for key in USER_FOLDER_KEYS):
+            return known_folders
+        
+        return self.provision_user_folders(fundacion, [codigo_usuaria]).get(codigo_usuaria)
     
     def get_or_create_folder(self, folder_name, parent_folder_id=None):
         """Buscar una carpeta existente o crearla si no existe"""
         if not self.service:
             return None
         
+        cached_id = folder_cache.get(parent_folder_id, folder_name)
+        if cached_id:
+            return cached_id
+        
         try:
             # Buscar carpeta existente
-            query = f"name='{folder_name}' and mimeType='application/vnd.google-apps.folder'"
-            if parent_folder_id:
-                query += f" and '{parent_folder_id}' in parents"
-            
-            results = self.service.files().list(q=query).execute()
+            results = self._execute(self.service.files().list(
+                q=folder_query(folder_name, parent_folder_id), fields='files(id)'
+            ))
             items = results.get('files', [])
             
             if items:
-                return items[0]['id']
+                folder_id = items[0]['id']
             else:
                 # Crear nueva carpeta
-                return self.create_folder(folder_name, parent_folder_id)
+                folder_id = self.create_folder(folder_name, parent_folder_id)
+            
+            if folder_id:
+                folder_cache.set(parent_folder_id, folder_name, folder_id)
+            return folder_id
                 
         except Exception as e:
             logger.error(f"Error getting or creating folder {folder_name}: {e}")
@@ -157,10 +446,10 @@ class GoogleDriveService:
             return []
         
         try:
-            results = self.service.files().list(
+            results = self._execute(self.service.files().list(
                 q=f"'{folder_id}' in parents",
                 fields="files(id, name, mimeType, createdTime, modifiedTime)"
-            ).execute()
+            ))
             
             return results.get('files', [])
             
@@ -174,7 +463,7 @@ class GoogleDriveService:
             return False
         
         try:
-            self.service.files().delete(fileId=file_id).execute()
+            self._execute(self.service.files().delete(fileId=file_id))
             logger.info(f"Deleted file with ID: {file_id}")
             return True
             
@@ -189,10 +478,10 @@ class GoogleDriveService:
         
         try:
             # Hacer el archivo público
-            self.service.permissions().create(
+            self._execute(self.service.permissions().create(
                 fileId=file_id,
                 body={'role': 'reader', 'type': 'anyone'}
-            ).execute()
+            ))
             
             # Retornar el enlace de visualización
             return f"https://drive.google.com/file/d/{file_id}/view"
@@ -200,6 +489,15 @@ class GoogleDriveService:
         except Exception as e:
             logger.error(f"Error getting file link for {file_id}: {e}")
             return None
+    def stats(self):
+        return {
+            "available": self.service is not None,
+            "batches": self.batches,
+            "batched_requests": self.batched_requests,
+            "uploads": self.uploads,
+            "upload_retries": self.upload_retries,
+            "uploads_resumed": upload_state.stats()["resumed"]
+        }
 
 # Instancia global del servicio
 drive_service = GoogleDriveService()
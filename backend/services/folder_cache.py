@@ -0,0 +1,89 @@
+import os
+from datetime import datetime
+import logging
+
+from pymongo.errors import PyMongoError
+
+from services.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Padre usado para las carpetas en la raíz del Drive
+ROOT = "root"
+
+class DriveFolderCache:
+    """Caché de IDs de carpetas de Drive en dos niveles: LRU en memoria y colección `drive_folders`
+
+    La clave es (parent_id, name), la misma búsqueda que hace get_or_create_folder.
+    GoogleDriveService es síncrono (se usa desde hilos), así que el nivel persistente
+    usa el cliente pymongo síncrono.
+    """
+
+    def __init__(self):
+        self.memory = TTLCache(
+            maxsize=int(os.getenv("DRIVE_FOLDER_CACHE_SIZE", 4096)),
+            ttl=int(os.getenv("DRIVE_FOLDER_CACHE_TTL", 3600))
+        )
+        self.store_hits = 0
+        self.store_misses = 0
+
+    def collection(self):
+        from services.database import database
+        return database.sync_db().drive_folders
+
+    def get(self, parent_id, name):
+        key = (parent_id or ROOT, name)
+        folder_id = self.memory.get(key)
+        if folder_id is not None:
+            return folder_id
+
+        try:
+            doc = self.collection().find_one({"parent_id": key[0], "name": name}, {"folder_id": 1})
+        except PyMongoError as e:
+            logger.error(f"Error reading Drive folder cache: {e}")
+            return None
+        if doc is None:
+            self.store_misses += 1
+            return None
+
+        self.store_hits += 1
+        self.memory.set(key, doc["folder_id"])
+        return doc["folder_id"]
+
+    def set(self, parent_id, name, folder_id):
+        key = (parent_id or ROOT, name)
+        self.memory.set(key, folder_id)
+        try:
+            self.collection().update_one(
+                {"parent_id": key[0], "name": name},
+                {"$set": {"folder_id": folder_id, "updated_at": datetime.utcnow()}},
+                upsert=True
+            )
+        except PyMongoError as e:
+            logger.error(f"Error writing Drive folder cache: {e}")
+
+    def invalidate_folder(self, folder_id):
+        """Olvidar una carpeta que Drive ya no encuentra (404) y sus subcarpetas directas
+
+        Solo se borran esas claves; el resto de la caché (otras fundaciones) sigue vigente.
+        El nivel en memoria es de cada proceso: otro worker conserva el ID caducado hasta
+        que venza el TTL o hasta que su propio 404 lo invalide allí. Los IDs guardados en
+        los perfiles (`drive_folders`) los limpia quien los usó (ver session_jobs).
+        """
+        removed = self.memory.invalidate_where(lambda key, value: value == folder_id or key[0] == folder_id)
+        try:
+            # Ambas condiciones usan índices de drive_folders (folder_id y parent_name_unique)
+            self.collection().delete_many({"$or": [{"folder_id": folder_id}, {"parent_id": folder_id}]})
+        except PyMongoError as e:
+            logger.error(f"Error invalidating Drive folder {folder_id}: {e}")
+        logger.warning(f"Drive folder {folder_id} not found, {removed} cached entries invalidated")
+
+    def stats(self):
+        return {
+            "memory": self.memory.stats(),
+            "store_hits": self.store_hits,
+            "store_misses": self.store_misses
+        }
+
+# Instancia global de la caché de carpetas
+folder_cache = DriveFolderCache()
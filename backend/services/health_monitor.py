@@ -0,0 +1,91 @@
+import os
+import time
+import asyncio
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+class DatabaseHealthMonitor:
+    """Sondea MongoDB en segundo plano y publica el último estado conocido
+
+    Los endpoints de salud leen solo este estado en memoria; nunca tocan la base de datos.
+    """
+
+    def __init__(self):
+        self.interval = float(os.getenv("HEALTH_CHECK_INTERVAL", 10))
+        self.timeout = float(os.getenv("HEALTH_CHECK_TIMEOUT", 5))
+        self._task = None
+        self._last_probe = None
+        self.state = {
+            "status": "unknown",
+            "latency_ms": None,
+            "last_checked": None,
+            "last_error": None,
+            "user_count": None,
+            "admin_exists": None
+        }
+
+    async def probe(self, database):
+        """Un sondeo: ping + estadísticas ligeras de usuarios"""
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(database.ping(), timeout=self.timeout)
+            latency_ms = round((time.perf_counter() - started) * 1000, 2)
+            user_count = await database.users.estimated_document_count()
+            admin_exists = await database.users.find_one({"rol": "admin"}, {"_id": 1}) is not None
+
+            self.state = {
+                "status": "connected",
+                "latency_ms": latency_ms,
+                "last_checked": datetime.utcnow(),
+                "last_error": None,
+                "user_count": user_count,
+                "admin_exists": admin_exists
+            }
+        except Exception as e:
+            logger.error(f"Database health probe failed: {e}")
+            self.state = {
+                **self.state,
+                "status": "error",
+                "latency_ms": None,
+                "last_checked": datetime.utcnow(),
+                "last_error": str(e)
+            }
+        self._last_probe = time.monotonic()
+
+    async def _run(self, database):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.probe(database)
+
+    async def start(self, database):
+        """Primer sondeo síncrono y luego bucle en segundo plano"""
+        await self.probe(database)
+        self._task = asyncio.create_task(self._run(database))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @property
+    def is_stale(self):
+        """El estado no se ha refrescado en varios intervalos (bucle detenido o colgado)"""
+        if self._last_probe is None:
+            return True
+        return time.monotonic() - self._last_probe > self.interval * 3 + self.timeout
+
+    @property
+    def is_ready(self):
+        return self.state["status"] == "connected" and not self.is_stale
+
+    def snapshot(self):
+        return {**self.state, "stale": self.is_stale}
+
+# Instancia global del monitor
+health_monitor = DatabaseHealthMonitor()
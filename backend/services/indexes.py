@@ -0,0 +1,173 @@
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Registro declarativo de índices: colección -> lista de índices.
+# Cada índice lleva un nombre explícito para que create_index sea idempotente.
+INDEXES = {
+    "users": [
+        {"name": "email_unique", "keys": [("email", ASCENDING)], "unique": True},
+        {"name": "telegram_user_id", "keys": [("telegram_user_id", ASCENDING)], "sparse": True},
+    ],
+    "sessions": [
+        # Incluyen _id para servir la paginación por cursor (created_at, _id)
+        {
+            "name": "fundacion_codigo_created_at_id",
+            "keys": [
+                ("fundacion", ASCENDING),
+                ("codigo_usuaria", ASCENDING),
+                ("created_at", DESCENDING),
+                ("_id", DESCENDING),
+            ],
+        },
+        {
+            "name": "fundacion_created_at_id",
+            "keys": [("fundacion", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+        },
+        {"name": "created_by", "keys": [("created_by", ASCENDING)]},
+        # Solo las sesiones cuyo PDF aún no se generó (barrido de session_jobs)
+        {
+            "name": "artifacts_pending_created_at",
+            "keys": [("artifacts_pending", ASCENDING), ("created_at", ASCENDING)],
+            "partialFilterExpression": {"artifacts_pending": True},
+        },
+    ],
+    "profiles": [
+        {
+            "name": "fundacion_codigo_unique",
+            "keys": [("fundacion", ASCENDING), ("codigo_usuaria", ASCENDING)],
+            "unique": True,
+        },
+        {"name": "fundacion_created_at", "keys": [("fundacion", ASCENDING), ("created_at", DESCENDING)]},
+    ],
+    "dashboard_rollups": [
+        {
+            "name": "fundacion_year_month_unique",
+            "keys": [("fundacion", ASCENDING), ("year", ASCENDING), ("month", ASCENDING)],
+            "unique": True,
+        },
+    ],
+    "jobs": [
+        # Reclamar: trabajos en cola por run_at y concesiones vencidas por lease_until
+        {"name": "status_run_at", "keys": [("status", ASCENDING), ("run_at", ASCENDING)]},
+        {"name": "status_lease_until", "keys": [("status", ASCENDING), ("lease_until", ASCENDING)]},
+        {"name": "payload_session_id", "keys": [("payload.session_id", ASCENDING), ("created_at", DESCENDING)]},
+        # Los trabajos completados se purgan a los 7 días; los muertos se conservan
+        {
+            "name": "succeeded_finished_at_ttl",
+            "keys": [("finished_at", ASCENDING)],
+            "expireAfterSeconds": 7 * 24 * 3600,
+            "partialFilterExpression": {"status": "succeeded"},
+        },
+    ],
+    "drive_folders": [
+        # Caché persistente de IDs de carpetas de Drive: misma clave que la búsqueda en Drive
+        {"name": "parent_name_unique", "keys": [("parent_id", ASCENDING), ("name", ASCENDING)], "unique": True},
+        {"name": "folder_id", "keys": [("folder_id", ASCENDING)]},
+    ],
+    "drive_uploads": [
+        # Estado de subidas reanudables; las URIs de sesión de Drive caducan a la semana
+        {"name": "upload_key_unique", "keys": [("upload_key", ASCENDING)], "unique": True},
+        {"name": "updated_at_ttl", "keys": [("updated_at", ASCENDING)], "expireAfterSeconds": 7 * 24 * 3600},
+    ],
+    "voice_notes": [
+        {"name": "telegram_user_id", "keys": [("telegram_user_id", ASCENDING)]},
+    ],
+}
+
+async def ensure_indexes(db):
+    """Crear (si no existen) todos los índices del registro"""
+    results = {}
+
+    for collection_name, indexes in INDEXES.items():
+        collection = db[collection_name]
+        for index in indexes:
+            options = {k: v for k, v in index.items() if k != "keys"}
+            try:
+                await collection.create_index(index["keys"], **options)
+                results[f"{collection_name}.{index['name']}"] = "ok"
+            except OperationFailure as e:
+                # P.ej. duplicados que impiden un índice único: no bloquear el arranque
+                logger.error(f"Error creating index {collection_name}.{index['name']}: {e}")
+                results[f"{collection_name}.{index['name']}"] = f"error: {e}"
+
+    logger.info(f"Indexes verified for {len(INDEXES)} collections")
+    return results
+
+def hot_query_shapes(fundacion):
+    """Formas de consulta críticas a verificar con explain()"""
+    return [
+        {
+            "name": "login",
+            "collection": "users",
+            "filter": {"email": "explain@example.org"},
+        },
+        {
+            "name": "telegram_user",
+            "collection": "users",
+            "filter": {"telegram_user_id": "0"},
+        },
+        {
+            "name": "sessions_by_fundacion",
+            "collection": "sessions",
+            "filter": {"fundacion": fundacion},
+            "sort": [("created_at", DESCENDING), ("_id", DESCENDING)],
+        },
+        {
+            "name": "sessions_by_usuaria",
+            "collection": "sessions",
+            "filter": {"fundacion": fundacion, "codigo_usuaria": "EXPLAIN-000"},
+            "sort": [("created_at", DESCENDING), ("_id", DESCENDING)],
+        },
+        {
+            "name": "profiles_by_fundacion",
+            "collection": "profiles",
+            "filter": {"fundacion": fundacion},
+            "sort": [("created_at", DESCENDING)],
+        },
+        {
+            "name": "profile_by_codigo",
+            "collection": "profiles",
+            "filter": {"fundacion": fundacion, "codigo_usuaria": "EXPLAIN-000"},
+        },
+        {
+            "name": "voice_notes_by_telegram_user",
+            "collection": "voice_notes",
+            "filter": {"telegram_user_id": "0"},
+        },
+    ]
+
+def _plan_stages(plan):
+    """Recorrer un plan de ejecución y devolver todas sus etapas"""
+    stages = [plan.get("stage")]
+    if "inputStage" in plan:
+        stages.extend(_plan_stages(plan["inputStage"]))
+    for child in plan.get("inputStages", []):
+        stages.extend(_plan_stages(child))
+    return [stage for stage in stages if stage]
+
+async def explain_hot_queries(db, fundacion):
+    """Ejecutar explain() sobre cada consulta crítica y marcar los COLLSCAN"""
+    report = []
+
+    for shape in hot_query_shapes(fundacion):
+        cursor = db[shape["collection"]].find(shape["filter"])
+        if shape.get("sort"):
+            cursor = cursor.sort(shape["sort"])
+
+        explanation = await cursor.explain()
+        winning_plan = explanation.get("queryPlanner", {}).get("winningPlan", {})
+        # En algunas versiones el plan viene envuelto en "queryPlan"
+        winning_plan = winning_plan.get("queryPlan", winning_plan)
+        stages = _plan_stages(winning_plan)
+
+        report.append({
+            "name": shape["name"],
+            "collection": shape["collection"],
+            "stages": stages,
+            "collscan": "COLLSCAN" in stages,
+        })
+
+    return report
@@ -0,0 +1,275 @@
+import os
+import time
+import socket
+import random
+import asyncio
+from datetime import datetime, timedelta
+import logging
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+# Estados de un trabajo: queued -> running -> succeeded | queued (reintento) | dead
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+DEAD = "dead"
+
+class JobQueue:
+    """Cola de trabajos durable sobre la colección `jobs` de MongoDB
+
+    Un worker reclama un trabajo de forma atómica con find_one_and_update y obtiene
+    una concesión (lease) temporal que renueva mientras lo procesa; si el worker muere,
+    el trabajo vuelve a estar disponible cuando la concesión vence. Los fallos se reintentan con backoff
+    exponencial y, agotados los intentos, el trabajo queda en estado `dead`.
+    """
+
+    def __init__(self):
+        self.max_attempts = int(os.getenv("JOB_MAX_ATTEMPTS", 5))
+        self.lease_seconds = float(os.getenv("JOB_LEASE_SECONDS", 300))
+        self.backoff_base = float(os.getenv("JOB_BACKOFF_BASE", 10))
+        self.backoff_max = float(os.getenv("JOB_BACKOFF_MAX", 1800))
+        self.poll_interval = float(os.getenv("JOB_POLL_INTERVAL", 2))
+        self.sweep_interval = float(os.getenv("JOB_SWEEP_INTERVAL", 60))
+        self.handlers = {}
+        self.sweepers = []
+        self._last_sweep = 0
+        self.processed = 0
+        self.retried = 0
+        self.dead = 0
+        self._tasks = []
+
+    def handler(self, job_type):
+        """Decorador para registrar la función asíncrona que procesa un tipo de trabajo"""
+        def decorator(func):
+            self.handlers[job_type] = func
+            return func
+        return decorator
+
+    def sweeper(self, func):
+        """Decorador para tareas periódicas (p.ej. reencolar trabajos perdidos) que los
+        workers ejecutan cuando la cola está vacía, como mucho cada JOB_SWEEP_INTERVAL"""
+        self.sweepers.append(func)
+        return func
+
+    async def enqueue(self, db, job_type, payload, run_at=None, max_attempts=None):
+        now = datetime.utcnow()
+        job = {
+            "type": job_type,
+            "payload": payload,
+            "status": QUEUED,
+            "attempts": 0,
+            "max_attempts": max_attempts or self.max_attempts,
+            "run_at": run_at or now,
+            "lease_until": None,
+            "locked_by": None,
+            "last_error": None,
+            "created_at": now,
+            "updated_at": now,
+            "finished_at": None
+        }
+        result = await db.jobs.insert_one(job)
+        return result.inserted_id
+
+    async def claim(self, db, worker_id, job_types=None):
+        """Reclamar el siguiente trabajo disponible (o con la concesión vencida)"""
+        now = datetime.utcnow()
+        query = {
+            "$or": [
+                {"status": QUEUED, "run_at": {"$lte": now}},
+                # Concesión vencida con intentos disponibles; sin ellos, reap_expired lo marca dead
+                {
+                    "status": RUNNING,
+                    "lease_until": {"$lt": now},
+                    "$expr": {"$lt": ["$attempts", "$max_attempts"]}
+                }
+            ]
+        }
+        if job_types:
+            query["type"] = {"$in": list(job_types)}
+
+        return await db.jobs.find_one_and_update(
+            query,
+            {
+                "$set": {
+                    "status": RUNNING,
+                    "locked_by": worker_id,
+                    "lease_until": now + timedelta(seconds=self.lease_seconds),
+                    "updated_at": now
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("run_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    def _owned(self, job):
+        # Solo quien tiene la concesión vigente puede cerrar el trabajo
+        return {"_id": job["_id"], "status": RUNNING, "locked_by": job["locked_by"], "attempts": job["attempts"]}
+
+    async def heartbeat(self, db, job):
+        """Renovar la concesión mientras el manejador trabaja, cada tercio de su duración"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            now = datetime.utcnow()
+            try:
+                result = await db.jobs.update_one(
+                    self._owned(job),
+                    {"$set": {"lease_until": now + timedelta(seconds=self.lease_seconds), "updated_at": now}}
+                )
+            except Exception as e:
+                # Un fallo puntual no detiene la renovación: quedan dos intentos antes de que venza
+                logger.error(f"Error renewing lease on job {job['_id']}: {e}")
+                continue
+            if result.matched_count == 0:
+                logger.warning(f"Lost lease on job {job['_id']} ({job['type']})")
+                return
+
+    async def reap_expired(self, db):
+        """Marcar como dead los trabajos cuya concesión venció sin intentos restantes
+        (p.ej. el worker murió en cada intento): así no se reclaman para siempre"""
+        now = datetime.utcnow()
+        result = await db.jobs.update_many(
+            {
+                "status": RUNNING,
+                "lease_until": {"$lt": now},
+                "$expr": {"$gte": ["$attempts", "$max_attempts"]}
+            },
+            {"$set": {
+                "status": DEAD,
+                "last_error": "Lease expired on the last attempt",
+                "lease_until": None,
+                "updated_at": now,
+                "finished_at": now
+            }}
+        )
+        if result.modified_count:
+            self.dead += result.modified_count
+            logger.error(f"{result.modified_count} jobs dead after their last lease expired")
+        return result.modified_count
+
+    async def complete(self, db, job, result=None):
+        now = datetime.utcnow()
+        update = await db.jobs.update_one(self._owned(job), {"$set": {
+            "status": SUCCEEDED,
+            "result": result,
+            "lease_until": None,
+            "updated_at": now,
+            "finished_at": now
+        }})
+        if update.matched_count:
+            self.processed += 1
+        else:
+            logger.warning(f"Job {job['_id']} finished after losing its lease")
+
+    def backoff(self, attempts):
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1))
+        return delay * random.uniform(0.8, 1.2)
+
+    async def fail(self, db, job, error):
+        now = datetime.utcnow()
+        dead = job["attempts"] >= job["max_attempts"]
+        if dead:
+            update = {"status": DEAD, "finished_at": now}
+        else:
+            update = {"status": QUEUED, "run_at": now + timedelta(seconds=self.backoff(job["attempts"]))}
+
+        update.update({"last_error": str(error)[:1000], "lease_until": None, "updated_at": now})
+        result = await db.jobs.update_one(self._owned(job), {"$set": update})
+        if not result.matched_count:
+            logger.warning(f"Job {job['_id']} failed after losing its lease: {error}")
+        elif dead:
+            self.dead += 1
+            logger.error(f"Job {job['_id']} ({job['type']}) dead after {job['attempts']} attempts: {error}")
+        else:
+            self.retried += 1
+            logger.warning(f"Job {job['_id']} ({job['type']}) failed, attempt {job['attempts']}: {error}")
+
+    async def retry_dead(self, db, job_id):
+        """Devolver un trabajo muerto a la cola con los intentos a cero"""
+        result = await db.jobs.update_one(
+            {"_id": job_id, "status": DEAD},
+            {"$set": {"status": QUEUED, "attempts": 0, "run_at": datetime.utcnow(), "finished_at": None}}
+        )
+        return result.modified_count == 1
+
+    async def process(self, db, job):
+        handler = self.handlers.get(job["type"])
+        heartbeat = asyncio.create_task(self.heartbeat(db, job))
+        try:
+            try:
+                if handler is None:
+                    raise RuntimeError(f"No handler registered for job type {job['type']}")
+                result = await handler(db, job["payload"])
+            finally:
+                heartbeat.cancel()
+        except Exception as e:
+            await self.fail(db, job, e)
+        else:
+            await self.complete(db, job, result)
+
+    async def sweep(self, db, force=False):
+        if not force and time.monotonic() - self._last_sweep < self.sweep_interval:
+            return
+        self._last_sweep = time.monotonic()
+        for task in [self.reap_expired, *self.sweepers]:
+            try:
+                await task(db)
+            except Exception as e:
+                logger.error(f"Error in job sweeper {task.__name__}: {e}")
+
+    async def run_worker(self, db, worker_id):
+        """Bucle de un worker: reclamar, procesar y esperar si no hay trabajo"""
+        while True:
+            try:
+                job = await self.claim(db, worker_id, self.handlers.keys())
+            except Exception as e:
+                logger.error(f"Error claiming job: {e}")
+                job = None
+
+            if job is None:
+                await self.sweep(db)
+                await asyncio.sleep(self.poll_interval)
+                continue
+
+            try:
+                await self.process(db, job)
+            except Exception as e:
+                # Si no se pudo cerrar el trabajo (p.ej. Mongo caído en complete/fail), su
+                # concesión vencerá y otro worker lo reclamará; este bucle sigue vivo
+                logger.error(f"Error finishing job {job['_id']} ({job['type']}): {e}")
+                await asyncio.sleep(self.poll_interval)
+
+    def start(self, db, concurrency=None):
+        """Lanzar `concurrency` workers en el event loop actual"""
+        concurrency = concurrency or int(os.getenv("JOB_WORKER_CONCURRENCY", 2))
+        base_id = f"{socket.gethostname()}:{os.getpid()}"
+        for index in range(concurrency):
+            self._tasks.append(asyncio.create_task(self.run_worker(db, f"{base_id}:{index}")))
+        logger.info(f"Job workers started: {concurrency}")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    async def counts(self, db):
+        pipeline = [{"$group": {"_id": "$status", "count": {"$sum": 1}}}]
+        return {doc["_id"]: doc["count"] async for doc in db.jobs.aggregate(pipeline)}
+
+    def stats(self):
+        return {
+            "workers": len(self._tasks),
+            "processed": self.processed,
+            "retried": self.retried,
+            "dead": self.dead
+        }
+
+# Instancia global de la cola
+job_queue = JobQueue()
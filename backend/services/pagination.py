@@ -0,0 +1,43 @@
+import base64
+import json
+from datetime import datetime
+from bson import ObjectId
+from bson.errors import InvalidId
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Orden estable para paginar: created_at descendente y _id como desempate
+KEYSET_SORT = [("created_at", -1), ("_id", -1)]
+
+def encode_cursor(document):
+    """Codificar (created_at, _id) del último documento en un cursor opaco"""
+    payload = {
+        "created_at": document["created_at"].isoformat(),
+        "id": str(document["_id"])
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor):
+    """Decodificar un cursor opaco; lanza ValueError si no es válido"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(payload["created_at"]), ObjectId(payload["id"])
+    except (ValueError, KeyError, TypeError, InvalidId) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+def keyset_filter(query, cursor):
+    """Agregar a la consulta la condición para continuar después del cursor"""
+    if not cursor:
+        return query
+
+    created_at, last_id = decode_cursor(cursor)
+    return {
+        **query,
+        "$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": last_id}}
+        ]
+    }
@@ -0,0 +1,85 @@
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from passlib.context import CryptContext
+import logging
+
+logger = logging.getLogger(__name__)
+
+class PasswordHasherBusy(Exception):
+    """La cola de hashing está llena; el cliente debe reintentar"""
+
+class PasswordHasher:
+    """Hash y verificación bcrypt fuera del event loop, en un pool acotado
+
+    bcrypt libera el GIL, así que un pool de hilos basta para no bloquear el loop.
+    """
+
+    def __init__(self):
+        self.rounds = int(os.getenv("BCRYPT_ROUNDS", 12))
+        self.max_workers = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+        self.max_queue = int(os.getenv("PASSWORD_HASH_QUEUE", 32))
+        # min_rounds hace que los hashes con un coste menor se marquen para rehash
+        self.context = CryptContext(
+            schemes=["bcrypt"],
+            deprecated="auto",
+            bcrypt__default_rounds=self.rounds,
+            bcrypt__min_rounds=self.rounds
+        )
+        self.executor = None
+        # Solo para comparar en benchmarks: verificar en el event loop, como antes del pool
+        self.inline = False
+        self.pending = 0
+        self.rejected = 0
+        self.rehashed = 0
+
+    def start(self):
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="password-hasher"
+            )
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+
+    async def _run(self, func, *args):
+        """Ejecutar en el pool; rechazar si ya hay demasiadas tareas en cola"""
+        if self.inline:
+            return func(*args)
+
+        if self.pending >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise PasswordHasherBusy()
+
+        self.start()
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password):
+        return await self._run(self.context.hash, password)
+
+    async def verify_and_update(self, password, hashed_password):
+        """Devuelve (válida, nuevo_hash); nuevo_hash no es None si hay que actualizar el coste"""
+        valid, new_hash = await self._run(self.context.verify_and_update, password, hashed_password)
+        if new_hash:
+            self.rehashed += 1
+        return valid, new_hash
+
+    def stats(self):
+        return {
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "pending": self.pending,
+            "rejected": self.rejected,
+            "rehashed": self.rehashed,
+            "bcrypt_rounds": self.rounds
+        }
+
+# Instancia global del servicio
+password_hasher = PasswordHasher()
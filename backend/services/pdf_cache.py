@@ -0,0 +1,171 @@
+import os
+import asyncio
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+import logging
+
+import orjson
+
+from services.pdf_service import (
+    TEMPLATE_VERSION, SESSION_PDF_FIELDS, PROFILE_PDF_FIELDS, PROFILE_HISTORY_FIELDS, PROFILE_HISTORY_LIMIT
+)
+
+logger = logging.getLogger(__name__)
+
+def _content_hash(kind, payload):
+    """Hash estable de los campos que se renderizan y la versión de plantilla"""
+    body = orjson.dumps(
+        {"template": TEMPLATE_VERSION, "kind": kind, "data": payload},
+        default=str,
+        option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+    )
+    return hashlib.sha256(body).hexdigest()
+
+def session_key(session):
+    return _content_hash("session", {field: session.get(field) for field in SESSION_PDF_FIELDS})
+
+def profile_key(profile, sessions):
+    return _content_hash("profile", {
+        "profile": {field: profile.get(field) for field in PROFILE_PDF_FIELDS},
+        "sessions": [
+            {field: s.get(field) for field in PROFILE_HISTORY_FIELDS}
+            for s in (sessions or [])[:PROFILE_HISTORY_LIMIT]
+        ]
+    })
+
+class PDFCache:
+    """Caché en disco de PDFs direccionada por contenido, con expulsión LRU por tamaño
+
+    Como la clave es el hash de lo que se renderiza, una sesión editada produce otra
+    clave y la entrada antigua simplemente envejece hasta ser expulsada.
+    """
+
+    def __init__(self):
+        self.directory = os.getenv("PDF_CACHE_DIR", os.path.join(tempfile.gettempdir(), "registro_violeta_pdf_cache"))
+        self.max_bytes = int(os.getenv("PDF_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._loaded = False
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def _load(self):
+        """Reconstruir el índice LRU desde el directorio (orden por mtime)"""
+        if self._loaded:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        found = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".pdf"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            found.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._size += size
+        self._loaded = True
+
+    def _read(self, key):
+        with self._lock:
+            self._load()
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                content = f.read()
+            os.utime(path)
+            return content
+        except FileNotFoundError:
+            with self._lock:
+                self._size -= self._entries.pop(key, 0)
+            return None
+
+    def _write(self, key, content):
+        with self._lock:
+            self._load()
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return
+        # Escritura atómica: nunca se sirve un PDF a medio escribir
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        with self._lock:
+            self._size += len(content) - self._entries.pop(key, 0)
+            self._entries[key] = len(content)
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                old_key, old_size = self._entries.popitem(last=False)
+                self._size -= old_size
+                self.evictions += 1
+                try:
+                    os.remove(self._path(old_key))
+                except FileNotFoundError:
+                    pass
+
+    async def get(self, key):
+        content = await asyncio.to_thread(self._read, key)
+        if content is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return content
+
+    async def put(self, key, content):
+        if not content or len(content) > self.max_bytes:
+            return
+        try:
+            await asyncio.to_thread(self._write, key, content)
+        except OSError as e:
+            # La caché es opcional: un disco lleno no debe romper la descarga
+            logger.error(f"Error writing PDF cache entry {key}: {e}")
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None
+        }
+
+def _opaque_tag(etag):
+    return etag[2:] if etag.startswith("W/") else etag
+
+def etag_matches(if_none_match, etag):
+    """Comparación débil de If-None-Match, como exige RFC 9110 para GET (el prefijo W/
+    se ignora en ambos lados)"""
+    if not if_none_match:
+        return False
+    etag = _opaque_tag(etag)
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if _opaque_tag(candidate) == etag:
+            return True
+    return False
+
+# Instancia global de la caché de PDFs
+pdf_cache = PDFCache()
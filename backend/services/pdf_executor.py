@@ -0,0 +1,142 @@
+import os
+import time
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Sesiones por lote del cursor al generar el expediente completo
+DOSSIER_BATCH_SIZE = int(os.getenv("PDF_DOSSIER_BATCH_SIZE", 100))
+
+# Funciones ejecutadas dentro de los procesos del pool.
+# Cada proceso importa pdf_service una sola vez, así los estilos se inicializan una vez por worker.
+
+def _init_worker():
+    from services.pdf_service import pdf_service  # noqa: F401
+    logger.info(f"PDF render worker {os.getpid()} ready")
+
+def _render_session(session_data):
+    from services.pdf_service import pdf_service
+    return pdf_service.create_session_pdf(session_data)
+
+def _render_profile(profile_data, sessions_data):
+    from services.pdf_service import pdf_service
+    return pdf_service.create_profile_pdf(profile_data, sessions_data)
+
+def _render_profile_dossier(profile_id, fundacion):
+    # Las sesiones se leen aquí, en lotes, para no cargarlas ni serializarlas en el proceso de la API
+    from bson import ObjectId
+    from services.database import database
+    from services.pagination import KEYSET_SORT
+    from services.pdf_service import pdf_service, PROFILE_HISTORY_FIELDS, SESSION_PDF_FIELDS
+
+    db = database.sync_db()
+    profile = db.profiles.find_one({"_id": ObjectId(profile_id), "fundacion": fundacion})
+    if not profile:
+        return None
+
+    query = {"codigo_usuaria": profile["codigo_usuaria"], "fundacion": fundacion}
+    history = db.sessions.find(query, {field: 1 for field in PROFILE_HISTORY_FIELDS}) \
+        .sort(KEYSET_SORT).batch_size(DOSSIER_BATCH_SIZE)
+    details = db.sessions.find(query, {field: 1 for field in SESSION_PDF_FIELDS}) \
+        .sort(KEYSET_SORT).batch_size(DOSSIER_BATCH_SIZE)
+    try:
+        return pdf_service.create_profile_dossier_pdf(profile, history, details)
+    finally:
+        history.close()
+        details.close()
+
+class PDFRenderExecutor:
+    """Renderizado de PDFs en un pool de procesos para no bloquear el event loop"""
+
+    def __init__(self):
+        self.max_workers = int(os.getenv("PDF_WORKERS", 2))
+        self.executor = None
+        # Protege el reemplazo del pool cuando varios renders lo encuentran roto a la vez
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.max_pending = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.render_seconds = 0.0
+
+    def start(self):
+        """Crear el pool si no existe; devuelve el pool vigente"""
+        with self._lock:
+            if self.executor is None:
+                # spawn: los workers no heredan el cliente de Mongo ni los hilos del proceso principal
+                self.executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker
+                )
+                logger.info(f"PDF render pool started with {self.max_workers} workers")
+            return self.executor
+
+    def shutdown(self):
+        with self._lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _discard(self, broken):
+        """Retirar un pool roto solo si sigue siendo el vigente: si otro render ya lo
+        reemplazó, apagar el actual cancelaría trabajos que no tienen nada que ver"""
+        with self._lock:
+            if self.executor is not broken:
+                return
+            self.executor = None
+        logger.error("PDF render pool broken, restarting")
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    async def _submit(self, func, *args):
+        executor = self.start()
+        self.submitted += 1
+        self.pending += 1
+        self.max_pending = max(self.max_pending, self.pending)
+        started = time.perf_counter()
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+            if result is None:
+                self.failed += 1
+            else:
+                self.completed += 1
+            return result
+        except BrokenProcessPool:
+            # Un worker murió: el siguiente render crea un pool nuevo
+            self.failed += 1
+            self._discard(executor)
+            return None
+        finally:
+            self.pending -= 1
+            self.render_seconds += time.perf_counter() - started
+
+    async def render_session(self, session_data):
+        return await self._submit(_render_session, session_data)
+
+    async def render_profile(self, profile_data, sessions_data=None):
+        return await self._submit(_render_profile, profile_data, sessions_data)
+
+    async def render_profile_dossier(self, profile_id, fundacion):
+        return await self._submit(_render_profile_dossier, str(profile_id), fundacion)
+
+    def stats(self):
+        finished = self.completed + self.failed
+        return {
+            "workers": self.max_workers,
+            "queue_length": max(0, self.pending - self.max_workers),
+            "in_flight": self.pending,
+            "max_in_flight": self.max_pending,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_render_ms": round(self.render_seconds / finished * 1000, 2) if finished else None
+        }
+
+# Instancia global del ejecutor
+pdf_executor = PDFRenderExecutor()
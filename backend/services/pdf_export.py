@@ -0,0 +1,158 @@
+import os
+import re
+import uuid
+import asyncio
+import zipfile
+from datetime import datetime
+import logging
+
+from services.cache import TTLCache
+from services.pdf_executor import pdf_executor
+from services.session_pdfs import read_session_pdf
+
+logger = logging.getLogger(__name__)
+
+class _ZipSink:
+    """Destino sin seek para zipfile: cada entrada se escribe con descriptor de datos
+    y los bytes acumulados se entregan al cliente en cuanto se completa la entrada"""
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+def _path_part(value, default):
+    """Fragmento de ruta seguro a partir de un valor escrito por la usuaria: sin separadores,
+    unidades ni `..`, para que ninguna entrada del ZIP salga de su carpeta al extraerlo"""
+    value = re.sub(r"[\\/:\x00-\x1f]", "_", str(value or "")).replace("..", "_").strip(" .")
+    return value or default
+
+def session_pdf_name(session):
+    """Ruta dentro del ZIP; el _id evita colisiones entre sesiones con el mismo número"""
+    return (
+        f"{_path_part(session.get('codigo_usuaria'), 'sin_codigo')}/"
+        f"Sesion_{_path_part(session.get('sesion_no'), 'unknown')}_{_path_part(session.get('fecha'), 'unknown')}"
+        f"_{session['_id']}.pdf"
+    )
+
+class PDFExportTracker:
+    """Progreso de las exportaciones ZIP en curso, consultable por id
+
+    Vive en memoria del proceso: con varios workers, la consulta debe llegar al mismo worker.
+    """
+
+    def __init__(self):
+        self.concurrency = int(os.getenv("PDF_EXPORT_CONCURRENCY", pdf_executor.max_workers * 2))
+        self.exports = TTLCache(maxsize=256, ttl=int(os.getenv("PDF_EXPORT_PROGRESS_TTL", 86400)))
+
+    def create(self, fundacion, total, codigo_usuaria=None):
+        progress = {
+            "export_id": uuid.uuid4().hex,
+            "fundacion": fundacion,
+            "codigo_usuaria": codigo_usuaria,
+            "status": "running",
+            "total": total,
+            "completed": 0,
+            "failed": 0,
+            "bytes_sent": 0,
+            "started_at": datetime.utcnow(),
+            "finished_at": None
+        }
+        self.exports.set(progress["export_id"], progress)
+        return progress
+
+    def get(self, export_id, fundacion):
+        progress = self.exports.get(export_id)
+        if progress is None or progress["fundacion"] != fundacion:
+            return None
+        return progress
+
+    async def stream_zip(self, cursor, progress):
+        """Renderizar en paralelo y emitir cada PDF al ZIP en cuanto termina
+
+        Como mucho `concurrency` PDFs están en memoria a la vez, sin importar el tamaño del export.
+        """
+        sink = _ZipSink()
+        archive = zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED)
+        pending = set()
+        failed_sessions = []
+        exhausted = False
+
+        def add_entry(session, pdf_content):
+            if not pdf_content:
+                progress["failed"] += 1
+                failed_sessions.append(str(session["_id"]))
+                return b""
+            info = zipfile.ZipInfo(session_pdf_name(session), date_time=datetime.utcnow().timetuple()[:6])
+            archive.writestr(info, pdf_content)
+            progress["completed"] += 1
+            chunk = sink.drain()
+            progress["bytes_sent"] += len(chunk)
+            return chunk
+
+        async def render(session):
+            # Un fallo de una sesión (lectura del blob, Mongo) va a ERRORES.txt, no corta el ZIP
+            try:
+                return session, await read_session_pdf(session)
+            except Exception as e:
+                logger.error(f"Error exporting session {session['_id']}: {e}")
+                return session, None
+
+        try:
+            while pending or not exhausted:
+                while not exhausted and len(pending) < self.concurrency:
+                    try:
+                        session = await cursor.next()
+                    except StopAsyncIteration:
+                        exhausted = True
+                        break
+                    pending.add(asyncio.create_task(render(session)))
+
+                if not pending:
+                    break
+
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    chunk = add_entry(*task.result())
+                    if chunk:
+                        yield chunk
+
+            if failed_sessions:
+                archive.writestr("ERRORES.txt", "Sesiones que no se pudieron generar:\n" + "\n".join(failed_sessions))
+            archive.close()
+            chunk = sink.drain()
+            progress["bytes_sent"] += len(chunk)
+            progress["status"] = "completed"
+            yield chunk
+        except Exception as e:
+            logger.error(f"Error exporting session PDFs {progress['export_id']}: {e}")
+            progress["status"] = "failed"
+            raise
+        finally:
+            for task in pending:
+                task.cancel()
+            if progress["status"] == "running":
+                # El cliente cerró la conexión antes de terminar
+                progress["status"] = "cancelled"
+            progress["finished_at"] = datetime.utcnow()
+
+    def stats(self):
+        return {"concurrency": self.concurrency, "tracked_exports": self.exports.stats()}
+
+# Instancia global del exportador
+pdf_export = PDFExportTracker()
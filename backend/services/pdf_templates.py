@@ -0,0 +1,323 @@
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import Paragraph, Spacer, Table, TableStyle, PageBreak
+from reportlab.lib.units import inch
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from datetime import datetime
+from abc import ABC, abstractmethod
+import copy
+
+# Formato de página común a todos los documentos
+PAGE_SETUP = {
+    "pagesize": letter,
+    "rightMargin": 72,
+    "leftMargin": 72,
+    "topMargin": 72,
+    "bottomMargin": 18
+}
+
+_CELL_PADDING = [
+    ('LEFTPADDING', (0, 0), (-1, -1), 8),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 8),
+    ('TOPPADDING', (0, 0), (-1, -1), 8),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+]
+
+# Estilos de tabla compartidos; se construyen una sola vez y se reutilizan en cada documento
+KEY_VALUE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#F3F4F6')),
+    ('TEXTCOLOR', (0, 0), (0, -1), colors.HexColor('#374151')),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+    ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#E5E7EB')),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+] + _CELL_PADDING)
+
+SIGNATURE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (0, 0), colors.HexColor('#F3F4F6')),
+    ('TEXTCOLOR', (0, 0), (0, 0), colors.HexColor('#374151')),
+    ('FONTNAME', (0, 0), (0, 0), 'Helvetica-Bold'),
+    ('FONTNAME', (1, 0), (1, 0), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#E5E7EB')),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+] + _CELL_PADDING)
+
+HISTORY_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#6B46C1')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#E5E7EB')),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+])
+
+KEY_VALUE_WIDTHS = [2*inch, 4*inch]
+
+def build_stylesheet():
+    """Hoja de estilos con los estilos personalizados de Registro Violeta"""
+    styles = getSampleStyleSheet()
+    styles.add(ParagraphStyle(
+        name='CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=16,
+        spaceAfter=30,
+        alignment=TA_CENTER,
+        textColor=colors.HexColor('#6B46C1')
+    ))
+    styles.add(ParagraphStyle(
+        name='SectionHeader',
+        parent=styles['Heading2'],
+        fontSize=12,
+        spaceBefore=15,
+        spaceAfter=10,
+        textColor=colors.HexColor('#4C1D95'),
+        borderWidth=1,
+        borderColor=colors.HexColor('#E5E7EB'),
+        borderPadding=5,
+        backColor=colors.HexColor('#F3F4F6')
+    ))
+    styles.add(ParagraphStyle(
+        name='FieldLabel',
+        parent=styles['Normal'],
+        fontSize=10,
+        spaceBefore=8,
+        textColor=colors.HexColor('#374151'),
+        fontName='Helvetica-Bold'
+    ))
+    styles.add(ParagraphStyle(
+        name='FieldContent',
+        parent=styles['Normal'],
+        fontSize=10,
+        spaceAfter=8,
+        textColor=colors.HexColor('#111827'),
+        leftIndent=10
+    ))
+    return styles
+
+# Registro de plantillas: nombre -> clase
+TEMPLATES = {}
+
+def register_template(name):
+    """Decorador para añadir un nuevo tipo de documento al registro"""
+    def decorator(cls):
+        cls.name = name
+        TEMPLATES[name] = cls
+        return cls
+    return decorator
+
+class DocumentTemplate(ABC):
+    """Plantilla compilada una vez: las subclases declaran su estructura y `bind` solo vuelca los datos
+
+    Los títulos, cabeceras de sección y estilos se preparan en `compile`; por documento
+    únicamente se crean las tablas y párrafos que dependen de los datos.
+    """
+
+    name = None
+    title = ""
+
+    def __init__(self, styles):
+        self.styles = styles
+        self.compile()
+
+    def compile(self):
+        self.title_flowable = Paragraph(self.title, self.styles['CustomTitle'])
+
+    @staticmethod
+    def static(flowable):
+        """Copia de un flowable precompilado: reportlab guarda estado de maquetación en
+        cada instancia (p.ej. `_postponed`), así que no se puede compartir entre documentos"""
+        return copy.copy(flowable)
+
+    def section_header(self, text):
+        return Paragraph(text, self.styles['SectionHeader'])
+
+    def key_value_table(self, rows, data):
+        """Tabla etiqueta/valor a partir de filas (etiqueta, campo, valor por defecto)"""
+        table = Table(
+            [[label, data.get(field, default)] for label, field, default in rows],
+            colWidths=KEY_VALUE_WIDTHS
+        )
+        table.setStyle(KEY_VALUE_STYLE)
+        return table
+
+    def text_block(self, text):
+        """Párrafos de contenido; cada salto de línea inicia un párrafo nuevo"""
+        paragraphs = [
+            Paragraph(line.strip(), self.styles['FieldContent'])
+            for line in (text or '').split('\n') if line.strip()
+        ]
+        return paragraphs or [Paragraph("No especificado", self.styles['FieldContent'])]
+
+    def footer(self):
+        footer_text = f"Documento generado automáticamente - {datetime.now().strftime('%d/%m/%Y %H:%M')}"
+        return [Spacer(1, 30), Paragraph(footer_text, self.styles['Normal'])]
+
+    @abstractmethod
+    def bind(self, data, **context):
+        """Devolver la lista de flowables del documento para estos datos"""
+
+@register_template("session")
+class SessionTemplate(DocumentTemplate):
+    title = "SEGUIMIENTO A PROCESO TERAPÉUTICO"
+
+    INFO_ROWS = [
+        ('Sesión No.', 'sesion_no', ''),
+        ('Fecha', 'fecha', ''),
+        ('Código de Usuaria', 'codigo_usuaria', ''),
+        ('Terapeuta', 'terapeuta', '')
+    ]
+
+    SECTIONS = [
+        ('OBJETIVO DE LA SESIÓN', 'objetivo_sesion'),
+        ('DESARROLLO DEL OBJETIVO', 'desarrollo_objetivo'),
+        ('EJERCICIOS Y ACTIVIDADES DESARROLLADAS EN LA SESIÓN', 'ejercicios_actividades'),
+        ('HERRAMIENTAS ENTREGADAS EN LA SESIÓN', 'herramientas_entregadas'),
+        ('AVANCES EN EL PROCESO TERAPÉUTICO', 'avances_proceso_terapeutico'),
+        ('CIERRE DE LA SESIÓN', 'cierre_sesion'),
+        ('OBSERVACIONES', 'observaciones')
+    ]
+
+    def compile(self):
+        super().compile()
+        self.section_headers = [(self.section_header(title), field) for title, field in self.SECTIONS]
+
+    def body(self, data):
+        """Tabla de datos básicos, secciones y firma (sin título ni pie)"""
+        story = [self.key_value_table(self.INFO_ROWS, data), Spacer(1, 20)]
+
+        for header, field in self.section_headers:
+            story.append(self.static(header))
+            story.extend(self.text_block(data.get(field)))
+            story.append(Spacer(1, 15))
+
+        # Firma del terapeuta
+        story.append(Spacer(1, 20))
+        firma_table = Table(
+            [['Firma del terapeuta:', data.get('firma_terapeuta', '')]],
+            colWidths=KEY_VALUE_WIDTHS
+        )
+        firma_table.setStyle(SIGNATURE_STYLE)
+        story.append(firma_table)
+        return story
+
+    def bind(self, data, **context):
+        return [self.static(self.title_flowable), Spacer(1, 20)] + self.body(data) + self.footer()
+
+@register_template("profile")
+class ProfileTemplate(DocumentTemplate):
+    title = "PERFIL DE USUARIA"
+
+    INFO_ROWS = [
+        ('Código de Usuaria', 'codigo_usuaria', ''),
+        ('Edad Aproximada', 'edad_aproximada', 'No especificada'),
+        ('Situación General', 'situacion_general', 'No especificada'),
+        ('Tipo de Violencia', 'tipo_violencia', 'No especificado'),
+        ('Estado del Caso', 'estado_caso', 'Activo'),
+        ('Terapeuta Asignado', 'terapeuta_asignado', ''),
+        ('Fecha de Ingreso', 'created_at', '')
+    ]
+
+    HISTORY_COLUMNS = [
+        ('Sesión', 'sesion_no', '', 1*inch),
+        ('Fecha', 'fecha', '', 1.5*inch),
+        ('Tipo', 'tipo_sesion', 'Seguimiento', 1.5*inch),
+        ('Terapeuta', 'terapeuta', '', 2*inch)
+    ]
+
+    def compile(self):
+        super().compile()
+        self.notes_header = self.section_header("NOTAS GENERALES")
+        self.history_header = self.section_header("HISTORIAL DE SESIONES")
+        self.history_labels = [label for label, _, _, _ in self.HISTORY_COLUMNS]
+        self.history_widths = [width for _, _, _, width in self.HISTORY_COLUMNS]
+
+    def history_rows(self, sessions):
+        return [
+            [session.get(field, default) for _, field, default, _ in self.HISTORY_COLUMNS]
+            for session in sessions
+        ]
+
+    def history_table(self, rows):
+        table = Table([self.history_labels] + rows, colWidths=self.history_widths, repeatRows=1)
+        table.setStyle(HISTORY_STYLE)
+        return table
+
+    def header(self, data):
+        """Título, datos del perfil y notas generales"""
+        story = [self.static(self.title_flowable), Spacer(1, 20), self.key_value_table(self.INFO_ROWS, data), Spacer(1, 20)]
+
+        # Notas generales si existen
+        if data.get('notas_generales'):
+            story.append(self.static(self.notes_header))
+            story.append(Paragraph(data['notas_generales'], self.styles['FieldContent']))
+            story.append(Spacer(1, 20))
+        return story
+
+    def bind(self, data, sessions=None, history_limit=None, **context):
+        story = self.header(data)
+
+        # Historial de sesiones si se proporciona
+        if sessions:
+            story.append(self.static(self.history_header))
+            story.append(self.history_table(self.history_rows(sessions[:history_limit])))
+
+        story.extend(self.footer())
+        return story
+
+@register_template("profile_dossier")
+class ProfileDossierTemplate(ProfileTemplate):
+    """Expediente completo: historial sin truncar y una página de detalle por sesión
+
+    Se genera por tandas (`chunks`) a partir de iteradores de sesiones, de modo que
+    nunca hay más de una tanda de sesiones o flowables en memoria.
+    """
+
+    title = "EXPEDIENTE COMPLETO DE USUARIA"
+    ROWS_PER_TABLE = 50
+
+    def compile(self):
+        super().compile()
+        self.session_template = SessionTemplate(self.styles)
+        self.details_header = self.section_header("DETALLE DE SESIONES")
+
+    def chunks(self, data, history=(), details=(), **context):
+        yield self.header(data) + [self.static(self.history_header)]
+
+        # Historial en tablas de tamaño fijo: una tabla enorme se maqueta de una sola vez
+        rows = []
+        total = 0
+        for session in history:
+            rows.extend(self.history_rows([session]))
+            total += 1
+            if len(rows) >= self.ROWS_PER_TABLE:
+                yield [self.history_table(rows)]
+                rows = []
+        if rows:
+            yield [self.history_table(rows)]
+        elif not total:
+            yield [Paragraph("Sin sesiones registradas", self.styles['FieldContent'])]
+
+        for index, session in enumerate(details):
+            chunk = [PageBreak()]
+            if index == 0:
+                chunk.append(self.static(self.details_header))
+            chunk.append(Paragraph(
+                f"Sesión {session.get('sesion_no', '')} - {session.get('fecha', '')}", self.styles['FieldLabel']
+            ))
+            yield chunk + self.session_template.body(session)
+
+        yield self.footer()
+
+    def bind(self, data, history=(), details=(), **context):
+        return [flowable for chunk in self.chunks(data, history, details) for flowable in chunk]
+
+def compile_templates(styles=None):
+    """Compilar todas las plantillas registradas; devuelve nombre -> plantilla"""
+    styles = styles or build_stylesheet()
+    return {name: cls(styles) for name, cls in TEMPLATES.items()}
@@ -0,0 +1,83 @@
+from pymongo import UpdateOne
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+
+async def record_session(db, session_dict):
+    """Actualizar los contadores materializados del perfil al crear una sesión"""
+    return await db.profiles.update_one(
+        {
+            "fundacion": session_dict["fundacion"],
+            "codigo_usuaria": session_dict["codigo_usuaria"]
+        },
+        {
+            "$inc": {"total_sessions": 1},
+            "$max": {
+                "last_session_at": session_dict["created_at"],
+                "last_session_date": session_dict["fecha"]
+            }
+        }
+    )
+
+async def _rebuild_batch(db, profiles):
+    """Recalcular las estadísticas de un lote de perfiles a partir de sus sesiones"""
+    keys = [{"fundacion": p["fundacion"], "codigo_usuaria": p["codigo_usuaria"]} for p in profiles]
+    pipeline = [
+        {"$match": {"$or": keys}},
+        {
+            "$group": {
+                "_id": {"fundacion": "$fundacion", "codigo_usuaria": "$codigo_usuaria"},
+                "total_sessions": {"$sum": 1},
+                "last_session_at": {"$max": "$created_at"},
+                "last_session_date": {"$max": "$fecha"}
+            }
+        }
+    ]
+    stats = {
+        (s["_id"]["fundacion"], s["_id"]["codigo_usuaria"]): s
+        for s in await db.sessions.aggregate(pipeline).to_list(length=None)
+    }
+
+    operations = []
+    for profile in profiles:
+        s = stats.get((profile["fundacion"], profile["codigo_usuaria"]))
+        if s:
+            update = {"$set": {
+                "total_sessions": s["total_sessions"],
+                "last_session_at": s["last_session_at"],
+                "last_session_date": s["last_session_date"]
+            }}
+        else:
+            update = {
+                "$set": {"total_sessions": 0},
+                "$unset": {"last_session_at": "", "last_session_date": ""}
+            }
+        operations.append(UpdateOne({"_id": profile["_id"]}, update))
+
+    if operations:
+        await db.profiles.bulk_write(operations, ordered=False)
+    return len(operations)
+
+async def rebuild_profile_stats(db, fundacion=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Reconstruir total_sessions/last_session_date de todos los perfiles por lotes"""
+    query = {"fundacion": fundacion} if fundacion else {}
+    projection = {"fundacion": 1, "codigo_usuaria": 1}
+    last_id = None
+    repaired = 0
+
+    while True:
+        batch_query = dict(query)
+        if last_id is not None:
+            batch_query["_id"] = {"$gt": last_id}
+
+        profiles = await db.profiles.find(batch_query, projection).sort("_id", 1).limit(batch_size).to_list(length=batch_size)
+        if not profiles:
+            break
+
+        repaired += await _rebuild_batch(db, profiles)
+        last_id = profiles[-1]["_id"]
+        logger.info(f"Profile stats rebuilt for {repaired} profiles")
+
+    return repaired
@@ -0,0 +1,59 @@
+# Proyecciones (sparse fieldsets) para los endpoints de sesiones y perfiles.
+# El parámetro `fields` acepta nombres de preset y/o campos separados por comas,
+# p.ej. "summary", "full" o "summary,objetivo_sesion".
+
+SESSION_FIELDS = {
+    "_id", "sesion_no", "fecha", "codigo_usuaria", "terapeuta", "objetivo_sesion",
+    "desarrollo_objetivo", "ejercicios_actividades", "herramientas_entregadas",
+    "avances_proceso_terapeutico", "cierre_sesion", "observaciones", "firma_terapeuta",
+    "fundacion", "tipo_sesion", "created_at", "updated_at", "created_by",
+    "drive_file_id", "drive_folder_id", "pdf_filename", "pdf_blob"
+}
+
+SESSION_PRESETS = {
+    "summary": ["sesion_no", "fecha", "codigo_usuaria", "terapeuta", "tipo_sesion", "created_at"],
+    "full": None
+}
+
+PROFILE_FIELDS = {
+    "_id", "codigo_usuaria", "edad_aproximada", "situacion_general", "tipo_violencia",
+    "estado_caso", "terapeuta_asignado", "fundacion", "notas_generales", "created_at",
+    "updated_at", "created_by", "drive_folders", "total_sessions", "last_session_at",
+    "last_session_date"
+}
+
+PROFILE_PRESETS = {
+    "summary": [
+        "codigo_usuaria", "estado_caso", "terapeuta_asignado", "total_sessions",
+        "last_session_date", "created_at"
+    ],
+    "full": None
+}
+
+def build_projection(fields, presets, allowed, required=()):
+    """Traducir el parámetro `fields` a una proyección de Mongo
+
+    Devuelve None cuando hay que devolver el documento completo.
+    Lanza ValueError si se pide un campo o preset desconocido.
+    """
+    if not fields:
+        return None
+
+    selected = set()
+    for name in (f.strip() for f in fields.split(",")):
+        if not name:
+            continue
+        if name in presets:
+            if presets[name] is None:
+                return None
+            selected.update(presets[name])
+        elif name in allowed:
+            selected.add(name)
+        else:
+            raise ValueError(f"Unknown field: {name}")
+
+    if not selected:
+        return None
+
+    selected.update(required)
+    return {name: 1 for name in sorted(selected)}
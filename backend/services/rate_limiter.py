@@ -0,0 +1,143 @@
+import os
+import time
+import uuid
+from collections import deque, OrderedDict
+import logging
+
+logger = logging.getLogger(__name__)
+
+class RateLimitExceeded(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"Rate limit exceeded, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+class MemoryRateLimitStore:
+    """Ventana deslizante en memoria (un proceso)"""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        # Ordenado por último uso: al llenarse se descarta la clave usada hace más tiempo
+        self._hits = OrderedDict()
+
+    async def hit(self, key, limit, window):
+        """Registrar un intento; devuelve (permitido, segundos hasta reintentar)"""
+        now = time.monotonic()
+        hits = self._hits.get(key)
+        if hits is None:
+            while len(self._hits) >= self.max_keys:
+                self._hits.popitem(last=False)
+            hits = self._hits[key] = deque()
+        else:
+            self._hits.move_to_end(key)
+
+        while hits and hits[0] <= now - window:
+            hits.popleft()
+
+        if len(hits) >= limit:
+            return False, max(1, int(hits[0] + window - now) + 1)
+
+        hits.append(now)
+        return True, 0
+
+# Recorta la ventana, cuenta y registra el intento de forma atómica; como en el store en
+# memoria, los intentos rechazados no se registran (no alargan el bloqueo)
+SLIDING_WINDOW_SCRIPT = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], 0, now - window)
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[3]) then
+    redis.call('ZADD', KEYS[1], now, ARGV[4])
+    redis.call('EXPIRE', KEYS[1], math.ceil(window) + 1)
+    return {1, '0'}
+end
+local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+return {0, oldest[2]}
+"""
+
+class RedisRateLimitStore:
+    """Ventana deslizante en un servidor compatible con Redis, compartida entre workers
+
+    Si Redis no responde se usa un store en memoria del proceso: el límite sigue
+    aplicándose (por worker) en lugar de convertir el login en un error 500.
+    """
+
+    def __init__(self, url):
+        # Dependencia opcional: solo se necesita si se configura RATE_LIMIT_STORE_URL
+        import redis.asyncio as redis
+        self.errors = (redis.RedisError, OSError)
+        self.client = redis.from_url(url)
+        self.script = self.client.register_script(SLIDING_WINDOW_SCRIPT)
+        self.fallback = MemoryRateLimitStore()
+
+    async def hit(self, key, limit, window):
+        now = time.time()
+        try:
+            allowed, oldest = await self.script(keys=[key], args=[now, window, limit, uuid.uuid4().hex])
+        except self.errors as e:
+            logger.error(f"Rate limit store unavailable, using memory store: {e}")
+            return await self.fallback.hit(key, limit, window)
+
+        if not allowed:
+            retry_after = float(oldest) + window - now
+            return False, max(1, int(retry_after) + 1)
+        return True, 0
+
+def parse_rate(value, default):
+    """Interpretar 'intentos/segundos', p.ej. '10/60'"""
+    try:
+        limit, window = (value or default).split("/")
+        return int(limit), float(window)
+    except ValueError:
+        logger.warning(f"Invalid rate limit '{value}', using {default}")
+        limit, window = default.split("/")
+        return int(limit), float(window)
+
+def create_store():
+    url = os.getenv("RATE_LIMIT_STORE_URL")
+    if url:
+        try:
+            store = RedisRateLimitStore(url)
+            logger.info("Rate limiter using shared Redis store")
+            return store
+        except ImportError:
+            logger.error("RATE_LIMIT_STORE_URL set but the redis package is not installed; using memory store")
+    return MemoryRateLimitStore()
+
+class RateLimiter:
+    """Limitador por claves (IP, email...) que se consulta antes de cualquier trabajo costoso"""
+
+    def __init__(self, name, limit, window, store):
+        self.name = name
+        self.limit = limit
+        self.window = window
+        self.store = store
+        self.allowed = 0
+        self.rejected = 0
+
+    async def check(self, *keys):
+        """Registrar el intento para cada clave; lanza RateLimitExceeded si alguna se excede"""
+        retry_after = 0
+        for key in keys:
+            if not key:
+                continue
+            allowed, wait = await self.store.hit(f"ratelimit:{self.name}:{key}", self.limit, self.window)
+            if not allowed:
+                retry_after = max(retry_after, wait)
+
+        if retry_after:
+            self.rejected += 1
+            raise RateLimitExceeded(retry_after)
+        self.allowed += 1
+
+    def stats(self):
+        return {
+            "limit": self.limit,
+            "window_seconds": self.window,
+            "allowed": self.allowed,
+            "rejected": self.rejected
+        }
+
+_store = create_store()
+
+login_limiter = RateLimiter("login", *parse_rate(os.getenv("LOGIN_RATE_LIMIT"), "10/60"), _store)
+register_limiter = RateLimiter("register", *parse_rate(os.getenv("REGISTER_RATE_LIMIT"), "5/3600"), _store)
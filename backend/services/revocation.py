@@ -0,0 +1,93 @@
+import os
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+class TokenRevocationList:
+    """Conjunto compacto en memoria de usuarios cuyos tokens ya no son válidos
+
+    Se refresca periódicamente desde MongoDB: incluye los usuarios desactivados y la
+    versión de token vigente de quienes la tienen > 0. Un token es válido solo si su
+    claim `tv` es igual o mayor a esa versión.
+
+    Hasta la primera carga correcta no se sabe quién está revocado: todos los tokens se
+    rechazan (un conjunto vacío aceptaría los de usuarios desactivados).
+    """
+
+    def __init__(self):
+        self.interval = float(os.getenv("REVOCATION_REFRESH_INTERVAL", 30))
+        self.revoked_users = set()
+        self.token_versions = {}
+        self.loaded = False
+        self._task = None
+
+    async def refresh(self, database):
+        """Reconstruir el conjunto desde la colección de usuarios"""
+        revoked_users = set()
+        token_versions = {}
+
+        cursor = database.users.find(
+            {"$or": [{"active": False}, {"token_version": {"$gt": 0}}]},
+            {"active": 1, "token_version": 1}
+        )
+        async for user in cursor:
+            user_id = str(user["_id"])
+            if user.get("active") is False:
+                revoked_users.add(user_id)
+            if user.get("token_version", 0) > 0:
+                token_versions[user_id] = user["token_version"]
+
+        self.revoked_users = revoked_users
+        self.token_versions = token_versions
+        self.loaded = True
+
+    async def _run(self, database):
+        while True:
+            # Sin la primera carga se reintenta pronto: mientras tanto no se acepta ningún token
+            await asyncio.sleep(self.interval if self.loaded else min(self.interval, 1))
+            try:
+                await self.refresh(database)
+            except Exception as e:
+                # Se conserva el último conjunto conocido
+                logger.error(f"Error refreshing token revocation list: {e}")
+
+    async def start(self, database):
+        try:
+            await self.refresh(database)
+        except Exception as e:
+            logger.error(f"Error loading token revocation list, rejecting tokens until it loads: {e}")
+        self._task = asyncio.create_task(self._run(database))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def is_revoked(self, user_id, token_version=0):
+        if not self.loaded:
+            return True
+        return user_id in self.revoked_users or token_version < self.token_versions.get(user_id, 0)
+
+    def revoke(self, user_id, token_version=None):
+        """Aplicar localmente una revocación sin esperar al siguiente refresco"""
+        user_id = str(user_id)
+        if token_version is None:
+            self.revoked_users.add(user_id)
+        else:
+            self.token_versions[user_id] = max(token_version, self.token_versions.get(user_id, 0))
+
+    def stats(self):
+        return {
+            "loaded": self.loaded,
+            "revoked_users": len(self.revoked_users),
+            "versioned_users": len(self.token_versions),
+            "refresh_interval_seconds": self.interval
+        }
+
+# Instancia global de la lista de revocación
+revocation_list = TokenRevocationList()
@@ -0,0 +1,32 @@
+import orjson
+from bson import ObjectId
+from fastapi.responses import Response
+
+def bson_default(value):
+    """Convertir tipos BSON que orjson no serializa (datetime lo maneja de forma nativa)"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(content):
+    """Serializar documentos de Mongo (ObjectId, datetime, anidados) a JSON"""
+    return orjson.dumps(content, default=bson_default, option=orjson.OPT_NON_STR_KEYS)
+
+def encode_ndjson_line(document):
+    """Codificar un documento de Mongo como una línea NDJSON"""
+    return dumps(document) + b"\n"
+
+class MongoJSONResponse(Response):
+    """Respuesta JSON basada en orjson que entiende tipos BSON
+
+    Devolverla directamente desde un handler evita el paso por jsonable_encoder.
+    """
+    media_type = "application/json"
+
+    def render(self, content):
+        return dumps(content)
+
+async def stream_ndjson(cursor):
+    """Recorrer un cursor de Motor emitiendo una línea por documento"""
+    async for document in cursor:
+        yield encode_ndjson_line(document)
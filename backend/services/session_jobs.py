@@ -0,0 +1,118 @@
+import asyncio
+import functools
+from datetime import datetime, timedelta
+import logging
+
+from bson import ObjectId
+
+from services.drive_service import drive_service
+from services.job_queue import job_queue
+from services.session_pdfs import ensure_session_pdf, read_session_pdf, session_pdf_filename
+
+logger = logging.getLogger(__name__)
+
+# Trabajos posteriores a crear una sesión: primero el PDF, después la copia en Drive
+RENDER_SESSION_PDF = "render_session_pdf"
+UPLOAD_SESSION_PDF = "upload_session_pdf"
+
+# Margen antes de que el barrido reencole una sesión pendiente sin trabajo
+ARTIFACTS_SWEEP_GRACE = timedelta(minutes=2)
+ARTIFACTS_SWEEP_BATCH = 100
+
+async def enqueue_session_artifacts(db, session_id, fundacion):
+    return await job_queue.enqueue(db, RENDER_SESSION_PDF, {"session_id": str(session_id), "fundacion": fundacion})
+
+@job_queue.sweeper
+async def sweep_pending_artifacts(db):
+    """Encolar el PDF de las sesiones guardadas con `artifacts_pending` cuyo trabajo no llegó
+    a crearse (el proceso murió o falló el enqueue justo después del insert)"""
+    pending = db.sessions.find(
+        {"artifacts_pending": True, "created_at": {"$lt": datetime.utcnow() - ARTIFACTS_SWEEP_GRACE}},
+        {"fundacion": 1}
+    ).limit(ARTIFACTS_SWEEP_BATCH)
+    enqueued = 0
+    async for session in pending:
+        session_id = str(session["_id"])
+        if await db.jobs.find_one({"payload.session_id": session_id, "type": RENDER_SESSION_PDF}, {"_id": 1}):
+            continue
+        await enqueue_session_artifacts(db, session_id, session["fundacion"])
+        enqueued += 1
+    if enqueued:
+        logger.warning(f"Enqueued artifacts for {enqueued} sessions without a job")
+    return enqueued
+
+@job_queue.handler(RENDER_SESSION_PDF)
+async def render_session_pdf(db, payload):
+    session = await db.sessions.find_one({"_id": ObjectId(payload["session_id"])})
+    if not session:
+        return {"skipped": "session not found"}
+
+    pdf_blob = await ensure_session_pdf(session)
+    if not pdf_blob:
+        raise RuntimeError("PDF rendering failed")
+    await db.sessions.update_one({"_id": session["_id"]}, {"$unset": {"artifacts_pending": ""}})
+
+    if drive_service.service and not session.get("drive_file_id"):
+        await job_queue.enqueue(db, UPLOAD_SESSION_PDF, payload)
+    return {"blob_id": pdf_blob["id"]}
+
+@job_queue.handler(UPLOAD_SESSION_PDF)
+async def upload_session_pdf(db, payload):
+    session = await db.sessions.find_one({"_id": ObjectId(payload["session_id"])})
+    if not session:
+        return {"skipped": "session not found"}
+    if session.get("drive_file_id"):
+        # Reintento de un trabajo que ya subió el archivo
+        return {"drive_file_id": session["drive_file_id"]}
+    if not drive_service.service:
+        raise RuntimeError("Google Drive service not available")
+
+    pdf_content = await read_session_pdf(session)
+    if not pdf_content:
+        raise RuntimeError("PDF not available")
+
+    # Con las carpetas guardadas en el perfil, la subida es la única llamada a Drive
+    profile = await db.profiles.find_one(
+        {"fundacion": session["fundacion"], "codigo_usuaria": session["codigo_usuaria"]},
+        {"drive_folders": 1}
+    )
+    known_folders = (profile or {}).get("drive_folders")
+
+    # drive_service usa una conexión HTTP por hilo, así que se puede llamar desde hilos
+    filename = session_pdf_filename(session)
+    folders = await asyncio.to_thread(
+        drive_service.get_or_create_user_folder, session["codigo_usuaria"], session["fundacion"], known_folders
+    )
+    if not folders:
+        raise RuntimeError("Could not get or create Drive folders")
+    if profile and folders != known_folders:
+        await db.profiles.update_one({"_id": profile["_id"]}, {"$set": {"drive_folders": folders}})
+
+    # Las subidas van al pool de drive_service (en paralelo, hasta DRIVE_UPLOAD_WORKERS);
+    # con la clave de la sesión, un reintento continúa la subida donde quedó
+    file_id = await asyncio.get_running_loop().run_in_executor(
+        drive_service.upload_pool,
+        functools.partial(
+            drive_service.upload_file, pdf_content, filename, folders['sesiones_folder_id'],
+            upload_key=f"session:{session['_id']}"
+        )
+    )
+    if not file_id:
+        # Si la carpeta del perfil ya no existe en Drive (404), el reintento no debe reutilizarla:
+        # sin drive_folders vuelve a resolverla (desde la caché de carpetas, ya invalidada)
+        if profile:
+            await db.profiles.update_one({"_id": profile["_id"]}, {"$unset": {"drive_folders": ""}})
+        raise RuntimeError("Drive upload failed")
+
+    await db.sessions.update_one(
+        {"_id": session["_id"]},
+        {
+            "$set": {
+                "drive_file_id": file_id,
+                "drive_folder_id": folders['sesiones_folder_id'],
+                "pdf_filename": filename
+            }
+        }
+    )
+    logger.info(f"Session {session['_id']} saved to Drive with file ID {file_id}")
+    return {"drive_file_id": file_id}
@@ -0,0 +1,91 @@
+from datetime import datetime
+import logging
+
+from services.database import database
+from services.blob_store import blob_store, BlobNotFound
+from services.pdf_cache import session_key
+from services.pdf_executor import pdf_executor
+from services.pdf_service import TEMPLATE_VERSION
+
+logger = logging.getLogger(__name__)
+
+# PDFs de sesión persistidos en el almacén de blobs y enlazados desde el documento
+# de la sesión (`pdf_blob`). La clave es el hash de contenido de pdf_cache, así que
+# incluye la versión de plantilla: solo se regenera si cambian la sesión o el diseño.
+
+def session_pdf_filename(session):
+    return f"Sesion_{session.get('sesion_no', 'unknown')}_{session.get('fecha', 'unknown')}.pdf"
+
+def session_pdf_etag(pdf_blob):
+    """ETag fuerte del PDF almacenado: identifica los bytes del blob, no los datos de la
+    sesión (un nuevo render produce otros bytes, con otra fecha de creación)"""
+    return f'"{pdf_blob["id"]}"'
+
+def is_current(session):
+    blob = session.get("pdf_blob")
+    return bool(blob) and blob.get("store") == blob_store.name and blob.get("key") == session_key(session)
+
+async def store_session_pdf(session, pdf_content):
+    """Guardar el PDF y enlazarlo; si otra petición lo enlazó antes, se conserva el suyo"""
+    key = session_key(session)
+    blob_id = await blob_store.put(
+        pdf_content,
+        session_pdf_filename(session),
+        metadata={"session_id": str(session["_id"]), "key": key, "template_version": TEMPLATE_VERSION}
+    )
+    pdf_blob = {
+        "id": blob_id,
+        "store": blob_store.name,
+        "key": key,
+        "template_version": TEMPLATE_VERSION,
+        "size": len(pdf_content),
+        "created_at": datetime.utcnow()
+    }
+
+    previous = session.get("pdf_blob")
+    link_filter = {"_id": session["_id"]}
+    if previous:
+        link_filter["pdf_blob.id"] = previous["id"]
+    else:
+        link_filter["pdf_blob"] = {"$exists": False}
+
+    result = await database.sessions.update_one(link_filter, {"$set": {"pdf_blob": pdf_blob}})
+    if result.matched_count == 0:
+        await blob_store.delete(blob_id)
+        current = await database.sessions.find_one({"_id": session["_id"]}, {"pdf_blob": 1})
+        return (current or {}).get("pdf_blob")
+
+    if previous:
+        await blob_store.delete(previous["id"])
+    return pdf_blob
+
+async def ensure_session_pdf(session, force=False):
+    """Enlace al PDF vigente de la sesión, renderizándolo solo si falta o está obsoleto"""
+    if not force and is_current(session):
+        return session["pdf_blob"]
+
+    pdf_content = await pdf_executor.render_session(session)
+    if not pdf_content:
+        return None
+    return await store_session_pdf(session, pdf_content)
+
+async def open_session_pdf(session):
+    """(pdf_blob, tamaño) del PDF vigente; se regenera si el blob enlazado ya no existe"""
+    pdf_blob = await ensure_session_pdf(session)
+    if not pdf_blob:
+        return None, 0
+    try:
+        return pdf_blob, await blob_store.size(pdf_blob["id"])
+    except BlobNotFound:
+        logger.warning(f"PDF blob {pdf_blob['id']} missing for session {session['_id']}, rendering again")
+        pdf_blob = await ensure_session_pdf({**session, "pdf_blob": pdf_blob}, force=True)
+        if not pdf_blob:
+            return None, 0
+        return pdf_blob, await blob_store.size(pdf_blob["id"])
+
+async def read_session_pdf(session):
+    """Contenido completo del PDF vigente (para exportaciones)"""
+    pdf_blob, _ = await open_session_pdf(session)
+    if not pdf_blob:
+        return None
+    return await blob_store.read(pdf_blob["id"])
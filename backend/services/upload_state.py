@@ -0,0 +1,72 @@
+from datetime import datetime
+import logging
+
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+class DriveUploadState:
+    """Estado de las subidas reanudables a Drive en la colección `drive_uploads`
+
+    Guarda la URI de la sesión de subida y los bytes confirmados, de modo que un worker
+    que muere a mitad de una subida la continúa en el siguiente intento en lugar de
+    volver a enviar el archivo. El `digest` del contenido evita reanudar con otros bytes.
+    Como GoogleDriveService es síncrono, usa el cliente pymongo síncrono.
+    """
+
+    def __init__(self):
+        self.resumed = 0
+
+    def collection(self):
+        from services.database import database
+        return database.sync_db().drive_uploads
+
+    def get(self, upload_key, digest):
+        try:
+            state = self.collection().find_one({"upload_key": upload_key})
+        except PyMongoError as e:
+            logger.error(f"Error reading Drive upload state {upload_key}: {e}")
+            return None
+        if state and state.get("digest") != digest:
+            # El contenido cambió: la sesión de subida anterior ya no sirve
+            self.discard(upload_key)
+            return None
+        if state:
+            self.resumed += 1
+        return state
+
+    def _set(self, upload_key, fields):
+        try:
+            self.collection().update_one(
+                {"upload_key": upload_key},
+                {"$set": {**fields, "updated_at": datetime.utcnow()}},
+                upsert=True
+            )
+        except PyMongoError as e:
+            logger.error(f"Error writing Drive upload state {upload_key}: {e}")
+
+    def save(self, upload_key, digest, resumable_uri, progress, size):
+        self._set(upload_key, {
+            "digest": digest,
+            "resumable_uri": resumable_uri,
+            "progress": progress,
+            "size": size,
+            "file_id": None
+        })
+
+    def complete(self, upload_key, digest, file_id):
+        # Se conserva hasta el TTL: si el worker muere antes de registrar el file_id,
+        # el reintento lo recupera sin volver a subir el archivo
+        self._set(upload_key, {"digest": digest, "resumable_uri": None, "file_id": file_id})
+
+    def discard(self, upload_key):
+        try:
+            self.collection().delete_one({"upload_key": upload_key})
+        except PyMongoError as e:
+            logger.error(f"Error discarding Drive upload state {upload_key}: {e}")
+
+    def stats(self):
+        return {"resumed": self.resumed}
+
+# Instancia global del estado de subidas
+upload_state = DriveUploadState()
@@ -0,0 +1,60 @@
+import os
+import sys
+
+import mongomock
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+# Los módulos del backend se importan como en server.py (`from services...`)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.database import database
+from services.folder_cache import folder_cache
+from services.drive_service import GoogleDriveService
+from fake_drive import FakeDrive
+
+@pytest.fixture
+def anyio_backend():
+    # Las pruebas asíncronas (pytest.mark.anyio) corren sobre asyncio, como la aplicación
+    return "asyncio"
+
+@pytest.fixture
+def db():
+    """Base de datos Motor en memoria"""
+    return AsyncMongoMockClient().registro_violeta_test
+
+@pytest.fixture
+async def api(db, monkeypatch):
+    """Cliente HTTP contra la aplicación ASGI (sin lifespan) con la base de datos en memoria"""
+    import httpx
+    import server
+
+    monkeypatch.setattr(database, "db", db)
+    server.user_cache.clear()
+    # Lo que haría el lifespan: sin la primera carga se rechazan todos los tokens
+    await server.revocation_list.refresh(db)
+    async with httpx.AsyncClient(app=server.app, base_url="http://test") as client:
+        yield client
+
+@pytest.fixture
+def sync_db(monkeypatch):
+    """Base de datos síncrona en memoria para los servicios que usan database.sync_db()"""
+    db = mongomock.MongoClient().registro_violeta_test
+    monkeypatch.setattr(database, "sync_db", lambda: db)
+    folder_cache.memory.clear()
+    yield db
+    folder_cache.memory.clear()
+
+@pytest.fixture
+def fake_drive(sync_db):
+    fake = FakeDrive().start()
+    yield fake
+    fake.stop()
+
+@pytest.fixture
+def drive(fake_drive):
+    """GoogleDriveService conectado al servidor falso"""
+    service = GoogleDriveService()
+    service.service = fake_drive.build_service()
+    yield service
+    service.upload_pool.shutdown()
@@ -0,0 +1,202 @@
+"""Servidor HTTP local que imita lo necesario de la API de Drive v3 y cuenta las peticiones
+
+Atiende files.list / files.create de carpetas, peticiones batch (multipart/mixed) y
+subidas reanudables. `fail_plan` inyecta respuestas de error en los PUT de las subidas.
+"""
+
+import json
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import httplib2
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build_from_document
+
+class FakeDrive:
+    def __init__(self):
+        self.folders = {}
+        self.http_requests = 0
+        self.api_calls = 0
+        self.batch_requests = 0
+        self.files = {}
+        self.uploads = {}
+        self.upload_bytes = 0
+        self.status_queries = 0
+        # Respuestas para los siguientes PUT con datos: None (bien), un código HTTP o "partial"
+        self.fail_plan = []
+        self.upload_delay = 0
+        self.active_uploads = 0
+        self.max_active_uploads = 0
+        self.lock = threading.Lock()
+        self.server = None
+
+    # --- API de carpetas ---
+
+    def dispatch(self, method, path, body):
+        self.api_calls += 1
+        url = urlparse(path)
+        if method == "GET" and url.path.endswith("/files"):
+            query = parse_qs(url.query)["q"][0]
+            name = re.search(r"name='((?:[^'\\]|\\.)*)'", query).group(1)
+            name = name.replace("\\'", "'").replace("\\\\", "\\")
+            parent = re.search(r"'([^']+)' in parents", query)
+            parent = parent.group(1) if parent else None
+            files = [{"id": folder_id} for folder_id, folder in self.folders.items() if folder == (name, parent)]
+            return 200, {"files": files}
+        if method == "POST" and url.path.endswith("/files"):
+            metadata = json.loads(body or "{}")
+            parent = (metadata.get("parents") or [None])[0]
+            if parent and parent not in self.folders:
+                return 404, {"error": {"code": 404, "message": "File not found"}}
+            folder_id = uuid.uuid4().hex[:12]
+            self.folders[folder_id] = (metadata["name"], parent)
+            return 200, {"id": folder_id}
+        return 400, {"error": {"code": 400, "message": "Unsupported"}}
+
+    def batch(self, content_type, body):
+        self.batch_requests += 1
+        boundary = re.search(r'boundary="?([^";]+)"?', content_type).group(1)
+        parts = [part for part in body.split("--" + boundary) if part.strip() and part.strip() != "--"]
+        response_boundary = "batch_" + uuid.uuid4().hex
+        output = []
+        for part in parts:
+            headers, _, request = part.lstrip("\n").partition("\n\n")
+            content_id = re.search(r"Content-ID: <([^>]+)>", headers, re.I).group(1)
+            request_line, _, rest = request.partition("\n")
+            method, path, _ = request_line.split(" ", 2)
+            _, _, request_body = rest.partition("\n\n")
+            status, payload = self.dispatch(method, path, request_body.strip() or None)
+            payload = json.dumps(payload)
+            output.append(
+                f"--{response_boundary}\r\nContent-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {status} X\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(payload)}\r\n\r\n{payload}\r\n"
+            )
+        return "".join(output) + f"--{response_boundary}--\r\n", f"multipart/mixed; boundary={response_boundary}"
+
+    # --- Subidas reanudables ---
+
+    def start_upload(self, size):
+        upload_id = uuid.uuid4().hex
+        self.uploads[upload_id] = {"data": bytearray(), "size": size, "file_id": None}
+        return f"{self.url}upload/session?upload_id={upload_id}"
+
+    def upload_status(self, upload):
+        if upload["file_id"]:
+            return 200, {"id": upload["file_id"]}, {}
+        if upload["data"]:
+            return 308, b"", {"Range": f"bytes=0-{len(upload['data']) - 1}"}
+        return 308, b"", {}
+
+    def put_chunk(self, upload_id, content_range, body):
+        upload = self.uploads.get(upload_id)
+        if upload is None:
+            return 404, {"error": {"code": 404}}, {}
+        if content_range.startswith("bytes */"):
+            self.status_queries += 1
+            return self.upload_status(upload)
+
+        with self.lock:
+            failure = self.fail_plan.pop(0) if self.fail_plan else None
+        start = int(re.match(r"bytes (\d+)-", content_range).group(1))
+        if start != len(upload["data"]):
+            return 400, {"error": {"code": 400, "message": "Offset mismatch"}}, {}
+        if failure == "partial":
+            # Drive recibe la mitad del trozo antes de fallar
+            body = body[:len(body) // 2]
+            upload["data"] += body
+            self.upload_bytes += len(body)
+            return 503, {"error": {"code": 503}}, {}
+        if failure:
+            return failure, {"error": {"code": failure}}, {}
+
+        upload["data"] += body
+        self.upload_bytes += len(body)
+        if len(upload["data"]) >= upload["size"]:
+            upload["file_id"] = "file_" + upload_id[:8]
+            self.files[upload["file_id"]] = bytes(upload["data"])
+        return self.upload_status(upload)
+
+    # --- Servidor ---
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_port}/"
+
+    def start(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def send(self, status, body=b"", headers=None, content_type="application/json"):
+                data = body if isinstance(body, (bytes, str)) else json.dumps(body)
+                data = data.encode() if isinstance(data, str) else data
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def read_body(self):
+                return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+            def do_GET(self):
+                with fake.lock:
+                    fake.http_requests += 1
+                    status, payload = fake.dispatch("GET", self.path, None)
+                self.send(status, payload)
+
+            def do_POST(self):
+                body = self.read_body()
+                with fake.lock:
+                    fake.http_requests += 1
+                    if "uploadType=resumable" in self.path:
+                        location = fake.start_upload(int(self.headers["X-Upload-Content-Length"]))
+                        return self.send(200, b"", {"Location": location})
+                    if "/batch" in self.path:
+                        data, content_type = fake.batch(
+                            self.headers["Content-Type"], body.decode().replace("\r\n", "\n")
+                        )
+                        return self.send(200, data, content_type=content_type)
+                    status, payload = fake.dispatch("POST", self.path, body.decode())
+                self.send(status, payload)
+
+            def do_PUT(self):
+                body = self.read_body()
+                upload_id = parse_qs(urlparse(self.path).query)["upload_id"][0]
+                with fake.lock:
+                    fake.http_requests += 1
+                    fake.active_uploads += 1
+                    fake.max_active_uploads = max(fake.max_active_uploads, fake.active_uploads)
+                try:
+                    time.sleep(fake.upload_delay)
+                    status, payload, headers = fake.put_chunk(upload_id, self.headers["Content-Range"], body)
+                    self.send(status, payload, headers)
+                finally:
+                    with fake.lock:
+                        fake.active_uploads -= 1
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def build_service(self):
+        """Cliente de googleapiclient apuntando a este servidor (también sus batch)"""
+        document = json.loads(discovery_cache.get_static_doc("drive", "v3"))
+        document["rootUrl"] = self.url
+        return build_from_document(document, http=httplib2.Http())
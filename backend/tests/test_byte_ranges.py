@@ -0,0 +1,34 @@
+import pytest
+
+from services.byte_ranges import parse_byte_range, RangeNotSatisfiable
+
+SIZE = 1000
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=500-", (500, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+    ("bytes=990-5000", (990, 999)),
+    ("bytes=999-999", (999, 999)),
+])
+def test_satisfiable_ranges(header, expected):
+    assert parse_byte_range(header, SIZE) == expected
+
+@pytest.mark.parametrize("header", [
+    None,
+    "",
+    "items=0-10",
+    "bytes=0-10,20-30",
+    "bytes=abc-def",
+    "bytes=10",
+    # fin < inicio: rango inválido, se ignora (RFC 9110) en lugar de responder 416
+    "bytes=500-400",
+])
+def test_ignored_ranges_serve_the_full_document(header):
+    assert parse_byte_range(header, SIZE) is None
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=1000-2000", "bytes=-0"])
+def test_unsatisfiable_ranges(header):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_byte_range(header, SIZE)
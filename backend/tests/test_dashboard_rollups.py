@@ -0,0 +1,146 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from services.dashboard_rollups import DashboardRollups
+from services.indexes import INDEXES
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture(autouse=True)
+async def rollup_indexes(db):
+    for index in INDEXES["dashboard_rollups"]:
+        await db.dashboard_rollups.create_index(index["keys"], name=index["name"], unique=index["unique"])
+
+def month(months_ago):
+    when = datetime.utcnow().replace(day=15, hour=12, microsecond=0)
+    for _ in range(months_ago):
+        when = when.replace(day=1) - timedelta(days=1)
+    return when.replace(day=15)
+
+async def create_profile(db, rollups, fundacion, created_at, estado_caso="activo"):
+    profile = {"fundacion": fundacion, "created_at": created_at, "estado_caso": estado_caso}
+    await db.profiles.insert_one(profile)
+    await rollups.record_profile(db, profile)
+    return profile
+
+async def create_session(db, rollups, fundacion, created_at):
+    session = {"fundacion": fundacion, "created_at": created_at}
+    await db.sessions.insert_one(session)
+    await rollups.record_session(db, session)
+
+async def settle(db):
+    # Mongo guarda milisegundos: un rollup escrito en el mismo milisegundo en que empieza
+    # rebuild() cuenta como concurrente y se conserva
+    await db.dashboard_rollups.update_many({}, {"$set": {"updated_at": datetime.utcnow() - timedelta(seconds=1)}})
+
+def snapshot(stats):
+    return {**stats, "sessions_by_month": sorted(
+        (row["_id"]["year"], row["_id"]["month"], row["count"]) for row in stats["sessions_by_month"]
+    )}
+
+async def test_increments_match_a_rebuild_from_the_data(db):
+    rollups = DashboardRollups()
+    await create_profile(db, rollups, "violeta", month(2))
+    await create_profile(db, rollups, "violeta", month(0), estado_caso="cerrado")
+    await create_profile(db, rollups, "otra", month(0))
+    for months_ago in [3, 2, 2, 0, 0, 0]:
+        await create_session(db, rollups, "violeta", month(months_ago))
+    await create_session(db, rollups, "otra", month(1))
+
+    incremental = snapshot(await rollups.get_stats(db, "violeta"))
+    assert incremental["total_profiles"] == 2
+    assert incremental["total_sessions"] == 6
+    assert incremental["active_profiles"] == 1
+
+    await settle(db)
+    await rollups.rebuild(db)
+    assert snapshot(await rollups.get_stats(db, "violeta")) == incremental
+
+async def test_state_changes_adjust_active_profiles(db):
+    rollups = DashboardRollups()
+    await create_profile(db, rollups, "violeta", month(1))
+
+    await rollups.record_profile_state_change(db, "violeta", "activo", "cerrado")
+    await db.profiles.update_one({}, {"$set": {"estado_caso": "cerrado"}})
+    assert (await rollups.get_stats(db, "violeta"))["active_profiles"] == 0
+
+    # Sin cambio de "activo" no hay delta
+    await rollups.record_profile_state_change(db, "violeta", "cerrado", "archivado")
+    assert (await rollups.get_stats(db, "violeta"))["active_profiles"] == 0
+
+    await settle(db)
+    await rollups.rebuild(db, "violeta")
+    assert (await rollups.get_stats(db, "violeta"))["active_profiles"] == 0
+
+async def test_rebuild_removes_months_without_data(db):
+    rollups = DashboardRollups()
+    await create_session(db, rollups, "violeta", month(1))
+    await create_session(db, rollups, "otra", month(1))
+    # El mes queda en los rollups aunque sus sesiones se borren
+    await db.sessions.delete_many({"fundacion": "violeta"})
+    await settle(db)
+
+    await rollups.rebuild(db, "violeta")
+
+    assert await db.dashboard_rollups.count_documents({"fundacion": "violeta"}) == 0
+    # La reconstrucción de una fundación no toca las demás
+    assert (await rollups.get_stats(db, "otra"))["total_sessions"] == 1
+
+async def test_stats_are_cached_until_the_next_increment(db):
+    rollups = DashboardRollups()
+    await create_session(db, rollups, "violeta", month(0))
+    assert (await rollups.get_stats(db, "violeta"))["total_sessions"] == 1
+
+    await db.dashboard_rollups.update_many({}, {"$inc": {"sessions": 10}})
+    assert (await rollups.get_stats(db, "violeta"))["total_sessions"] == 1
+
+    await create_session(db, rollups, "violeta", month(0))
+    assert (await rollups.get_stats(db, "violeta"))["total_sessions"] == 12
+
+class SessionsWithConcurrentWrite:
+    """Colección de sesiones que registra una sesión nueva justo al terminar la agregación
+    de rebuild(), antes de que escriba los rollups"""
+
+    def __init__(self, db, rollups, created_at):
+        self.db = db
+        self.rollups = rollups
+        self.created_at = created_at
+
+    def aggregate(self, *args, **kwargs):
+        async def rows():
+            async for row in self.db.sessions.aggregate(*args, **kwargs):
+                yield row
+            await create_session(self.db, self.rollups, "violeta", self.created_at)
+        return rows()
+
+class RebuildDB:
+    def __init__(self, db, sessions):
+        self.db = db
+        self.sessions = sessions
+
+    def __getattr__(self, name):
+        return getattr(self.db, name)
+
+async def test_rebuild_keeps_increments_recorded_while_it_runs(db):
+    rollups = DashboardRollups()
+    await create_session(db, rollups, "violeta", month(2))
+    await create_session(db, rollups, "violeta", month(0))
+    await create_session(db, rollups, "otra", month(0))
+    await settle(db)
+
+    rebuilt = await rollups.rebuild(RebuildDB(db, SessionsWithConcurrentWrite(db, rollups, month(0))))
+
+    # El mes actual recibió un incremento durante la reconstrucción: se conserva, no se pisa
+    assert rebuilt == 2
+    stats = await rollups.get_stats(db, "violeta")
+    assert stats["total_sessions"] == 3 == await db.sessions.count_documents({"fundacion": "violeta"})
+
+async def test_rebuild_refuses_to_run_without_the_unique_index(db):
+    rollups = DashboardRollups()
+    await create_session(db, rollups, "violeta", month(0))
+    await db.dashboard_rollups.drop_index("fundacion_year_month_unique")
+
+    with pytest.raises(RuntimeError, match="fundacion_year_month_unique"):
+        await rollups.rebuild(db)
+    assert await db.dashboard_rollups.count_documents({}) == 1
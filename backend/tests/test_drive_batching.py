@@ -0,0 +1,89 @@
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+from services.drive_service import BATCH_MAX_REQUESTS
+from services.folder_cache import folder_cache
+
+def batches(calls):
+    return math.ceil(calls / BATCH_MAX_REQUESTS)
+
+def test_new_user_tree_uses_batches(drive, fake_drive):
+    folders = drive.get_or_create_user_folder("U-0001", "Fundacion")
+
+    assert set(folders) == {"user_folder_id", "sesiones_folder_id", "documentos_folder_id"}
+    assert fake_drive.folders[folders["sesiones_folder_id"]] == ("Sesiones", folders["user_folder_id"])
+    assert fake_drive.folders[folders["documentos_folder_id"]] == ("Documentos", folders["user_folder_id"])
+    # Fundación y Usuarias (buscar + crear), batch de búsqueda y de creación de la usuaria
+    # y un solo batch para Sesiones y Documentos (sin buscar: la carpeta es nueva)
+    assert fake_drive.http_requests == 7
+    assert fake_drive.batch_requests == 3
+
+def test_cached_tree_makes_no_requests(drive, fake_drive):
+    folders = drive.get_or_create_user_folder("U-0001", "Fundacion")
+    requests = fake_drive.http_requests
+
+    assert drive.get_or_create_user_folder("U-0001", "Fundacion") == folders
+    assert drive.get_or_create_user_folder("U-0001", "Fundacion", known_folders=folders) == folders
+    assert fake_drive.http_requests == requests
+
+def test_bulk_provisioning_in_one_pass(drive, fake_drive):
+    codigos = [f"U-{index:04d}" for index in range(250)]
+
+    provisioned = drive.provision_user_folders("Fundacion", codigos)
+
+    assert set(provisioned) == set(codigos)
+    assert len(fake_drive.folders) == 2 + 3 * len(codigos)
+    # 4 peticiones para fundación y Usuarias; por nivel, batches de hasta 100 llamadas
+    assert fake_drive.http_requests == 4 + 2 * batches(250) + batches(500)
+
+def test_existing_tree_resolved_with_lookups_only(drive, fake_drive, sync_db):
+    codigos = [f"U-{index:04d}" for index in range(150)] + ["O'Neil"]
+    provisioned = drive.provision_user_folders("Fundacion", codigos)
+    folder_count = len(fake_drive.folders)
+
+    # Caché vacía (memoria y MongoDB): todo se resuelve buscando en Drive
+    folder_cache.memory.clear()
+    sync_db.drive_folders.delete_many({})
+    requests = fake_drive.http_requests
+
+    assert drive.provision_user_folders("Fundacion", codigos) == provisioned
+    assert len(fake_drive.folders) == folder_count
+    assert fake_drive.http_requests - requests == 2 + batches(151) + batches(302)
+
+def test_failed_creations_are_left_out(drive, fake_drive):
+    drive.provision_user_folders("Fundacion", ["U-0001"])
+    usuarias_id = next(folder_id for folder_id, folder in fake_drive.folders.items() if folder[0] == "Usuarias")
+    # La carpeta Usuarias desaparece de Drive pero sigue en caché
+    del fake_drive.folders[usuarias_id]
+
+    assert drive.provision_user_folders("Fundacion", ["U-0002"]) == {}
+    # El 404 invalida la caché: el siguiente intento recrea el árbol
+    assert set(drive.provision_user_folders("Fundacion", ["U-0002"])) == {"U-0002"}
+
+def test_a_missing_folder_only_invalidates_its_own_entries(drive, fake_drive):
+    drive.provision_user_folders("Fundacion A", ["U-0001"])
+    other = drive.provision_user_folders("Fundacion B", ["U-0001"])["U-0001"]
+    usuarias = {fake_drive.folders[folder_id][1]: folder_id
+                for folder_id, folder in fake_drive.folders.items() if folder[0] == "Usuarias"}
+    root = {name: folder_id for folder_id, (name, parent) in fake_drive.folders.items() if name.startswith("Fundacion")}
+    del fake_drive.folders[usuarias[root["Fundacion A"]]]
+
+    assert drive.provision_user_folders("Fundacion A", ["U-0002"]) == {}
+
+    # Se olvidan la carpeta borrada y sus hijas; la otra fundación sigue en memoria
+    assert folder_cache.memory.get((root["Fundacion A"], "Usuarias")) is None
+    assert folder_cache.memory.get((usuarias[root["Fundacion A"]], "U-0001")) is None
+    assert folder_cache.memory.get((root["Fundacion B"], "Usuarias")) == usuarias[root["Fundacion B"]]
+    assert folder_cache.memory.get((usuarias[root["Fundacion B"]], "U-0001")) == other["user_folder_id"]
+
+def test_provisioning_only_waits_for_the_same_users(drive, fake_drive):
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        # Una provisión en curso de U-0001 (p.ej. una masiva) ...
+        with drive._claim([("Fundacion", "U-0001")]):
+            same_user = pool.submit(drive.provision_user_folders, "Fundacion", ["U-0001"])
+            # ... no bloquea a otras usuarias ni a otras fundaciones
+            assert set(pool.submit(drive.provision_user_folders, "Fundacion", ["U-0002"]).result(timeout=10)) == {"U-0002"}
+            assert set(pool.submit(drive.provision_user_folders, "Otra", ["U-0001"]).result(timeout=10)) == {"U-0001"}
+            assert not same_user.done()
+
+        assert set(same_user.result(timeout=10)) == {"U-0001"}
@@ -0,0 +1,85 @@
+import os
+
+import pytest
+
+from services.drive_service import UPLOAD_CHUNK_ALIGN
+
+# Cinco trozos de 256 KB (el último incompleto)
+CONTENT = os.urandom(4 * UPLOAD_CHUNK_ALIGN + 1234)
+
+@pytest.fixture
+def uploader(drive):
+    drive.upload_chunk_size = UPLOAD_CHUNK_ALIGN
+    drive.upload_backoff_base = 0.001
+    return drive
+
+def test_retries_injected_failures_without_resending(uploader, fake_drive):
+    fake_drive.fail_plan = [503, 429, "partial", 500]
+
+    file_id = uploader.upload_file(CONTENT, "a.pdf", "parent", upload_key="session:a")
+
+    assert fake_drive.files[file_id] == CONTENT
+    # Tras cada fallo se consulta a Drive el offset: ningún byte viaja dos veces
+    assert fake_drive.upload_bytes == len(CONTENT)
+    assert uploader.upload_retries == 4
+
+def test_resumes_saved_upload_after_a_crash(uploader, fake_drive, sync_db):
+    # El worker "muere" tras confirmar dos trozos (error no reintentable)
+    fake_drive.fail_plan = [None, None, 400]
+    assert uploader.upload_file(CONTENT, "b.pdf", "parent", upload_key="session:b") is None
+
+    state = sync_db.drive_uploads.find_one({"upload_key": "session:b"})
+    assert state["progress"] == 2 * UPLOAD_CHUNK_ALIGN
+    assert fake_drive.upload_bytes == 2 * UPLOAD_CHUNK_ALIGN
+
+    queries = fake_drive.status_queries
+    file_id = uploader.upload_file(CONTENT, "b.pdf", "parent", upload_key="session:b")
+
+    assert fake_drive.files[file_id] == CONTENT
+    assert fake_drive.status_queries == queries + 1
+    assert fake_drive.upload_bytes == len(CONTENT)
+    assert sync_db.drive_uploads.find_one({"upload_key": "session:b"})["file_id"] == file_id
+
+def test_completed_upload_is_not_sent_again(uploader, fake_drive):
+    file_id = uploader.upload_file(CONTENT, "c.pdf", "parent", upload_key="session:c")
+    requests = fake_drive.http_requests
+
+    assert uploader.upload_file(CONTENT, "c.pdf", "parent", upload_key="session:c") == file_id
+    assert fake_drive.http_requests == requests
+
+def test_changed_content_starts_a_new_upload(uploader, fake_drive):
+    file_id = uploader.upload_file(CONTENT, "d.pdf", "parent", upload_key="session:d")
+
+    new_file_id = uploader.upload_file(CONTENT[::-1], "d.pdf", "parent", upload_key="session:d")
+
+    assert new_file_id != file_id
+    assert fake_drive.files[new_file_id] == CONTENT[::-1]
+
+def test_expired_upload_session_restarts(uploader, fake_drive, sync_db):
+    fake_drive.fail_plan = [None, 400]
+    uploader.upload_file(CONTENT, "e.pdf", "parent", upload_key="session:e")
+    resumable_uri = sync_db.drive_uploads.find_one({"upload_key": "session:e"})["resumable_uri"]
+    fake_drive.uploads.pop(resumable_uri.rsplit("=", 1)[1])
+
+    file_id = uploader.upload_file(CONTENT, "e.pdf", "parent", upload_key="session:e")
+
+    assert fake_drive.files[file_id] == CONTENT
+
+def test_gives_up_after_max_retries(uploader, fake_drive):
+    uploader.upload_max_retries = 3
+    fake_drive.fail_plan = [503] * 10
+
+    assert uploader.upload_file(CONTENT, "f.pdf", "parent") is None
+    assert uploader.upload_retries == 3
+
+def test_upload_pool_runs_uploads_in_parallel(uploader, fake_drive):
+    fake_drive.upload_delay = 0.05
+
+    futures = [
+        uploader.upload_pool.submit(uploader.upload_file, CONTENT, f"p{index}.pdf", "parent")
+        for index in range(6)
+    ]
+    file_ids = [future.result() for future in futures]
+
+    assert all(fake_drive.files[file_id] == CONTENT for file_id in file_ids)
+    assert fake_drive.max_active_uploads == int(os.getenv("DRIVE_UPLOAD_WORKERS", 3))
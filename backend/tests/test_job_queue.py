@@ -0,0 +1,223 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from pymongo.errors import AutoReconnect
+
+from services.job_queue import JobQueue, QUEUED, RUNNING, SUCCEEDED, DEAD
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+def queue():
+    queue = JobQueue()
+    queue.max_attempts = 3
+    queue.lease_seconds = 30
+    queue.backoff_base = 10
+    return queue
+
+async def expire_lease(db, job_id):
+    await db.jobs.update_one({"_id": job_id}, {"$set": {"lease_until": datetime.utcnow() - timedelta(seconds=1)}})
+
+async def make_due(db, job_id):
+    await db.jobs.update_one({"_id": job_id}, {"$set": {"run_at": datetime.utcnow() - timedelta(seconds=1)}})
+
+async def test_claim_and_complete(db, queue):
+    job_id = await queue.enqueue(db, "render", {"n": 1})
+
+    job = await queue.claim(db, "worker-a")
+    assert job["_id"] == job_id
+    assert job["status"] == RUNNING and job["attempts"] == 1
+    # Mientras tiene la concesión nadie más lo reclama
+    assert await queue.claim(db, "worker-b") is None
+
+    await queue.complete(db, job, {"ok": True})
+    stored = await db.jobs.find_one({"_id": job_id})
+    assert stored["status"] == SUCCEEDED and stored["result"] == {"ok": True}
+    assert queue.stats()["processed"] == 1
+
+async def test_claim_filters_by_type_and_run_at(db, queue):
+    await queue.enqueue(db, "upload", {})
+    await queue.enqueue(db, "render", {}, run_at=datetime.utcnow() + timedelta(minutes=5))
+
+    assert await queue.claim(db, "worker-a", ["render"]) is None
+    assert (await queue.claim(db, "worker-a", ["render", "upload"]))["type"] == "upload"
+
+async def test_failures_retry_with_backoff_then_dead_letter(db, queue):
+    job_id = await queue.enqueue(db, "render", {})
+
+    for attempt in range(1, 4):
+        job = await queue.claim(db, "worker-a")
+        assert job["attempts"] == attempt
+        await queue.fail(db, job, RuntimeError(f"fallo {attempt}"))
+        stored = await db.jobs.find_one({"_id": job_id})
+        if attempt < 3:
+            assert stored["status"] == QUEUED
+            assert stored["run_at"] > datetime.utcnow() + timedelta(seconds=5)
+            assert await queue.claim(db, "worker-a") is None
+            await make_due(db, job_id)
+
+    assert stored["status"] == DEAD
+    assert stored["last_error"] == "fallo 3"
+    assert queue.stats() == {"workers": 0, "processed": 0, "retried": 2, "dead": 1}
+    assert await queue.claim(db, "worker-a") is None
+
+    assert await queue.retry_dead(db, job_id)
+    assert (await queue.claim(db, "worker-a"))["attempts"] == 1
+
+async def test_expired_lease_is_reclaimed_and_the_stale_worker_cannot_finish(db, queue):
+    job_id = await queue.enqueue(db, "render", {})
+    stale = await queue.claim(db, "worker-a")
+    await expire_lease(db, job_id)
+
+    job = await queue.claim(db, "worker-b")
+    assert job["locked_by"] == "worker-b" and job["attempts"] == 2
+
+    await queue.complete(db, stale, {"from": "worker-a"})
+    await queue.fail(db, stale, RuntimeError("tarde"))
+    stored = await db.jobs.find_one({"_id": job_id})
+    assert stored["status"] == RUNNING and stored["locked_by"] == "worker-b"
+    assert queue.stats()["processed"] == 0 and queue.stats()["retried"] == 0
+
+async def test_expired_lease_on_last_attempt_is_reaped(db, queue):
+    job_id = await queue.enqueue(db, "render", {}, max_attempts=1)
+    job = await queue.claim(db, "worker-a")
+    await expire_lease(db, job_id)
+
+    assert await queue.claim(db, "worker-b") is None
+    assert await queue.reap_expired(db) == 1
+    stored = await db.jobs.find_one({"_id": job_id})
+    assert stored["status"] == DEAD and stored["lease_until"] is None
+
+    # El worker original ya no puede cerrarlo
+    await queue.complete(db, job)
+    assert (await db.jobs.find_one({"_id": job_id}))["status"] == DEAD
+    assert queue.stats()["processed"] == 0
+
+async def test_heartbeat_keeps_a_slow_job_from_being_reclaimed(db, queue):
+    queue.lease_seconds = 0.3
+    started = asyncio.Event()
+
+    @queue.handler("slow")
+    async def slow(db, payload):
+        started.set()
+        await asyncio.sleep(0.8)
+        return "hecho"
+
+    await queue.enqueue(db, "slow", {})
+    job = await queue.claim(db, "worker-a")
+    processing = asyncio.create_task(queue.process(db, job))
+    await started.wait()
+    for _ in range(4):
+        await asyncio.sleep(0.15)
+        assert await queue.claim(db, "worker-b") is None
+    await processing
+
+    stored = await db.jobs.find_one({"_id": job["_id"]})
+    assert stored["status"] == SUCCEEDED and stored["result"] == "hecho"
+
+async def test_process_without_handler_fails_the_job(db, queue):
+    job_id = await queue.enqueue(db, "desconocido", {})
+    await queue.process(db, await queue.claim(db, "worker-a"))
+
+    stored = await db.jobs.find_one({"_id": job_id})
+    assert stored["status"] == QUEUED
+    assert "No handler registered" in stored["last_error"]
+
+async def test_sweep_runs_reaper_and_sweepers_at_most_once_per_interval(db, queue):
+    calls = []
+
+    @queue.sweeper
+    async def broken(db):
+        calls.append("broken")
+        raise RuntimeError("fallo del barrido")
+
+    @queue.sweeper
+    async def counted(db):
+        calls.append("counted")
+
+    await queue.sweep(db)
+    await queue.sweep(db)
+    assert calls == ["broken", "counted"]
+
+    await queue.sweep(db, force=True)
+    assert calls == ["broken", "counted"] * 2
+
+async def test_pending_session_artifacts_are_enqueued_once(db):
+    from services.session_jobs import sweep_pending_artifacts, ARTIFACTS_SWEEP_GRACE, RENDER_SESSION_PDF
+
+    old = datetime.utcnow() - ARTIFACTS_SWEEP_GRACE - timedelta(minutes=1)
+    lost = await db.sessions.insert_one({"fundacion": "violeta", "artifacts_pending": True, "created_at": old})
+    # Recién creada: su trabajo puede estar en camino
+    await db.sessions.insert_one({"fundacion": "violeta", "artifacts_pending": True, "created_at": datetime.utcnow()})
+    await db.sessions.insert_one({"fundacion": "violeta", "created_at": old})
+
+    assert await sweep_pending_artifacts(db) == 1
+    assert await sweep_pending_artifacts(db) == 0
+    job = await db.jobs.find_one({"type": RENDER_SESSION_PDF})
+    assert job["payload"] == {"session_id": str(lost.inserted_id), "fundacion": "violeta"}
+
+class FlakyJobs:
+    """Colección `jobs` cuyos primeros `failures` update_one fallan como una caída de Mongo"""
+
+    def __init__(self, jobs, failures):
+        self.jobs = jobs
+        self.failures = failures
+
+    async def update_one(self, *args, **kwargs):
+        if self.failures:
+            self.failures -= 1
+            raise AutoReconnect("connection reset")
+        return await self.jobs.update_one(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.jobs, name)
+
+class FlakyDB:
+    def __init__(self, db, failures):
+        self.jobs = FlakyJobs(db.jobs, failures)
+
+async def test_worker_survives_a_db_error_while_completing_a_job(db, queue):
+    queue.poll_interval = 0.01
+    done = []
+
+    @queue.handler("render")
+    async def render(db, payload):
+        done.append(payload["n"])
+        return payload["n"]
+
+    first = await queue.enqueue(db, "render", {"n": 1})
+    second = await queue.enqueue(db, "render", {"n": 2}, run_at=datetime.utcnow() + timedelta(milliseconds=1))
+
+    queue.start(FlakyDB(db, failures=1), concurrency=1)
+    try:
+        for _ in range(100):
+            if (await db.jobs.find_one({"_id": second}))["status"] == SUCCEEDED:
+                break
+            await asyncio.sleep(0.01)
+        worker = queue._tasks[0]
+        assert not worker.done()
+    finally:
+        await queue.stop()
+
+    assert done == [1, 2]
+    assert (await db.jobs.find_one({"_id": second}))["status"] == SUCCEEDED
+    # El primero quedó en running: se reclamará cuando venza su concesión
+    assert (await db.jobs.find_one({"_id": first}))["status"] == RUNNING
+
+async def test_heartbeat_keeps_renewing_after_a_failed_renewal(db, queue):
+    queue.lease_seconds = 0.3
+
+    @queue.handler("slow")
+    async def slow(db, payload):
+        await asyncio.sleep(0.8)
+
+    await queue.enqueue(db, "slow", {})
+    job = await queue.claim(db, "worker-a")
+    processing = asyncio.create_task(queue.process(FlakyDB(db, failures=1), job))
+    for _ in range(5):
+        await asyncio.sleep(0.15)
+        assert await queue.claim(db, "worker-b") is None
+    await processing
+
+    assert (await db.jobs.find_one({"_id": job["_id"]}))["status"] == SUCCEEDED
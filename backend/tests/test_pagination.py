@@ -0,0 +1,45 @@
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from services.pagination import KEYSET_SORT, encode_cursor, decode_cursor, keyset_filter
+
+pytestmark = pytest.mark.anyio
+
+def test_cursor_round_trip():
+    document = {"_id": ObjectId(), "created_at": datetime(2025, 3, 1, 12, 30, 15, 123000)}
+
+    assert decode_cursor(encode_cursor(document)) == (document["created_at"], document["_id"])
+
+@pytest.mark.parametrize("cursor", ["", "no-es-base64", "e30", "eyJmb28iOjF9"])
+def test_invalid_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+def test_without_cursor_the_query_is_unchanged():
+    query = {"fundacion": "F"}
+    assert keyset_filter(query, None) is query
+
+async def test_keyset_pages_cover_every_document_once(db):
+    # Varias sesiones comparten created_at: el _id desempata
+    base = datetime(2025, 1, 1)
+    await db.sessions.insert_many([
+        {"fundacion": "F", "created_at": base + timedelta(minutes=index // 3)}
+        for index in range(23)
+    ])
+    await db.sessions.insert_one({"fundacion": "Otra", "created_at": base})
+
+    seen = []
+    cursor = None
+    while True:
+        query = keyset_filter({"fundacion": "F"}, cursor)
+        page = await db.sessions.find(query).sort(KEYSET_SORT).limit(5).to_list(length=5)
+        if not page:
+            break
+        seen.extend(page)
+        cursor = encode_cursor(page[-1])
+
+    expected = await db.sessions.find({"fundacion": "F"}).sort(KEYSET_SORT).to_list(length=None)
+    assert [doc["_id"] for doc in seen] == [doc["_id"] for doc in expected]
+    assert len(seen) == 23
@@ -0,0 +1,63 @@
+import asyncio
+import threading
+
+import pytest
+
+from services.password_hasher import PasswordHasher, PasswordHasherBusy
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+def hasher(monkeypatch):
+    monkeypatch.setenv("BCRYPT_ROUNDS", "4")
+    monkeypatch.setenv("PASSWORD_HASH_WORKERS", "1")
+    monkeypatch.setenv("PASSWORD_HASH_QUEUE", "1")
+    hasher = PasswordHasher()
+    yield hasher
+    hasher.shutdown()
+
+async def test_hash_and_verify_in_the_pool(hasher):
+    hashed = await hasher.hash("secreta")
+
+    assert await hasher.verify_and_update("secreta", hashed) == (True, None)
+    assert (await hasher.verify_and_update("otra", hashed))[0] is False
+
+async def test_weaker_hashes_are_upgraded(hasher, monkeypatch):
+    hashed = await hasher.hash("secreta")
+    monkeypatch.setenv("BCRYPT_ROUNDS", "5")
+    stronger = PasswordHasher()
+    try:
+        valid, new_hash = await stronger.verify_and_update("secreta", hashed)
+    finally:
+        stronger.shutdown()
+
+    assert valid and new_hash.startswith("$2b$05$")
+    assert stronger.stats()["rehashed"] == 1
+
+async def test_full_queue_rejects_instead_of_waiting(hasher):
+    release = threading.Event()
+    hasher.context = type("Blocking", (), {"hash": lambda self, password: release.wait(5)})()
+
+    # Un trabajo ocupa el pool y otro espera en la cola
+    running = [asyncio.create_task(hasher.hash("x")) for _ in range(2)]
+    await asyncio.sleep(0)
+    with pytest.raises(PasswordHasherBusy):
+        await hasher.hash("x")
+    release.set()
+    await asyncio.gather(*running)
+
+    assert hasher.stats()["rejected"] == 1 and hasher.stats()["pending"] == 0
+
+async def test_inline_mode_verifies_on_the_event_loop_thread(hasher):
+    hashed = await hasher.hash("secreta")
+    threads = []
+    verify = hasher.context.verify_and_update
+    hasher.context.verify_and_update = lambda *args: threads.append(threading.current_thread()) or verify(*args)
+
+    hasher.inline = True
+    assert (await hasher.verify_and_update("secreta", hashed))[0] is True
+    hasher.inline = False
+    assert (await hasher.verify_and_update("secreta", hashed))[0] is True
+
+    assert threads[0] is threading.current_thread()
+    assert threads[1] is not threading.current_thread()
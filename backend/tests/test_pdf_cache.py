@@ -0,0 +1,40 @@
+from datetime import datetime
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+async def test_profile_pdf_revalidates_with_a_weak_etag(api, db, monkeypatch):
+    import server
+
+    renders = []
+
+    async def render_profile(profile, sessions):
+        renders.append(profile["codigo_usuaria"])
+        return b"%PDF-" + str(len(renders)).encode()
+
+    async def cache_miss(key):
+        return None
+
+    async def cache_put(key, content):
+        pass
+
+    monkeypatch.setattr(server.pdf_executor, "render_profile", render_profile)
+    monkeypatch.setattr(server.pdf_cache, "get", cache_miss)
+    monkeypatch.setattr(server.pdf_cache, "put", cache_put)
+    profile = await db.profiles.insert_one(
+        {"codigo_usuaria": "A1", "fundacion": "violeta", "created_at": datetime(2025, 1, 1)}
+    )
+    token = server.create_user_token({"_id": server.ObjectId(), "fundacion": "violeta", "rol": "terapeuta"})
+    url = f"/api/profiles/{profile.inserted_id}/pdf"
+    headers = {"Authorization": f"Bearer {token}"}
+
+    response = await api.get(url, headers=headers)
+    etag = response.headers["etag"]
+    # Un nuevo render da otros bytes con el mismo ETag: no puede ser fuerte
+    assert etag.startswith('W/"')
+
+    for if_none_match in (etag, etag[2:]):
+        revalidated = await api.get(url, headers={**headers, "If-None-Match": if_none_match})
+        assert revalidated.status_code == 304 and revalidated.headers["etag"] == etag
+    assert renders == ["A1"]
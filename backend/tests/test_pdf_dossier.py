@@ -0,0 +1,41 @@
+import re
+
+from benchmark_pdf import sample_data, dossier_sessions
+from services.pdf_service import LazyStory, pdf_service
+
+def page_count(pdf):
+    return len(re.findall(rb"/Type /Page\b(?!s)", pdf))
+
+def test_lazy_story_refills_one_chunk_at_a_time():
+    consumed = []
+
+    def chunks():
+        for index in range(3):
+            consumed.append(index)
+            yield [f"{index}-a", f"{index}-b"]
+
+    story = LazyStory(chunks())
+    assert len(story) == 2 and consumed == [0]
+
+    items = []
+    while len(story):
+        items.append(story[0])
+        del story[0]
+        # Nunca hay más de una tanda en memoria
+        assert list.__len__(story) <= 2
+
+    assert items == ["0-a", "0-b", "1-a", "1-b", "2-a", "2-b"]
+    assert consumed == [0, 1, 2]
+
+def test_incremental_dossier_matches_list_build():
+    profile, _ = sample_data(0)["profile"]
+    sessions = list(dossier_sessions(120))
+
+    incremental = pdf_service.render_incremental(
+        "profile_dossier", profile, history=dossier_sessions(120), details=dossier_sessions(120)
+    )
+    whole = pdf_service.render("profile_dossier", profile, history=sessions, details=sessions)
+
+    # Una página de detalle por sesión, más portada e historial
+    assert page_count(incremental) > 120
+    assert page_count(incremental) == page_count(whole)
@@ -0,0 +1,52 @@
+import asyncio
+from concurrent.futures import Executor, Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from services.pdf_executor import PDFRenderExecutor
+
+pytestmark = pytest.mark.anyio
+
+class ControlledPool(Executor):
+    """Pool cuyos trabajos terminan cuando la prueba lo decide"""
+
+    def __init__(self):
+        self.futures = []
+        self.shut_down = False
+
+    def submit(self, func, *args):
+        future = Future()
+        self.futures.append(future)
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+async def test_a_late_broken_pool_error_does_not_shut_down_its_replacement(monkeypatch):
+    executor = PDFRenderExecutor()
+    pools = [ControlledPool(), ControlledPool()]
+    monkeypatch.setattr("services.pdf_executor.ProcessPoolExecutor", lambda **kwargs: pools.pop(0))
+
+    first = asyncio.create_task(executor.render_session({"n": 1}))
+    second = asyncio.create_task(executor.render_session({"n": 2}))
+    await asyncio.sleep(0)
+    broken = executor.executor
+    assert len(broken.futures) == 2
+
+    # El primer fallo retira el pool roto y una petición nueva crea otro
+    broken.futures[0].set_exception(BrokenProcessPool())
+    assert await first is None
+    unrelated = asyncio.create_task(executor.render_session({"n": 3}))
+    await asyncio.sleep(0)
+    replacement = executor.executor
+    assert replacement is not broken and broken.shut_down
+
+    # El segundo fallo llega tarde: no debe tocar el pool nuevo ni su trabajo
+    broken.futures[1].set_exception(BrokenProcessPool())
+    assert await second is None
+    assert executor.executor is replacement and not replacement.shut_down
+
+    replacement.futures[0].set_result(b"%PDF")
+    assert await unrelated == b"%PDF"
+    assert executor.stats()["failed"] == 2 and executor.stats()["completed"] == 1
@@ -0,0 +1,43 @@
+import io
+import zipfile
+
+import pytest
+
+from services.pdf_export import PDFExportTracker, session_pdf_name
+
+pytestmark = pytest.mark.anyio
+
+class SessionsCursor:
+    def __init__(self, sessions):
+        self.sessions = iter(sessions)
+
+    async def next(self):
+        try:
+            return next(self.sessions)
+        except StopIteration:
+            raise StopAsyncIteration
+
+def test_zip_paths_cannot_escape_the_archive():
+    name = session_pdf_name({"_id": "abc", "codigo_usuaria": "../../etc", "sesion_no": "1/..", "fecha": "C:\\x"})
+
+    assert name == "____etc/Sesion_1___C__x_abc.pdf"
+    assert session_pdf_name({"_id": "abc", "codigo_usuaria": ".."}).startswith("_/")
+    assert session_pdf_name({"_id": "abc", "codigo_usuaria": ""}).startswith("sin_codigo/")
+
+async def test_a_session_that_fails_to_read_is_listed_in_errores(monkeypatch):
+    async def read_session_pdf(session):
+        if session["_id"] == "broken":
+            raise ConnectionError("blob store unavailable")
+        return b"%PDF-" + session["_id"].encode()
+
+    monkeypatch.setattr("services.pdf_export.read_session_pdf", read_session_pdf)
+    sessions = [{"_id": _id, "codigo_usuaria": "A1", "sesion_no": "1", "fecha": "2025-01-01"} for _id in ("ok", "broken")]
+    tracker = PDFExportTracker()
+    progress = tracker.create("violeta", len(sessions))
+
+    body = b"".join([chunk async for chunk in tracker.stream_zip(SessionsCursor(sessions), progress)])
+
+    archive = zipfile.ZipFile(io.BytesIO(body))
+    assert archive.read("A1/Sesion_1_2025-01-01_ok.pdf") == b"%PDF-ok"
+    assert "broken" in archive.read("ERRORES.txt").decode()
+    assert (progress["status"], progress["completed"], progress["failed"]) == ("completed", 1, 1)
@@ -0,0 +1,90 @@
+from datetime import datetime
+
+import pytest
+
+from services.database import database
+
+pytestmark = pytest.mark.anyio
+
+# Métodos de colección que envían una consulta al servidor
+QUERY_METHODS = {"find", "find_one", "aggregate", "count_documents", "estimated_document_count", "distinct"}
+
+class CountingCollection:
+    def __init__(self, collection, queries):
+        self.collection = collection
+        self.queries = queries
+
+    def __getattr__(self, name):
+        attr = getattr(self.collection, name)
+        if name in QUERY_METHODS:
+            self.queries.append(f"{self.collection.name}.{name}")
+        return attr
+
+class CountingDB:
+    """Base de datos que registra cada consulta enviada, como un CommandListener de pymongo"""
+
+    def __init__(self, db):
+        self.db = db
+        self.queries = []
+
+    def __getattr__(self, name):
+        return CountingCollection(getattr(self.db, name), self.queries)
+
+    def __getitem__(self, name):
+        return CountingCollection(self.db[name], self.queries)
+
+async def seed_profiles(db, fundacion, count):
+    await db.profiles.insert_many([
+        {
+            "codigo_usuaria": f"{fundacion}-{n:05d}",
+            "estado_caso": "activo",
+            "terapeuta_asignado": "Terapeuta",
+            "fundacion": fundacion,
+            "total_sessions": n % 7,
+            "created_at": datetime(2025, 1, 1)
+        }
+        for n in range(count)
+    ])
+    await db.sessions.insert_many([
+        {"codigo_usuaria": f"{fundacion}-{n:05d}", "fundacion": fundacion, "created_at": datetime(2025, 2, 1)}
+        for n in range(count)
+    ])
+
+async def list_profiles_queries(api, db, monkeypatch, fundacion):
+    import server
+
+    token = server.create_user_token({"_id": server.ObjectId(), "fundacion": fundacion, "rol": "terapeuta"})
+    counting = CountingDB(db)
+    monkeypatch.setattr(database, "db", counting)
+    response = await api.get("/api/profiles", headers={"Authorization": f"Bearer {token}"})
+    monkeypatch.setattr(database, "db", db)
+
+    assert response.status_code == 200
+    return len(response.json()["profiles"]), counting.queries
+
+async def test_listing_profiles_issues_the_same_queries_for_10_and_1000_profiles(api, db, monkeypatch):
+    await seed_profiles(db, "pequena", 10)
+    await seed_profiles(db, "grande", 1000)
+
+    small, small_queries = await list_profiles_queries(api, db, monkeypatch, "pequena")
+    large, large_queries = await list_profiles_queries(api, db, monkeypatch, "grande")
+
+    assert (small, large) == (10, 1000)
+    # Una sola consulta: las estadísticas vienen materializadas en cada perfil
+    assert small_queries == large_queries == ["profiles.find"]
+
+async def test_sparse_fieldsets_only_return_the_requested_fields(api, db):
+    import server
+
+    await db.profiles.insert_many([
+        {"codigo_usuaria": "A", "fundacion": "f", "total_sessions": 3, "created_at": datetime(2025, 1, 2)},
+        {"codigo_usuaria": "B", "fundacion": "f", "created_at": datetime(2025, 1, 1)}
+    ])
+    token = server.create_user_token({"_id": server.ObjectId(), "fundacion": "f", "rol": "terapeuta"})
+    headers = {"Authorization": f"Bearer {token}"}
+
+    profiles = (await api.get("/api/profiles", params={"fields": "codigo_usuaria"}, headers=headers)).json()["profiles"]
+    assert [set(p) for p in profiles] == [{"_id", "codigo_usuaria"}] * 2
+
+    profiles = (await api.get("/api/profiles", params={"fields": "total_sessions"}, headers=headers)).json()["profiles"]
+    assert [p["total_sessions"] for p in profiles] == [3, 0]
@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from services.profile_stats import record_session, rebuild_profile_stats
+
+pytestmark = pytest.mark.anyio
+
+async def add_session(db, codigo_usuaria, days_ago):
+    created_at = datetime(2025, 3, 1) - timedelta(days=days_ago)
+    session = {
+        "fundacion": "violeta",
+        "codigo_usuaria": codigo_usuaria,
+        "created_at": created_at,
+        "fecha": created_at.strftime("%Y-%m-%d")
+    }
+    await db.sessions.insert_one(session)
+    await record_session(db, session)
+
+async def profile_stats(db):
+    return await db.profiles.find({}, {"_id": 0, "fundacion": 0}).sort("codigo_usuaria", 1).to_list(length=None)
+
+async def test_recorded_counters_match_a_batched_rebuild(db):
+    for codigo in ["A1", "B2", "C3"]:
+        await db.profiles.insert_one({"fundacion": "violeta", "codigo_usuaria": codigo})
+    await db.profiles.insert_one({"fundacion": "otra", "codigo_usuaria": "A1"})
+    # Sesiones registradas fuera de orden: last_session_* debe quedarse con la más reciente
+    for codigo, days_ago in [("A1", 3), ("A1", 10), ("A1", 1), ("B2", 5)]:
+        await add_session(db, codigo, days_ago)
+
+    recorded = await profile_stats(db)
+    assert recorded[0]["total_sessions"] == 3
+    assert recorded[0]["last_session_date"] == "2025-02-28"
+    assert "total_sessions" not in recorded[-1]
+
+    await db.profiles.update_many({}, {"$set": {"total_sessions": 99, "last_session_date": "2030-01-01"}})
+    assert await rebuild_profile_stats(db, batch_size=2) == 4
+
+    rebuilt = await profile_stats(db)
+    assert [p["total_sessions"] for p in rebuilt] == [3, 0, 1, 0]
+    assert rebuilt[0]["last_session_date"] == "2025-02-28"
+    assert [p for p in rebuilt if p["codigo_usuaria"] == "C3"][0].get("last_session_date") is None
+
+async def test_a_failed_counter_update_does_not_fail_the_saved_session(api, db, monkeypatch):
+    import server
+
+    async def failing_record_session(db, session_dict):
+        raise RuntimeError("stats unavailable")
+
+    monkeypatch.setattr(server, "record_session", failing_record_session)
+    token = server.create_user_token({"_id": server.ObjectId(), "fundacion": "violeta", "rol": "terapeuta"})
+    session = {
+        field: "x" for field in [
+            "sesion_no", "fecha", "terapeuta", "objetivo_sesion", "desarrollo_objetivo",
+            "ejercicios_actividades", "avances_proceso_terapeutico", "cierre_sesion", "firma_terapeuta"
+        ]
+    }
+    response = await api.post(
+        "/api/sessions",
+        json={**session, "codigo_usuaria": "A1", "fundacion": "violeta"},
+        headers={"Authorization": f"Bearer {token}"}
+    )
+
+    assert response.status_code == 200
+    assert await db.sessions.count_documents({"codigo_usuaria": "A1"}) == 1
+    # El otro contador se actualiza igualmente
+    assert (await db.dashboard_rollups.find_one({"fundacion": "violeta"}))["sessions"] == 1
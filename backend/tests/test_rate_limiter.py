@@ -0,0 +1,163 @@
+import pytest
+
+from services import rate_limiter
+from services.rate_limiter import (
+    MemoryRateLimitStore, RateLimiter, RateLimitExceeded, parse_rate
+)
+
+pytestmark = pytest.mark.anyio
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limiter.time, "monotonic", clock)
+    monkeypatch.setattr(rate_limiter.time, "time", clock)
+    return clock
+
+async def test_rejects_over_the_limit_and_recovers_after_the_window(clock):
+    limiter = RateLimiter("login", 3, 60, MemoryRateLimitStore())
+
+    for _ in range(3):
+        await limiter.check("1.2.3.4", "ana@example.org")
+    with pytest.raises(RateLimitExceeded) as exc:
+        await limiter.check("1.2.3.4", "ana@example.org")
+    assert 0 < exc.value.retry_after <= 61
+
+    clock.now += 61
+    await limiter.check("1.2.3.4", "ana@example.org")
+    assert limiter.stats()["allowed"] == 4
+    assert limiter.stats()["rejected"] == 1
+
+async def test_any_exceeded_key_rejects_the_attempt(clock):
+    limiter = RateLimiter("login", 2, 60, MemoryRateLimitStore())
+
+    await limiter.check("1.2.3.4", "ana@example.org")
+    await limiter.check("1.2.3.4", "bea@example.org")
+    # Misma IP, otro email: la IP ya agotó su cupo
+    with pytest.raises(RateLimitExceeded):
+        await limiter.check("1.2.3.4", "carla@example.org")
+
+async def test_rejected_attempts_do_not_extend_the_block(clock):
+    store = MemoryRateLimitStore()
+    for _ in range(2):
+        assert (await store.hit("key", 2, 60))[0]
+
+    # Reintentos durante el bloqueo
+    for _ in range(10):
+        clock.now += 5
+        assert not (await store.hit("key", 2, 60))[0]
+
+    clock.now += 11
+    assert (await store.hit("key", 2, 60))[0]
+
+async def test_memory_store_evicts_least_recently_used_keys(clock):
+    store = MemoryRateLimitStore(max_keys=3)
+    for key in "abc":
+        await store.hit(key, 5, 60)
+    await store.hit("a", 5, 60)
+    await store.hit("d", 5, 60)
+
+    assert list(store._hits) == ["c", "a", "d"]
+
+def test_parse_rate_falls_back_to_default():
+    assert parse_rate("20/30", "10/60") == (20, 30.0)
+    assert parse_rate(None, "10/60") == (10, 60.0)
+    assert parse_rate("muchos", "10/60") == (10, 60.0)
+
+@pytest.fixture
+def redis_store(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    import redis.asyncio
+
+    monkeypatch.setattr(redis.asyncio, "from_url", lambda url: fakeredis.FakeAsyncRedis())
+    return rate_limiter.RedisRateLimitStore("redis://test")
+
+async def test_redis_store_only_records_allowed_attempts(redis_store, clock):
+    results = [await redis_store.hit("key", 3, 60) for _ in range(10)]
+
+    assert [allowed for allowed, _ in results] == [True] * 3 + [False] * 7
+    assert await redis_store.client.zcard("key") == 3
+
+    clock.now += 61
+    assert (await redis_store.hit("key", 3, 60))[0]
+
+async def test_redis_errors_fall_back_to_memory(redis_store, clock):
+    async def unavailable(*args, **kwargs):
+        raise ConnectionError("Redis down")
+    redis_store.script = unavailable
+
+    assert (await redis_store.hit("key", 1, 60))[0]
+    assert not (await redis_store.hit("key", 1, 60))[0]
+
+@pytest.fixture
+def login_limit(monkeypatch):
+    """Limitador de login del servidor con su configuración por defecto y un store limpio"""
+    from services.rate_limiter import login_limiter
+
+    monkeypatch.setattr(login_limiter, "store", MemoryRateLimitStore())
+    monkeypatch.setattr(login_limiter, "limit", 10)
+    monkeypatch.setattr(login_limiter, "window", 60)
+    return login_limiter
+
+async def test_credential_stuffing_burst_is_rejected_before_bcrypt(api, db, login_limit, monkeypatch):
+    import time
+    from services.password_hasher import password_hasher
+
+    # Coste configurado (BCRYPT_ROUNDS): cada verificación que pase el limitador cuesta ~cientos de ms de CPU
+    hashed = password_hasher.context.hash("correcta")
+    await db.users.insert_many([{"email": f"u{i}@example.org", "password": hashed, "rol": "user"} for i in range(100)])
+
+    verifications = []
+    verify_and_update = password_hasher.verify_and_update
+    async def counting(password, hashed_password):
+        verifications.append(password)
+        return await verify_and_update(password, hashed_password)
+    monkeypatch.setattr(password_hasher, "verify_and_update", counting)
+
+    started = time.process_time()
+    password_hasher.context.verify("incorrecta", hashed)
+    one_verification = time.process_time() - started
+
+    # Una IP prueba 100 pares email/contraseña distintos
+    started = time.process_time()
+    statuses = [
+        (await api.post("/api/auth/login", json={"email": f"u{i}@example.org", "password": "incorrecta"})).status_code
+        for i in range(100)
+    ]
+    burst_cpu = time.process_time() - started
+
+    assert statuses == [401] * 10 + [429] * 90
+    assert len(verifications) == 10
+    # Los 90 rechazos no añaden ni la mitad de lo que cuestan las 10 verificaciones permitidas
+    assert burst_cpu < one_verification * 15
+
+async def test_clients_behind_the_proxy_get_their_own_limit(api, login_limit, monkeypatch):
+    import server
+
+    # Un proxy de la plataforma que añade la IP real al final de X-Forwarded-For
+    monkeypatch.setattr(server, "TRUSTED_PROXY_HOPS", 1)
+
+    async def login(forwarded_for, email):
+        response = await api.post(
+            "/api/auth/login",
+            json={"email": email, "password": "x"},
+            headers={"X-Forwarded-For": forwarded_for}
+        )
+        return response.status_code
+
+    # Todas llegan desde la IP del proxy; cada una con su propia IP de origen
+    assert [await login(f"10.0.0.{i}", f"u{i}@example.org") for i in range(30)] == [401] * 30
+
+    # Una entrada inventada a la izquierda no da un cupo nuevo: cuenta para la IP real
+    statuses = [await login(f"203.0.113.{i}, 10.0.1.1", f"v{i}@example.org") for i in range(10)]
+    assert statuses == [401] * 10
+    assert await login("10.0.1.1", "w@example.org") == 429
+    assert await login("198.51.100.7, 10.0.1.1", "x@example.org") == 429
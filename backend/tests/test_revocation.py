@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+from services.revocation import TokenRevocationList
+
+pytestmark = pytest.mark.anyio
+
+async def test_revocation_list_tracks_inactive_users_and_token_versions(db):
+    active = await db.users.insert_one({"active": True})
+    inactive = await db.users.insert_one({"active": False})
+    rotated = await db.users.insert_one({"active": True, "token_version": 2})
+    revocation = TokenRevocationList()
+
+    await revocation.refresh(db)
+
+    assert not revocation.is_revoked(str(active.inserted_id))
+    assert revocation.is_revoked(str(inactive.inserted_id))
+    assert revocation.is_revoked(str(rotated.inserted_id), 1)
+    assert not revocation.is_revoked(str(rotated.inserted_id), 2)
+
+    # Una revocación local aplica antes del siguiente refresco
+    revocation.revoke(rotated.inserted_id, 3)
+    assert revocation.is_revoked(str(rotated.inserted_id), 2)
+    await db.users.update_one({"_id": active.inserted_id}, {"$set": {"active": False}})
+    await revocation.refresh(db)
+    assert revocation.is_revoked(str(active.inserted_id))
+
+class FlakyDB:
+    """Base de datos cuya primera consulta de usuarios falla"""
+
+    def __init__(self, db):
+        self.db = db
+        self.failures = 1
+
+    @property
+    def users(self):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("mongod unavailable")
+        return self.db.users
+
+async def test_tokens_are_rejected_until_the_first_successful_load(db):
+    active = await db.users.insert_one({"active": True})
+    revocation = TokenRevocationList()
+    revocation.interval = 0.01
+
+    await revocation.start(FlakyDB(db))
+    try:
+        assert revocation.is_revoked(str(active.inserted_id))
+        assert revocation.stats()["loaded"] is False
+
+        # El refresco en segundo plano reintenta y, al cargar, vuelve a aceptar tokens
+        for _ in range(100):
+            if revocation.loaded:
+                break
+            await asyncio.sleep(0.01)
+        assert not revocation.is_revoked(str(active.inserted_id))
+    finally:
+        await revocation.stop()
@@ -0,0 +1,72 @@
+import tracemalloc
+from datetime import datetime
+
+import orjson
+import pytest
+from bson import ObjectId
+
+from services.serialization import MongoJSONResponse, stream_ndjson
+
+pytestmark = pytest.mark.anyio
+
+async def test_stream_ndjson_emits_one_line_per_document(db):
+    ids = [ObjectId() for _ in range(3)]
+    await db.sessions.insert_many([
+        {"_id": session_id, "n": n, "created_at": datetime(2025, 1, n + 1), "tags": {"ref": session_id}}
+        for n, session_id in enumerate(ids)
+    ])
+
+    lines = [line async for line in stream_ndjson(db.sessions.find().sort("n", 1))]
+
+    assert all(line.endswith(b"\n") and line.count(b"\n") == 1 for line in lines)
+    documents = [orjson.loads(line) for line in lines]
+    assert [d["_id"] for d in documents] == [str(session_id) for session_id in ids]
+    assert documents[0]["created_at"] == "2025-01-01T00:00:00"
+    assert documents[2]["tags"] == {"ref": str(ids[2])}
+
+def test_mongo_json_response_serializes_bson_types():
+    profile_id = ObjectId()
+    response = MongoJSONResponse({"profiles": [{"_id": profile_id, "total_sessions": 0}]})
+
+    assert orjson.loads(response.body) == {"profiles": [{"_id": str(profile_id), "total_sessions": 0}]}
+
+class BatchedCursor:
+    """Cursor asíncrono que, como Motor, genera los documentos por lotes bajo demanda"""
+
+    def __init__(self, total, batch_size=100):
+        self.total = total
+        self.batch_size = batch_size
+
+    async def __aiter__(self):
+        for start in range(0, self.total, self.batch_size):
+            batch = [
+                {
+                    "_id": ObjectId(),
+                    "sesion_no": str(n),
+                    "created_at": datetime(2025, 1, 1),
+                    "desarrollo_objetivo": f"Nota de la sesión {n}. " * 40
+                }
+                for n in range(start, min(start + self.batch_size, self.total))
+            ]
+            for document in batch:
+                yield document
+
+async def stream_peak(total):
+    """Pico de memoria de exportar `total` documentos (las líneas se descartan, como al enviarlas)"""
+    tracemalloc.start()
+    try:
+        lines = 0
+        async for line in stream_ndjson(BatchedCursor(total)):
+            lines += 1
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert lines == total
+    return peak
+
+async def test_stream_ndjson_peak_memory_does_not_grow_with_the_export():
+    small = await stream_peak(1000)
+    large = await stream_peak(10000)
+
+    # Con 10 veces más documentos el pico es el de un lote, no el de la exportación
+    assert large < small * 1.5
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Worker de la cola de trabajos de Registro Violeta
+Procesa en un proceso aparte los trabajos posteriores a crear una sesión
+(generar y guardar el PDF, subirlo a Google Drive).
+
+Uso:
+    python worker.py                    # JOB_WORKER_CONCURRENCY workers
+    python worker.py --concurrency 4
+
+Si se despliega este worker, la API puede arrancar con JOB_WORKER_EMBEDDED=false.
+"""
+
+import signal
+import asyncio
+import argparse
+import logging
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from services.database import database
+from services.indexes import ensure_indexes
+from services.pdf_executor import pdf_executor
+from services.job_queue import job_queue
+import services.session_jobs  # noqa: F401  (registra los manejadores)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("worker")
+
+async def run(args):
+    database.connect()
+    await ensure_indexes(database.db)
+    pdf_executor.start()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    job_queue.start(database.db, args.concurrency)
+    logger.info(f"Worker running, handling: {', '.join(job_queue.handlers)}")
+    try:
+        await stop.wait()
+    finally:
+        # Los trabajos interrumpidos vuelven a la cola al vencer su concesión
+        logger.info("Stopping worker")
+        await job_queue.stop()
+        pdf_executor.shutdown()
+        database.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker de la cola de trabajos")
+    parser.add_argument("--concurrency", type=int, help="Trabajos procesados a la vez")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
@@ -44,8 +44,10 @@ const Dashboard = () => {
       setStats(statsRes.data);
 
       // Obtener sesiones recientes
-      const sessionsRes = await axios.get('/api/sessions');
-      setRecentSessions(sessionsRes.data.sessions.slice(0, 5));
+      const sessionsRes = await axios.get('/api/sessions', {
+        params: { limit: 5, fields: 'summary,objetivo_sesion' }
+      });
+      setRecentSessions(sessionsRes.data.sessions);
       
     } catch (error) {
       console.error('Error fetching dashboard data:', error);
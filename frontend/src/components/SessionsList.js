@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { Link } from 'react-router-dom';
 import { FileText, Search, Filter, Calendar, User, Eye, Plus } from 'lucide-react';
 import axios from 'axios';
@@ -11,33 +11,61 @@ const SessionsList = () => {
   const [searchTerm, setSearchTerm] = useState('');
   const [filterCode, setFilterCode] = useState('');
   const [selectedSession, setSelectedSession] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [codes, setCodes] = useState([]);
+  // Solo se aplica la respuesta de la última petición (el filtro puede cambiar antes de que llegue)
+  const latestRequest = useRef(0);
 
   useEffect(() => {
-    fetchSessions();
+    fetchCodes();
   }, []);
 
-  const fetchSessions = async () => {
+  // El filtro por código se aplica en el servidor: al cambiarlo se vuelve a la primera página
+  useEffect(() => {
+    setLoading(true);
+    fetchSessions();
+  }, [filterCode]);
+
+  const fetchCodes = async () => {
     try {
-      const response = await axios.get('/api/sessions');
-      setSessions(response.data.sessions || []);
+      const response = await axios.get('/api/profiles', { params: { fields: 'codigo_usuaria' } });
+      setCodes((response.data.profiles || []).map(profile => profile.codigo_usuaria).sort());
+    } catch (error) {
+      console.error('Error fetching profile codes:', error);
+    }
+  };
+
+  const fetchSessions = async (cursor = null) => {
+    const request = ++latestRequest.current;
+    try {
+      const params = {};
+      if (filterCode) params.codigo_usuaria = filterCode;
+      if (cursor) params.cursor = cursor;
+      const response = await axios.get('/api/sessions', { params });
+      if (request !== latestRequest.current) return;
+      const page = response.data.sessions || [];
+      setSessions(prev => (cursor ? [...prev, ...page] : page));
+      setNextCursor(response.data.next_cursor || null);
     } catch (error) {
       console.error('Error fetching sessions:', error);
     } finally {
-      setLoading(false);
+      if (request === latestRequest.current) setLoading(false);
     }
   };
 
-  const filteredSessions = sessions.filter(session => {
-    const matchesSearch = session.codigo_usuaria.toLowerCase().includes(searchTerm.toLowerCase()) ||
-                         session.objetivo_sesion.toLowerCase().includes(searchTerm.toLowerCase()) ||
-                         session.terapeuta.toLowerCase().includes(searchTerm.toLowerCase());
-    
-    const matchesFilter = filterCode === '' || session.codigo_usuaria === filterCode;
-    
-    return matchesSearch && matchesFilter;
-  });
+  const loadMoreSessions = async () => {
+    setLoadingMore(true);
+    await fetchSessions(nextCursor);
+    setLoadingMore(false);
+  };
 
-  const uniqueCodes = [...new Set(sessions.map(session => session.codigo_usuaria))];
+  // La búsqueda de texto filtra las sesiones ya cargadas
+  const filteredSessions = sessions.filter(session =>
+    session.codigo_usuaria.toLowerCase().includes(searchTerm.toLowerCase()) ||
+    session.objetivo_sesion.toLowerCase().includes(searchTerm.toLowerCase()) ||
+    session.terapeuta.toLowerCase().includes(searchTerm.toLowerCase())
+  );
 
   const SessionModal = ({ session, onClose }) => {
     if (!session) return null;
@@ -191,7 +219,7 @@ const SessionsList = () => {
                 className="violeta-input"
               >
                 <option value="">Todos los códigos</option>
-                {uniqueCodes.map(code => (
+                {codes.map(code => (
                   <option key={code} value={code}>{code}</option>
                 ))}
               </select>
@@ -260,7 +288,11 @@ const SessionsList = () => {
               <FileText className="mx-auto h-12 w-12 text-gray-400" />
               <h3 className="mt-2 text-sm font-medium text-gray-900">No hay sesiones</h3>
               <p className="mt-1 text-sm text-gray-500">
-                {searchTerm || filterCode ? 'No se encontraron sesiones con los filtros aplicados.' : 'Comienza creando tu primera sesión terapéutica.'}
+                {searchTerm && nextCursor
+                  ? 'Ninguna de las sesiones cargadas coincide con la búsqueda. Carga más sesiones o filtra por código.'
+                  : searchTerm || filterCode
+                    ? 'No se encontraron sesiones con los filtros aplicados.'
+                    : 'Comienza creando tu primera sesión terapéutica.'}
               </p>
               <div className="mt-6">
                 <Link
@@ -275,6 +307,18 @@ const SessionsList = () => {
           )}
         </div>
 
+        {nextCursor && (
+          <div className="mt-6 text-center">
+            <button
+              onClick={loadMoreSessions}
+              disabled={loadingMore}
+              className="violeta-button"
+            >
+              {loadingMore ? 'Cargando...' : 'Cargar más sesiones'}
+            </button>
+          </div>
+        )}
+
         {/* Modal de detalles */}
         <SessionModal 
           session={selectedSession} 